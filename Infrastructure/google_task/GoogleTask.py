@@ -3,27 +3,19 @@ from .azure_helper import (
     TaskListType,
     task_output_binding,
     create_task_output_event,
+    task_dedupe_key,
     app,
 )
 from Infrastructure.telegram.azure_helper import (
-    create_telegram_output_event,
+    TelegramDigest,
     telegram_output_binding,
 )
 
 import azure.functions as func
-import json
 
-from google.oauth2.credentials import Credentials
-from shared.AzureHelper import get_secret
-from shared.GoogleServices import TaskService
-
-
-def _load_credentials() -> Credentials:
-    secret_str = get_secret("GcloudCredentials")
-
-    credentials_info = json.loads(secret_str)  # type: ignore
-
-    return Credentials.from_authorized_user_info(credentials_info)
+from shared.GoogleServices import NewTask, google_clients
+from shared.GoogleServices.TaskService import TaskBatchResult
+from .task_index import task_index
 
 
 @app.route(route="test_create_task")
@@ -48,25 +40,61 @@ async def create_task(
     telegramOutput: func.Out[func.EventGridOutputEvent],
 ):
     data = azeventgrid.get_json()
-    notes = data["notes"]
-    title = data["title"]
-    task_list = data["tasklist"]
+    # events of batch_task_events carry many tasks, older ones a single task
+    received = [
+        {**task, "dedupe_key": task_dedupe_key(task, azeventgrid.id, index)}
+        for index, task in enumerate(data.get("tasks", [data]))
+    ]
 
-    task_service = TaskService(_load_credentials())
+    # an earlier delivery that failed created some tasks without notifying
+    notices = task_index.take_notices([task["dedupe_key"] for task in received])
 
-    task = task_service.create_task_with_notes(
-        tasklist_id=task_list,
-        title=title,
-        notes=notes,
-    )
+    # skip the tasks created by an earlier delivery, run or overlapping window
+    tasks = task_index.not_created(received)
+    result = TaskBatchResult()
+    if tasks:
+        task_service = google_clients.tasks()
+        result = task_service.create_tasks(
+            [
+                NewTask(
+                    tasklist_id=task["tasklist"],
+                    title=task["title"],
+                    notes=task["notes"],
+                )
+                for task in tasks
+            ]
+        )
+        logging.info(
+            f"Created {len(result.tasks)} of {len(received)} tasks, "
+            f"{len(received) - len(tasks)} already existed"
+        )
+        task_index.record(
+            {
+                tasks[index]["dedupe_key"]: task["id"]
+                for index, task in result.tasks.items()
+            }
+        )
+        task_index.prune()
 
-    logging.info(f"Task created: {task}")
+    for index, task in sorted(result.tasks.items()):
+        logging.info(f"Task created: {task}")
 
-    task_date_str: str = task["due"].split("T")[0]
-    task_list_type = TaskListType(task_list)
-    task_list_name = task_list_type.name
-    telegramOutput.set(
-        create_telegram_output_event(
-            message=f"Task created in {task_list_name}: {title} ({task_date_str})"
+        task_date_str: str = task["due"].split("T")[0]
+        task_list_name = TaskListType(tasks[index]["tasklist"]).name
+        notices[tasks[index]["dedupe_key"]] = (
+            f"Task created in {task_list_name}: {tasks[index]['title']} ({task_date_str})"
         )
-    )
+
+    for index, error in result.errors.items():
+        logging.error(f"Creating task {tasks[index]['title']} failed: {error}")
+    if result.errors:
+        # Event Grid redelivers the event, which skips the created tasks and
+        # sends their notifications
+        task_index.hold_notices(notices)
+        raise RuntimeError(f"Creating {len(result.errors)} tasks failed")
+
+    digest = TelegramDigest("create_task")
+    for notice in notices.values():
+        digest.add(notice)
+    if digest:
+        telegramOutput.set(digest.flush())  # type: ignore
@@ -4,6 +4,8 @@ from function_app import app
 
 import azure.functions as func
 
+from shared.GoogleServices.TaskService import TASKS_BATCH_SIZE
+
 
 def task_output_binding(arg_name="taskOutput"):
     return app.event_grid_output(
@@ -23,13 +25,81 @@ class TaskListType(Enum):
 
 
 def create_task_output_event(
-    title: str, notes: str = "", tasklist: TaskListType = TaskListType.DEFAULT
+    title: str,
+    notes: str = "",
+    tasklist: TaskListType = TaskListType.DEFAULT,
+    dedupe_key: str | None = None,
 ) -> func.EventGridOutputEvent:
+    """
+    Args:
+        title: Title of the task
+        notes: Notes of the task
+        tasklist: Task list to create the task in
+        dedupe_key: Identifies the task, e.g. "dhl:<tracking number>".
+            create_task skips the task if one with the key was already created.
+    """
     return func.EventGridOutputEvent(
         id=str(uuid.uuid4()),
-        data={"title": title, "notes": notes, "tasklist": tasklist.value},
+        data={
+            "title": title,
+            "notes": notes,
+            "tasklist": tasklist.value,
+            "dedupe_key": dedupe_key,
+        },
         subject="create_task_event",
         event_type="create_task_event",
         event_time=datetime.datetime.now(),
         data_version="1.0",
     )
+
+
+def task_dedupe_key(task: dict, event_id: str, index: int) -> str:
+    """
+    Get the dedupe key of a task, "<event id>:<index>" for a task without one.
+
+    The event ID stays the same when Event Grid redelivers the event, so a
+    task created by an earlier delivery is skipped even without a key.
+    """
+    return task.get("dedupe_key") or f"{event_id}:{index}"
+
+
+def _create_tasks_output_event(tasks: list[dict]) -> func.EventGridOutputEvent:
+    event_id = str(uuid.uuid4())
+    return func.EventGridOutputEvent(
+        id=event_id,
+        data={
+            "tasks": [
+                {**task, "dedupe_key": task_dedupe_key(task, event_id, index)}
+                for index, task in enumerate(tasks)
+            ]
+        },
+        subject="create_task_event",
+        event_type="create_task_event",
+        event_time=datetime.datetime.now(),
+        data_version="1.0",
+    )
+
+
+def batch_task_events(
+    events: list[func.EventGridOutputEvent], tasks_per_event: int = TASKS_BATCH_SIZE
+) -> list[func.EventGridOutputEvent]:
+    """
+    Merge task events into events carrying up to `tasks_per_event` tasks each.
+
+    create_task inserts the tasks of one event with a single batch request, so
+    a run creating many tasks costs a few invocations instead of one per task.
+    Every task gets a dedupe key, so a redelivery after a partial failure only
+    creates the tasks that failed.
+
+    Args:
+        events: Events made by create_task_output_event
+        tasks_per_event: Maximum number of tasks in one event
+
+    Returns:
+        list[func.EventGridOutputEvent]: The events to publish
+    """
+    tasks = [event.get_json() for event in events]
+    return [
+        _create_tasks_output_event(tasks[start : start + tasks_per_event])
+        for start in range(0, len(tasks), tasks_per_event)
+    ]
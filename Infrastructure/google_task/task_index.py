@@ -0,0 +1,177 @@
+"""Index of the created Google Tasks by dedupe key, so repeated events create no duplicates."""
+
+import logging
+import threading
+import time
+
+from shared.AzureHelper.local_db import LocalDb
+
+# Created tasks are remembered for this long, longer than any lookback window
+DEFAULT_TASK_TTL_SECONDS = 90 * 24 * 60 * 60
+
+
+SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS created_tasks ("
+    " dedupe_key TEXT PRIMARY KEY,"
+    " task_id TEXT NOT NULL,"
+    " created_at REAL NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS created_tasks_created_at"
+    " ON created_tasks (created_at)",
+    # notifications of created tasks whose event failed, sent on its redelivery
+    "CREATE TABLE IF NOT EXISTS held_notices ("
+    " dedupe_key TEXT PRIMARY KEY,"
+    " notice TEXT NOT NULL,"
+    " created_at REAL NOT NULL)",
+]
+
+
+class TaskIndex:
+    """
+    Maps the dedupe keys of created tasks (tracking number, order number,
+    series and chapter) to their Google Tasks ID.
+
+    The index is a SQLite file in the temp directory of the worker. Entries
+    expire `ttl` seconds after the task was created.
+    """
+
+    def __init__(
+        self, db_name: str = "task_index", ttl: float = DEFAULT_TASK_TTL_SECONDS
+    ):
+        """
+        Args:
+            db_name: Name of the SQLite database in the temp directory
+            ttl: Seconds a created task is remembered
+        """
+        self.ttl = ttl
+        self._db = LocalDb(db_name, SCHEMA)
+        self._lock = threading.Lock()
+
+    def lookup(self, dedupe_keys: list[str]) -> dict[str, str]:
+        """
+        Get the tasks already created for some keys.
+
+        Args:
+            dedupe_keys: Keys to look up
+
+        Returns:
+            dict[str, str]: Task ID by key, for the keys with an unexpired task
+        """
+        if not dedupe_keys:
+            return {}
+        placeholders = ", ".join("?" * len(dedupe_keys))
+        with self._lock:
+            rows = (
+                self._db()
+                .execute(
+                    "SELECT dedupe_key, task_id FROM created_tasks"
+                    f" WHERE dedupe_key IN ({placeholders}) AND created_at > ?",
+                    (*dedupe_keys, time.time() - self.ttl),
+                )
+                .fetchall()
+            )
+            return dict(rows)
+
+    def not_created(self, tasks: list[dict]) -> list[dict]:
+        """
+        Drop the tasks whose dedupe key was already created or appears earlier in `tasks`.
+
+        Args:
+            tasks: Task data of create_task_output_event events
+
+        Returns:
+            list[dict]: The tasks to create, tasks without a key are always kept
+        """
+        existing = self.lookup(
+            [task["dedupe_key"] for task in tasks if task.get("dedupe_key")]
+        )
+        new_tasks = []
+        for task in tasks:
+            key = task.get("dedupe_key")
+            if key in existing:
+                logging.info(f"Task {key} already created as {existing[key]}")
+                continue
+            if key:
+                existing[key] = "in this batch"
+            new_tasks.append(task)
+        return new_tasks
+
+    def record(self, task_ids: dict[str, str]) -> None:
+        """
+        Remember created tasks.
+
+        Args:
+            task_ids: Task ID by dedupe key
+        """
+        now = time.time()
+        with self._lock, self._db():
+            self._db().executemany(
+                "INSERT OR REPLACE INTO created_tasks VALUES (?, ?, ?)",
+                [(key, task_id, now) for key, task_id in task_ids.items()],
+            )
+
+    def hold_notices(self, notices: dict[str, str]) -> None:
+        """
+        Keep the notifications of created tasks whose event is going to fail.
+
+        Output bindings are only published when the function succeeds, so the
+        notifications are sent by the redelivery of the event instead.
+
+        Args:
+            notices: Notification by dedupe key
+        """
+        now = time.time()
+        with self._lock, self._db():
+            self._db().executemany(
+                "INSERT OR REPLACE INTO held_notices VALUES (?, ?, ?)",
+                [(key, notice, now) for key, notice in notices.items()],
+            )
+
+    def take_notices(self, dedupe_keys: list[str]) -> dict[str, str]:
+        """
+        Remove and get the held notifications of some keys.
+
+        Args:
+            dedupe_keys: Keys to look up
+
+        Returns:
+            dict[str, str]: Notification by key, for the keys with one held
+        """
+        if not dedupe_keys:
+            return {}
+        placeholders = ", ".join("?" * len(dedupe_keys))
+        with self._lock, self._db():
+            notices = dict(
+                self._db()
+                .execute(
+                    "SELECT dedupe_key, notice FROM held_notices"
+                    f" WHERE dedupe_key IN ({placeholders})",
+                    dedupe_keys,
+                )
+                .fetchall()
+            )
+            self._db().execute(
+                f"DELETE FROM held_notices WHERE dedupe_key IN ({placeholders})",
+                dedupe_keys,
+            )
+        return notices
+
+    def prune(self) -> int:
+        """
+        Drop the expired entries and held notifications.
+
+        Returns:
+            int: Number of dropped entries
+        """
+        expired = (time.time() - self.ttl,)
+        with self._lock, self._db():
+            self._db().execute(
+                "DELETE FROM held_notices WHERE created_at <= ?", expired
+            )
+            return (
+                self._db()
+                .execute("DELETE FROM created_tasks WHERE created_at <= ?", expired)
+                .rowcount
+            )
+
+
+task_index = TaskIndex()
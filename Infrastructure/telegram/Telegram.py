@@ -1,4 +1,3 @@
-import telegram
 from .azure_helper import (
     app,
     telegram_output_binding,
@@ -8,13 +7,25 @@ from .azure_helper import (
 import azure.functions as func
 import logging
 
-from shared.AzureHelper.secrets import get_secret
+from shared.AzureHelper.secrets import get_secret, secret_cache_stats
+from .digest import digest_counter
+from .rate_limit import RateLimiter, send_rate_limited
+from .sender import TelegramSender
+
+TELEGRAM_CHAT_ID = 190599017
 
 
 def _load_token() -> str:
     return get_secret("TelegramBotToken")
 
 
+# One bot and connection pool for all messages handled by this worker
+telegram_sender = TelegramSender(_load_token)
+
+# Spaces the sends of all invocations on this worker within Telegram's rate limits
+rate_limiter = RateLimiter()
+
+
 @app.route(route="test_send_telegram_message")
 @telegram_output_binding()
 def test_send_telegram_message(
@@ -32,11 +43,11 @@ async def send_telegram_message(azeventgrid: func.EventGridEvent):
     data = azeventgrid.get_json()
     msg = data["message"]
 
-    token = _load_token()
-    chat_id = 190599017
-
-    bot = telegram.Bot(token)
-    async with bot:
-        await bot.send_message(text=msg, chat_id=chat_id)
+    # a failed send raises, Event Grid then redelivers the event
+    await send_rate_limited(telegram_sender, rate_limiter, msg, TELEGRAM_CHAT_ID)
 
     logging.info(f"Telegram Message sent: {msg}")
+    logging.info(f"Telegram sender: {telegram_sender.stats()}")
+    saved = sum(savings.saved for savings in digest_counter.savings())
+    logging.info(f"Telegram digests saved {saved} invocations today on this worker")
+    logging.info(f"Secret cache: {secret_cache_stats()}")
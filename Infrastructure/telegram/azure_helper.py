@@ -4,6 +4,12 @@ import uuid
 
 import azure.functions as func
 
+from Infrastructure.telegram.digest import (
+    TELEGRAM_MAX_MESSAGE_LENGTH,
+    digest_counter,
+    pack_messages,
+)
+
 
 def telegram_output_binding(arg_name="telegramOutput"):
     return app.event_grid_output(
@@ -25,3 +31,43 @@ def create_telegram_output_event(
         event_time=datetime.datetime.now(),
         data_version="1.0",
     )
+
+
+class TelegramDigest:
+    """
+    Collects the notifications of one source during an invocation.
+
+    `flush` packs them into as few Telegram messages as possible (see
+    digest.pack_messages), so a run with many notifications publishes a few
+    events instead of one per notification, each saving a send_telegram_message
+    invocation and a Telegram API call.
+    """
+
+    def __init__(self, source: str, limit: int = TELEGRAM_MAX_MESSAGE_LENGTH):
+        """
+        Args:
+            source: Name of the sending function, used for the saved counter
+            limit: Maximum length of a packed message
+        """
+        self.source = source
+        self.limit = limit
+        self.notifications: list[str] = []
+
+    def add(self, message: str) -> None:
+        self.notifications.append(message)
+
+    def __len__(self) -> int:
+        return len(self.notifications)
+
+    def flush(self) -> list[func.EventGridOutputEvent]:
+        """
+        Pack the collected notifications into events and start a new digest.
+
+        Returns:
+            list[func.EventGridOutputEvent]: One event per packed message
+        """
+        messages = pack_messages(self.notifications, self.limit)
+        if self.notifications:
+            digest_counter.record(self.source, len(self.notifications), len(messages))
+        self.notifications = []
+        return [create_telegram_output_event(message=message) for message in messages]
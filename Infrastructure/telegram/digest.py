@@ -0,0 +1,132 @@
+"""Pack many Telegram notifications into few messages and count the sends it saves."""
+
+import threading
+from dataclasses import dataclass
+from datetime import date
+from typing import Iterable
+
+from shared.AzureHelper.local_db import LocalDb
+
+# Longest text Telegram accepts in one message
+TELEGRAM_MAX_MESSAGE_LENGTH = 4096
+
+
+def _split_long(text: str, limit: int) -> list[str]:
+    """Split one notification longer than `limit` at line boundaries."""
+    chunks: list[str] = []
+    current = ""
+    for line in text.split("\n"):
+        # a single line over the limit has no boundary to split at
+        while len(line) > limit:
+            if current:
+                chunks.append(current)
+                current = ""
+            chunks.append(line[:limit])
+            line = line[limit:]
+
+        if not current:
+            current = line
+        elif len(current) + 1 + len(line) <= limit:
+            current = f"{current}\n{line}"
+        else:
+            chunks.append(current)
+            current = line
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def pack_messages(
+    notifications: Iterable[str], limit: int = TELEGRAM_MAX_MESSAGE_LENGTH
+) -> list[str]:
+    """
+    Join notifications into as few messages of at most `limit` characters as possible.
+
+    Notifications keep their order and are separated by a line break. One is
+    only split, at its line boundaries, if it does not fit into a message alone.
+
+    Args:
+        notifications: Texts of the notifications
+        limit: Maximum length of a message
+
+    Returns:
+        list[str]: The messages to send
+    """
+    messages: list[str] = []
+    current = ""
+    for notification in notifications:
+        for chunk in _split_long(notification, limit):
+            if not current:
+                current = chunk
+            elif len(current) + 1 + len(chunk) <= limit:
+                current = f"{current}\n{chunk}"
+            else:
+                messages.append(current)
+                current = chunk
+    if current:
+        messages.append(current)
+    return messages
+
+
+DIGEST_SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS digest_savings ("
+    " day TEXT NOT NULL,"
+    " source TEXT NOT NULL,"
+    " notifications INTEGER NOT NULL,"
+    " messages INTEGER NOT NULL,"
+    " PRIMARY KEY (day, source))",
+]
+
+
+@dataclass
+class DigestSavings:
+    """Notifications and sent messages of one source on one day."""
+
+    day: str
+    source: str
+    notifications: int
+    messages: int
+
+    @property
+    def saved(self) -> int:
+        """Function invocations and Telegram calls the digest saved."""
+        return self.notifications - self.messages
+
+
+class DigestCounter:
+    """Daily notification and message counts per source, in a SQLite file in the temp directory."""
+
+    def __init__(self, db_name: str = "telegram_digest"):
+        """
+        Args:
+            db_name: Name of the SQLite database in the temp directory
+        """
+        self._db = LocalDb(db_name, DIGEST_SCHEMA)
+        self._lock = threading.Lock()
+
+    def record(self, source: str, notifications: int, messages: int) -> None:
+        """Add the counts of one packed digest to today's row of the source."""
+        with self._lock, self._db():
+            self._db().execute(
+                "INSERT INTO digest_savings VALUES (?, ?, ?, ?)"
+                " ON CONFLICT(day, source) DO UPDATE SET"
+                " notifications = notifications + excluded.notifications,"
+                " messages = messages + excluded.messages",
+                (date.today().isoformat(), source, notifications, messages),
+            )
+
+    def savings(self, day: date | None = None) -> list[DigestSavings]:
+        """Get the counts of every source on a day, today by default."""
+        with self._lock:
+            rows = (
+                self._db()
+                .execute(
+                    "SELECT * FROM digest_savings WHERE day = ? ORDER BY source",
+                    ((day or date.today()).isoformat(),),
+                )
+                .fetchall()
+            )
+            return [DigestSavings(*row) for row in rows]
+
+
+digest_counter = DigestCounter()
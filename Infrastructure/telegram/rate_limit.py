@@ -0,0 +1,130 @@
+"""Sends Telegram messages within Telegram's rate limits."""
+
+import asyncio
+import logging
+import time
+
+import telegram
+from telegram.error import RetryAfter
+
+from .sender import TelegramSender
+
+# Telegram allows about 30 messages per second overall and 1 per second per chat.
+# No bursts: flood control counts over sliding windows, an evenly spaced stream
+# is the fastest one it never rejects.
+GLOBAL_RATE = 30.0
+GLOBAL_BURST = 1
+PER_CHAT_RATE = 1.0
+PER_CHAT_BURST = 1
+
+# Longest flood control pause waited out within one send, a longer one is raised
+MAX_RETRY_AFTER_SECONDS = 60.0
+
+
+class TokenBucket:
+    """Allows `rate` events per second with bursts of up to `burst` events."""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self) -> float:
+        """Seconds until an event is allowed, 0 if it is allowed now."""
+        now = time.monotonic()
+        self._refill(now)
+        pause = max(0.0, self._paused_until - now)
+        if self._tokens >= 1:
+            return pause
+        return max(pause, (1 - self._tokens) / self.rate)
+
+    def take(self) -> None:
+        self._tokens -= 1
+
+    def pause(self, seconds: float) -> None:
+        """Allow no events for `seconds`, e.g. for Telegram's retry_after."""
+        now = time.monotonic()
+        self._paused_until = max(self._paused_until, now + seconds)
+        self._tokens = 0.0
+        self._updated = now
+
+
+class RateLimiter:
+    """A global token bucket and one per chat."""
+
+    def __init__(
+        self,
+        global_rate: float = GLOBAL_RATE,
+        global_burst: int = GLOBAL_BURST,
+        per_chat_rate: float = PER_CHAT_RATE,
+        per_chat_burst: int = PER_CHAT_BURST,
+    ):
+        self.global_bucket = TokenBucket(global_rate, global_burst)
+        self.per_chat_rate = per_chat_rate
+        self.per_chat_burst = per_chat_burst
+        self._chats: dict[int, TokenBucket] = {}
+
+    def chat_bucket(self, chat_id: int) -> TokenBucket:
+        if chat_id not in self._chats:
+            self._chats[chat_id] = TokenBucket(self.per_chat_rate, self.per_chat_burst)
+        return self._chats[chat_id]
+
+    async def acquire(self, chat_id: int) -> None:
+        """Wait until a message to the chat is allowed and count it."""
+        chat = self.chat_bucket(chat_id)
+        while wait := max(self.global_bucket.wait_time(), chat.wait_time()):
+            await asyncio.sleep(wait)
+        self.global_bucket.take()
+        chat.take()
+
+
+def _retry_after_seconds(error: RetryAfter) -> float:
+    retry_after = error.retry_after
+    if hasattr(retry_after, "total_seconds"):
+        return retry_after.total_seconds()
+    return float(retry_after)
+
+
+async def send_rate_limited(
+    sender: TelegramSender,
+    limiter: RateLimiter,
+    text: str,
+    chat_id: int,
+    max_retry_after: float = MAX_RETRY_AFTER_SECONDS,
+) -> telegram.Message:
+    """
+    Send a message as soon as the rate limiter allows it.
+
+    A 429 response pauses the chat for Telegram's retry_after, which also holds
+    back the other sends to that chat, and the message is sent again once the
+    pause is over. Other errors are raised as they are.
+
+    Args:
+        sender: Sends the message
+        limiter: Global and per chat rate limits, shared by all sends of the worker
+        text: Message text
+        chat_id: Chat to send to
+        max_retry_after: Longest pause waited out, a longer retry_after is raised
+
+    Returns:
+        telegram.Message: The sent message
+
+    Raises:
+        RetryAfter: If Telegram asked to wait longer than `max_retry_after`
+    """
+    while True:
+        await limiter.acquire(chat_id)
+        try:
+            return await sender.send(text, chat_id=chat_id)
+        except RetryAfter as e:
+            seconds = _retry_after_seconds(e)
+            limiter.chat_bucket(chat_id).pause(seconds)
+            if seconds > max_retry_after:
+                raise
+            logging.warning(f"Telegram flood control, retrying in {seconds}s")
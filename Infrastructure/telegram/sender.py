@@ -0,0 +1,145 @@
+"""One Telegram bot per worker process, kept initialized between invocations."""
+
+import asyncio
+import logging
+import statistics
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Callable
+
+import telegram
+from telegram.error import BadRequest, RetryAfter
+from telegram.request import HTTPXRequest
+
+# Concurrent sends sharing the kept alive connections of the bot
+CONNECTION_POOL_SIZE = 8
+
+# Number of recent sends the latency percentiles are computed over
+LATENCY_WINDOW = 256
+
+
+@dataclass
+class SendStats:
+    """Counters and recent latencies of a TelegramSender."""
+
+    sent: int
+    failed: int
+    initializations: int
+    mean_ms: float
+    p95_ms: float
+
+
+def _make_bot(token: str) -> telegram.Bot:
+    return telegram.Bot(
+        token, request=HTTPXRequest(connection_pool_size=CONNECTION_POOL_SIZE)
+    )
+
+
+class TelegramSender:
+    """
+    Sends messages through one initialized telegram.Bot and its connection pool.
+
+    The bot is created and initialized (token lookup, getMe, TLS handshake) on
+    the first send and then reused, so a burst of messages pays that cost once
+    per worker instead of once per message. A send failing on the transport
+    drops the bot and is retried once with a fresh one; requests Telegram
+    rejects (bad request, flood control) are raised as they are.
+    """
+
+    def __init__(
+        self,
+        token_loader: Callable[[], str],
+        bot_factory: Callable[[str], telegram.Bot] = _make_bot,
+    ):
+        """
+        Args:
+            token_loader: Returns the bot token, called on every initialization
+            bot_factory: Creates a bot from the token
+        """
+        self._token_loader = token_loader
+        self._bot_factory = bot_factory
+        self._bot: telegram.Bot | None = None
+        # the connections of the bot belong to the event loop it was initialized on
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._init_lock: asyncio.Lock | None = None
+        self._latencies: deque[float] = deque(maxlen=LATENCY_WINDOW)
+        self._sent = 0
+        self._failed = 0
+        self._initializations = 0
+
+    async def _get_bot(self) -> telegram.Bot:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # the old bot cannot be shut down from another loop, just drop it
+            self._bot = None
+            self._loop = loop
+            self._init_lock = asyncio.Lock()
+
+        async with self._init_lock:  # type: ignore
+            if self._bot is None:
+                bot = self._bot_factory(self._token_loader())
+                await bot.initialize()
+                self._bot = bot
+                self._initializations += 1
+            return self._bot
+
+    async def _reset(self) -> None:
+        bot, self._bot = self._bot, None
+        if bot is not None:
+            try:
+                await bot.shutdown()
+            except Exception as e:
+                logging.warning(f"Shutting down the failed Telegram bot failed: {e}")
+
+    async def _send_once(self, text: str, chat_id: int) -> telegram.Message:
+        start = time.perf_counter()
+        bot = await self._get_bot()
+        message = await bot.send_message(text=text, chat_id=chat_id)
+        self._latencies.append(time.perf_counter() - start)
+        self._sent += 1
+        return message
+
+    async def send(self, text: str, chat_id: int) -> telegram.Message:
+        """
+        Send a text message.
+
+        Args:
+            text: Message text
+            chat_id: Chat to send to
+
+        Returns:
+            telegram.Message: The sent message
+        """
+        for retry in (True, False):
+            try:
+                return await self._send_once(text, chat_id)
+            except (BadRequest, RetryAfter):
+                self._failed += 1
+                raise
+            except Exception as e:
+                await self._reset()
+                if not retry:
+                    self._failed += 1
+                    raise
+                logging.warning(f"Telegram send failed, reinitializing the bot: {e}")
+        raise RuntimeError("Telegram send was not attempted")
+
+    async def close(self) -> None:
+        """Shut the bot down, the next send initializes a new one."""
+        await self._reset()
+
+    def stats(self) -> SendStats:
+        """Get the counters since the worker started and the recent send latencies."""
+        latencies = sorted(self._latencies)
+        return SendStats(
+            sent=self._sent,
+            failed=self._failed,
+            initializations=self._initializations,
+            mean_ms=round(statistics.mean(latencies) * 1000, 1) if latencies else 0.0,
+            p95_ms=(
+                round(latencies[int(0.95 * (len(latencies) - 1))] * 1000, 1)
+                if latencies
+                else 0.0
+            ),
+        )
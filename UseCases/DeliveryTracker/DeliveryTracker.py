@@ -1,66 +1,37 @@
-import json
-import logging
+from dataclasses import asdict
 
-from google.oauth2.credentials import Credentials
+from Infrastructure.google_task.azure_helper import create_task_output_event
+from UseCases.DeliveryTracker.fetch_mail import DHL_PICKUP_FILTER
+from UseCases.DeliveryTracker.parsing import parse_known_dhl_pickup_email_html
+from UseCases.MailPoller import MailOutputs, mail_dispatcher, unknown_templates
+from shared.GoogleServices.gmail import MailMessage
+from shared.html_fingerprint import UnknownTemplateError
 
-import azure.functions as func
 
-from Infrastructure.google_task.azure_helper import (
-    create_task_output_event,
-    task_output_binding,
-)
-from Infrastructure.telegram.azure_helper import (
-    create_telegram_output_event,
-    telegram_output_binding,
-)
-from UseCases.DeliveryTracker.fetch_mail import get_amazon_dhl_pickup_emails
-from UseCases.DeliveryTracker.parsing import parse_dhl_pickup_email_html
-from function_app import app
-from shared.GoogleServices import GmailService
-from shared.AzureHelper import get_secret
-
-
-def _load_credentials() -> Credentials:
-    secret_str = get_secret("GcloudCredentials")
-
-    credentials_info = json.loads(secret_str)  # type: ignore
-
-    return Credentials.from_authorized_user_info(credentials_info)
-
-
-@app.timer_trigger(
-    schedule="30 * * * *", arg_name="mytimer", run_on_startup=False, use_monitor=False
-)
-@task_output_binding()
-@telegram_output_binding()
-def dhl_mail_to_task(
-    mytimer: func.TimerRequest,
-    taskOutput: func.Out[func.EventGridOutputEvent],
-    telegramOutput: func.Out[func.EventGridOutputEvent],
-):
+@mail_dispatcher.route("dhl_pickup", DHL_PICKUP_FILTER)
+def dhl_mail_to_task(mail: MailMessage, outputs: MailOutputs) -> dict:
     try:
-        credentials = _load_credentials()
-        gmail_service = GmailService(credentials)
-
-        raw_mails = get_amazon_dhl_pickup_emails(gmail_service, hours=1)
-
-        logging.info(f"Found {len(raw_mails)} DHL pickup notifications")
-
-        tasks: list[func.EventGridOutputEvent] = []
-        for mail in raw_mails:
-            parsed_mail = parse_dhl_pickup_email_html(mail)
-            notes = (
-                f"{parsed_mail.preview}\n"
-                f"Abholort: {parsed_mail.pickup_location}\n"
-                f"Abholen bis: {parsed_mail.due_date}\n"
-                f"Tracking: {parsed_mail.tracking_number}"
-            )
-            tasks.append(create_task_output_event(title="Paket abholen", notes=notes))
-
-        taskOutput.set(tasks)  # type: ignore
-    except Exception as e:
-        logging.error(str(e))
-
-        telegramOutput.set(
-            create_telegram_output_event(message=f"Error in dhl_mail_to_task: {str(e)}")
+        parsed_mail = parse_known_dhl_pickup_email_html(mail.text, now=outputs.now)
+    except UnknownTemplateError as e:
+        unknown_templates.record(e, mail.id)
+        raise
+    notes = (
+        f"{parsed_mail.preview}\n"
+        f"Abholort: {parsed_mail.pickup_location}\n"
+        f"Abholen bis: {parsed_mail.due_date}\n"
+        f"Tracking: {parsed_mail.tracking_number}"
+    )
+    outputs.tasks.append(
+        create_task_output_event(
+            title="Paket abholen",
+            notes=notes,
+            dedupe_key=(
+                f"dhl:{parsed_mail.tracking_number}"
+                if parsed_mail.tracking_number
+                else None
+            ),
         )
+    )
+    outputs.shipments.append((mail.id, parsed_mail))
+
+    return asdict(parsed_mail)
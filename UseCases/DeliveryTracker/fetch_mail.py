@@ -1,23 +1,5 @@
-from datetime import datetime, timedelta, timezone
-from shared.GoogleServices import GmailQueryBuilder
-from shared.GoogleServices.gmail.service import GmailService
+from shared.GoogleServices.gmail import MessageFilter
 
-
-def get_amazon_dhl_pickup_emails(
-    gmail_service: GmailService, hours: int = 1
-) -> list[str]:
-    # Calculate time threshold
-    time_threshold = datetime.now(timezone.utc) - timedelta(hours=hours)
-
-    # Build query
-    query = (
-        GmailQueryBuilder()
-        .from_email("order-update@amazon.de")
-        .subject("Ihr Paket kann bei DHL", exact=True)
-        .after_date(time_threshold)
-        .build()
-    )
-
-    messages = gmail_service.query_messages_with_body(query)
-
-    return messages
+DHL_PICKUP_FILTER = MessageFilter(
+    sender="order-update@amazon.de", subject="Ihr Paket kann bei DHL"
+)
@@ -1,8 +1,20 @@
 from dataclasses import dataclass
 from datetime import datetime
+from functools import partial
 import re
+from typing import Iterable, Iterator
 
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, Tag
+
+from shared.batch_parsing import ParseResult, iter_parse_batch
+from shared.html_fingerprint import TemplateRegistry
+from shared.html_rules import (
+    Region,
+    RowRule,
+    RuleSet,
+    compact_row_text,
+    match_group,
+)
 
 # German month names mapping
 GERMAN_MONTHS: dict[str, int] = {
@@ -20,6 +32,62 @@ GERMAN_MONTHS: dict[str, int] = {
     "Dezember": 12,
 }
 
+# Compiled once, used for every message
+TRACKING_ANCHOR_PATTERN = re.compile(r"Tracking-Nummer")
+TRACKING_PATTERN = re.compile(r"Tracking-Nummer lautet:\s*([A-Z0-9]+)")
+DUE_DATE_LABEL = "ABHOLUNG BIS ZUM"
+# e.g. "Freitag, 30. Mai"
+DUE_DATE_PATTERN = re.compile(r"[^,\n]+,\s*(\d+)\.\s*(\w+)")
+ADDRESS_ANCHOR_PATTERN = re.compile(r"ABHOLORT")
+PREVIEW_ANCHOR_PATTERN = re.compile(r"\bARTIKEL\b")
+
+
+def _item_html(row: Tag) -> str | None:
+    # The item name is in <span class="rio_15_heavy_black"> Reorda&reg; Metallband...</span>
+    item_span = row.find("span", class_="rio_15_heavy_black")
+    if not item_span:
+        return None
+    # decode_contents(formatter="html") preserves &reg; instead of converting it to ®
+    return item_span.decode_contents(formatter="html").strip()  # type: ignore
+
+
+DHL_PICKUP_RULES = RuleSet(
+    [
+        RowRule(
+            "tracking_number",
+            TRACKING_ANCHOR_PATTERN,
+            cleanup=match_group(TRACKING_PATTERN),
+        ),
+        RowRule("due_date", DUE_DATE_LABEL, offset=1),
+        # The location name is in the 2nd tr after the ABHOLORT header, the
+        # street address in the one after it
+        RowRule(
+            "location",
+            ADDRESS_ANCHOR_PATTERN,
+            offset=2,
+            cleanup=compact_row_text,
+            tag="span",
+        ),
+        RowRule(
+            "street",
+            ADDRESS_ANCHOR_PATTERN,
+            offset=3,
+            cleanup=compact_row_text,
+            tag="span",
+        ),
+        RowRule(
+            "preview", PREVIEW_ANCHOR_PATTERN, offset=1, cleanup=_item_html, tag="span"
+        ),
+    ],
+    # from the tracking number row to the item preview
+    region=Region("Tracking-Nummer", "ARTIKEL"),
+)
+
+# Fingerprints (shared.html_fingerprint) of the known pickup mail layouts
+DHL_PICKUP_TEMPLATES: TemplateRegistry[RuleSet] = TemplateRegistry(
+    "dhl_pickup", {"d5b3935bb99cbb95a91fb1d8dfa8fcd03ef9d7f9": DHL_PICKUP_RULES}
+)
+
 
 @dataclass
 class EmailData:
@@ -31,136 +99,132 @@ class EmailData:
     preview: str
 
 
-def parse_dhl_pickup_email_html(html_content: str) -> EmailData:
+def parse_due_date(text: str, now: datetime) -> str | None:
     """
+    Parse a German due date without year, like "Freitag, 30. Mai".
 
-    Parse the HTML content of a DHL pickup email to extract relevant information.
+    The year is the one of `now`, or the next one if the date is already past.
 
     Args:
-        html_content (str): The HTML content of the email
+        text (str): Weekday, day and German month name
+        now (datetime): Reference clock
 
     Returns:
-        dict: Dictionary containing parsed information (tracking_number, pickup_location, due_date)
+        str | None: Date formatted as DD.MM.YYYY, None if it cannot be parsed
     """
-    # Parse HTML content
-    soup = BeautifulSoup(html_content, "html.parser")
-    text_content = soup.get_text()
-
-    # Extract tracking number (format: JJD000390016984620494)
-    tracking_match = re.search(r"Tracking-Nummer lautet:\s*([A-Z0-9]+)", text_content)
-    tracking_number = str(tracking_match.group(1)) if tracking_match else None
-
-    # Extract pickup location
-    # First find the ABHOLORT section
-    location_text = find_adress(soup)
-
-    # Extract due date
-    due_date_match = re.search(
-        r"ABHOLUNG BIS ZUM\s*\n\s*([^,\n]+),\s*(\d+\.\s*([^\n]+))",
-        text_content,
-    )
-    due_date = None
-    if due_date_match:
-        day_str = due_date_match.group(2).strip()  # e.g., "30. November"
-        try:
-            # Parse the German date manually
-            day = int(re.search(r"(\d+)\.", day_str).group(1))  # type: ignore
-            month_name = (
-                re.search(r"\d+\.\s*(\w+)", day_str).group(1).strip()  # type: ignore
-            )
-            month = GERMAN_MONTHS.get(month_name)
-
-            if month:
-                # Set the year (assuming next occurrence if month is in the past)
-                current_date = datetime.now()
-                year = current_date.year
-
-                # Create date object
-                date_obj = datetime(year, month, day)
-
-                # If the date is in the past, use next year
-                if date_obj < current_date:
-                    date_obj = date_obj.replace(year=year + 1)
-
-                # Format as DD.MM.YYYY
-                due_date = date_obj.strftime("%d.%m.%Y")
-        except (ValueError, AttributeError):
-            due_date = None
-
-    preview = find_preview(soup)
+    match = DUE_DATE_PATTERN.search(text)
+    if not match:
+        return None
+
+    month = GERMAN_MONTHS.get(match.group(2))
+    if not month:
+        return None
+
+    try:
+        date_obj = datetime(now.year, month, int(match.group(1)))
+
+        # If the date is in the past, use next year
+        if date_obj < now:
+            date_obj = date_obj.replace(year=now.year + 1)
+    except ValueError:
+        return None
+
+    return date_obj.strftime("%d.%m.%Y")
+
+
+def _email_data(values: dict[str, str | None], now: datetime) -> EmailData:
+    pickup_location = "Address not found"
+    if values["location"] is not None and values["street"] is not None:
+        pickup_location = f"{values['location']}, {values['street']}"
 
     return EmailData(
-        tracking_number=tracking_number,
-        pickup_location=location_text,
-        due_date=due_date,
-        preview=preview,
+        tracking_number=values["tracking_number"],
+        pickup_location=pickup_location,
+        due_date=(
+            parse_due_date(values["due_date"], now) if values["due_date"] else None
+        ),
+        preview=values["preview"] or "Unknown item",
     )
 
 
-def find_adress(soup: BeautifulSoup) -> str:
+def parse_dhl_pickup_email_html(
+    html_content: str,
+    backend: str | None = None,
+    now: datetime | None = None,
+    trim: bool = True,
+) -> EmailData:
+    """
+
+    Parse the HTML content of a DHL pickup email to extract relevant information.
+
+    Args:
+        html_content (str): The HTML content of the email
+        backend (str | None): HTML parser backend, see shared.html_backend
+        now (datetime | None): Reference clock for the due date, defaults to now
+        trim (bool): Parse only the region of the fields if it can be found
+
+    Returns:
+        EmailData: Parsed information (tracking_number, pickup_location, due_date, preview)
     """
-    Extract the address from DHL notification email HTML.
-    Returns formatted address like "Packstation 158, Südhöhe 38"
+    values = DHL_PICKUP_RULES.parse(html_content, backend, trim=trim)
+    return _email_data(values, now or datetime.now())
+
+
+def parse_known_dhl_pickup_email_html(
+    html_content: str, backend: str | None = None, now: datetime | None = None
+) -> EmailData:
     """
-    # Find the span containing "ABHOLORT"
-    abholort_span = soup.find("span", string=re.compile(r"ABHOLORT"))
-    if not abholort_span:
-        return "Address not found"
+    Parse a DHL pickup email with the rules of its template.
 
-    # Navigate to the tr that contains the address information
-    abholort_tr = abholort_span.find_parent("tr")
-    if not abholort_tr:
-        return "Address not found"
+    Unlike `parse_dhl_pickup_email_html`, a mail with an unknown layout is
+    rejected from its fingerprint, before it is parsed.
 
-    # The location name is in the 2nd tr after the header
-    location_tr = abholort_tr.find_next_sibling("tr").find_next_sibling("tr")  # type: ignore
-    if not location_tr:
-        return "Address not found"
+    Args:
+        html_content (str): The HTML content of the email
+        backend (str | None): HTML parser backend, see shared.html_backend
+        now (datetime | None): Reference clock for the due date, defaults to now
 
-    # The street address is in the next tr
-    address_tr = location_tr.find_next_sibling("tr")
-    if not address_tr:
-        return "Address not found"
+    Raises:
+        UnknownTemplateError: If the layout is not in DHL_PICKUP_TEMPLATES
 
-    # Extract the text and clean it
-    location_text = location_tr.get_text(strip=True)
-    address_text = address_tr.get_text(strip=True)
+    Returns:
+        EmailData: Parsed information (tracking_number, pickup_location, due_date, preview)
+    """
+    rules = DHL_PICKUP_TEMPLATES.lookup(html_content)
+    return _email_data(rules.parse(html_content, backend), now or datetime.now())
 
-    # Format the complete address
-    full_address = f"{location_text}, {address_text}"
 
-    return full_address
+def iter_parse_many(
+    html_contents: Iterable[str],
+    workers: int | None = None,
+    backend: str | None = None,
+    now: datetime | None = None,
+) -> Iterator[ParseResult[EmailData]]:
+    """
+    Parse DHL pickup emails on several processes and yield the results in input order.
 
+    Memory stays bounded, so it can be fed a generator over a long backfill.
 
-def find_preview(soup: BeautifulSoup) -> str:
+    Args:
+        html_contents (Iterable[str]): The HTML content of the emails
+        workers (int | None): Number of processes, defaults to the CPU count
+        backend (str | None): HTML parser backend, see shared.html_backend
+        now (datetime | None): Reference clock for the due dates, defaults to now
 
-    # Step 1: Find the <span> that contains the text "ARTIKEL"
-    artikel_span = soup.find(
-        "span", class_="rio_15_grey", string=re.compile(r"\bARTIKEL\b")
+    Yields:
+        ParseResult[EmailData]: Parsed email or error message, per email
+    """
+    parse = partial(
+        parse_dhl_pickup_email_html, backend=backend, now=now or datetime.now()
     )
-    if not artikel_span:
-        return "Unknown item"
-
-    # Step 2: Get the parent <tr> that holds this <span>
-    artikel_tr = artikel_span.find_parent("tr")
-    if not artikel_tr:
-        return "Unknown item"
-
-    # Step 3: Get the next <tr> sibling
-    next_tr = artikel_tr.find_next_sibling("tr")
-    if not next_tr:
-        return "Unknown item"
-
-    # Step 4: Extract the text you want.
-    # If you want the entire row's text, preserving &reg;:
-    item_html = next_tr.decode_contents(formatter="html").strip()  # type: ignore
-
-    # OPTIONAL: If you only want a specific <span> inside the next <tr>
-    # that might hold the item name, e.g. <span class="rio_15_heavy_black"> Reorda&reg; Metallband...</span>:
-    item_span = next_tr.find("span", class_="rio_15_heavy_black")  # type: ignore
-    if item_span:
-        # decode_contents(formatter="html") preserves &reg; instead of converting it to ®
-        item_text = item_span.decode_contents(formatter="html").strip()  # type: ignore
-        return item_text
-
-    return "Unknown item"
+    return iter_parse_batch(parse, html_contents, workers=workers)
+
+
+def parse_many(
+    html_contents: Iterable[str],
+    workers: int | None = None,
+    backend: str | None = None,
+    now: datetime | None = None,
+) -> list[ParseResult[EmailData]]:
+    """Parse DHL pickup emails on several processes, see `iter_parse_many`."""
+    return list(iter_parse_many(html_contents, workers, backend=backend, now=now))
@@ -8,15 +8,13 @@ from function_app import app
 
 import azure.functions as func
 
-from shared.AzureHelper.google_credentials import load_gcloud_credentials
-from shared.GoogleServices import GmailService
+from shared.GoogleServices import google_clients
 from shared.GoogleServices.GmailQueryBuilder import GmailQueryBuilder
 
 
 @app.route(route="save_lohnzettel")
 def save_lohnzettel(req: func.HttpRequest):
-    credentials = load_gcloud_credentials()
-    gmail_service = GmailService(credentials)
+    gmail_service = google_clients.gmail()
 
     query = (
         GmailQueryBuilder()
@@ -26,9 +24,8 @@ def save_lohnzettel(req: func.HttpRequest):
         .build()
     )
 
-    message_ids = [message.id for message in gmail_service._query_messages_ids(query)]
-
-    for msg_id in message_ids:
+    for message in gmail_service.iter_message_ids(query):
+        msg_id = message.id
         file_paths = [
             Path(path) for path in gmail_service.download_pdf_attachments(msg_id)
         ]
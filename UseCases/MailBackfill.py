@@ -0,0 +1,256 @@
+"""Replay the mails of a date range through the handlers of the mail poller."""
+
+import io
+import json
+import logging
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from typing import TextIO
+
+import azure.functions as func
+
+from Infrastructure.google_task.azure_helper import (
+    batch_task_events,
+    task_output_binding,
+)
+from Infrastructure.telegram.azure_helper import telegram_output_binding
+from UseCases.MailPoller import MailOutputs, mail_dispatcher, store_parcels
+from function_app import app
+from shared.GoogleServices import GmailQueryBuilder, google_clients
+from shared.GoogleServices.gmail import (
+    CheckpointStore,
+    DeferredCheckpointStore,
+    DispatchResult,
+    MailMessage,
+    default_checkpoint_store,
+)
+from shared.GoogleServices.gmail.service import GMAIL_BATCH_SIZE, GmailService
+
+DEFAULT_BACKFILL_ROUTES = ("dhl_pickup", "amazon_return")
+
+# Stop and checkpoint well before Azure cuts off the HTTP response (230 seconds,
+# whatever the function timeout), leaving time to set the outputs
+DEFAULT_TIME_BUDGET_SECONDS = 150
+
+
+@dataclass
+class BackfillStats:
+    """Dataclass to summarize one (possibly partial) backfill run."""
+
+    listed: int = 0
+    skipped: int = 0
+    processed: int = 0
+    handled: dict[str, int] = field(default_factory=dict)
+    errors: list[str] = field(default_factory=list)
+    complete: bool = False
+
+
+def _checkpoint_key(start: datetime, end: datetime, dry_run: bool) -> str:
+    key = f"backfill:{int(start.timestamp())}-{int(end.timestamp())}"
+    return f"{key}:dry-run" if dry_run else key
+
+
+def _log_progress(done: int, total: int, started_at: float) -> None:
+    elapsed = time.monotonic() - started_at
+    rate = done / elapsed if elapsed else 0.0
+    eta = (total - done) / rate if rate else float("inf")
+    logging.info(f"Backfill {done}/{total} mails, {rate:.1f} msg/s, ETA {eta:.0f}s")
+
+
+def backfill(
+    gmail_service: GmailService,
+    start: datetime,
+    end: datetime,
+    outputs: MailOutputs,
+    checkpoints: CheckpointStore,
+    route_names: list[str] | None = None,
+    report: TextIO | None = None,
+    time_budget: float | None = None,
+    batch_size: int = GMAIL_BATCH_SIZE,
+    dry_run: bool = False,
+) -> BackfillStats:
+    """
+    Dispatch the mails received in [start, end) to the handlers of the mail poller.
+
+    Mails are listed newest first and fetched in batches of `batch_size`. After
+    each batch the receive time of the oldest mail handled without an error is
+    stored as the new end of the range, so a run stopped by `time_budget` (or a
+    timeout) resumes where it left off. The end of the range stops moving at the
+    first mail that could not be fetched or handled, so the next run retries it.
+    Mails already in the processed-message cache of the poller, i.e. which
+    already produced tasks, are not fetched again.
+
+    The handled mails are collected in `outputs.processed` instead of being
+    marked as processed right away. Pass a DeferredCheckpointStore and commit
+    it, like the processed mails, once the outputs are set.
+
+    Args:
+        gmail_service: Service used to list and fetch the mails
+        start: Inclusive start of the range
+        end: Exclusive end of the range
+        outputs: Collects the events of the handlers
+        checkpoints: Store for the progress of this range
+        route_names: Mail routes to replay, DHL pickups and returns by default
+        report: Receives one JSON line per processed mail
+        time_budget: Seconds after which the run stops, checked while listing
+            and at every batch boundary
+        batch_size: Mails fetched per batch request
+        dry_run: Do not collect processed mails and keep a separate checkpoint
+
+    Returns:
+        BackfillStats: Counters of this run, `complete` once the range is done
+    """
+    route_names = list(route_names or DEFAULT_BACKFILL_ROUTES)
+    started_at = time.monotonic()
+    stats = BackfillStats()
+
+    def out_of_time() -> bool:
+        return time_budget is not None and time.monotonic() - started_at > time_budget
+
+    key = _checkpoint_key(start, end, dry_run)
+    resume_before = checkpoints.load(key)
+    before = int(resume_before) if resume_before else int(end.timestamp())
+
+    query = (
+        GmailQueryBuilder()
+        .from_any(f.sender for f in mail_dispatcher.filters(route_names))
+        .after_date(start)
+        .before_date(before)
+        .build()
+    )
+    message_ids = []
+    listed_all = True
+    for message in gmail_service.iter_message_ids(query):
+        if out_of_time():
+            logging.info("Backfill time budget used up while listing the mails")
+            listed_all = False
+            break
+        message_ids.append(message.id)
+    stats.listed = len(message_ids)
+
+    processed = None if dry_run else mail_dispatcher.processed
+    if processed is not None:
+        message_ids = [i for i in message_ids if i not in processed]
+    stats.skipped = stats.listed - len(message_ids)
+
+    result = DispatchResult()
+    failed = False
+    for offset in range(0, len(message_ids), batch_size):
+        if out_of_time():
+            logging.info(f"Backfill time budget used up, resume with {key}={before}")
+            break
+
+        batch_ids = message_ids[offset : offset + batch_size]
+        fetched = gmail_service.fetch_messages(batch_ids, batch_size=batch_size)
+        oldest_done = None
+        for message_id in batch_ids:
+            if message_id not in fetched.messages:
+                error = fetched.errors.get(message_id, "not returned")
+                result.errors.append(f"fetch failed for message {message_id}: {error}")
+                failed = True
+                continue
+
+            msg_details = fetched.messages[message_id]
+            message = MailMessage.from_api(msg_details)
+            errors_before = len(result.errors)
+            handler_results = mail_dispatcher.dispatch(
+                message, outputs, result, route_names=route_names, remember=False
+            )
+            stats.processed += 1
+            message_failed = len(result.errors) > errors_before
+            if not message_failed and not dry_run:
+                outputs.processed[message_id] = handler_results
+            failed = failed or message_failed
+            if not failed and "internalDate" in msg_details:
+                oldest_done = int(msg_details["internalDate"])
+
+            if report is not None:
+                report.write(
+                    json.dumps(
+                        {
+                            "message_id": message.id,
+                            "internal_date": msg_details.get("internalDate"),
+                            "results": handler_results,
+                            "errors": result.errors[errors_before:],
+                        },
+                        ensure_ascii=False,
+                    )
+                    + "\n"
+                )
+
+        if oldest_done is not None:
+            # +1s: mails of the same second left in the next batch are listed
+            # again on resume, the processed cache filters the handled ones
+            before = oldest_done // 1000 + 1
+            checkpoints.save(key, str(before))
+        _log_progress(offset + len(batch_ids), len(message_ids), started_at)
+    else:
+        if listed_all and not failed:
+            stats.complete = True
+            checkpoints.save(key, str(int(start.timestamp())))
+
+    stats.handled = result.handled
+    stats.errors = result.errors
+    return stats
+
+
+def _parse_date(value: str) -> datetime:
+    parsed = datetime.fromisoformat(value)
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+@app.route(route="mail_backfill")
+@task_output_binding()
+@telegram_output_binding()
+def mail_backfill(
+    req: func.HttpRequest,
+    taskOutput: func.Out[func.EventGridOutputEvent],
+    telegramOutput: func.Out[func.EventGridOutputEvent],
+) -> func.HttpResponse:
+    """
+    HTTP-triggered Azure Function replaying the mails of ?start=...&end=... (ISO dates).
+
+    Call it again with the same range until the response has "complete": true.
+    Optional parameters: routes (comma separated route names) and dry_run=1,
+    which returns a JSONL report of the parsed mails instead of emitting events.
+    """
+    try:
+        start = _parse_date(req.params["start"])
+        end = _parse_date(req.params["end"])
+    except (KeyError, ValueError):
+        return func.HttpResponse("start and end must be ISO dates", status_code=400)
+
+    routes = req.params.get("routes")
+    dry_run = req.params.get("dry_run") == "1"
+    outputs = MailOutputs()
+    report = io.StringIO()
+    checkpoints = DeferredCheckpointStore(default_checkpoint_store())
+    stats = backfill(
+        google_clients.gmail(),
+        start,
+        end,
+        outputs,
+        checkpoints,
+        route_names=routes.split(",") if routes else None,
+        report=report,
+        time_budget=DEFAULT_TIME_BUDGET_SECONDS,
+        dry_run=dry_run,
+    )
+    logging.info(f"Backfill of {start} - {end}: {asdict(stats)}")
+
+    if dry_run:
+        checkpoints.commit()
+        report.write(json.dumps({"stats": asdict(stats)}) + "\n")
+        return func.HttpResponse(report.getvalue(), mimetype="application/x-ndjson")
+
+    store_parcels(outputs)
+    if outputs.tasks:
+        taskOutput.set(batch_task_events(outputs.tasks))  # type: ignore
+    if outputs.telegram:
+        telegramOutput.set(outputs.telegram.flush())  # type: ignore
+    # only now the handled mails count as done, a failure above replays them
+    mail_dispatcher.remember(outputs.processed)
+    checkpoints.commit()
+
+    return func.HttpResponse(json.dumps(asdict(stats)), mimetype="application/json")
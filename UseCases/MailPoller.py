@@ -0,0 +1,124 @@
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime
+
+import azure.functions as func
+
+from Infrastructure.google_task.azure_helper import (
+    batch_task_events,
+    task_output_binding,
+)
+from Infrastructure.telegram.azure_helper import (
+    TelegramDigest,
+    telegram_output_binding,
+)
+from UseCases.DeliveryTracker.parsing import EmailData
+from UseCases.ReturnTracker.parsing import ReturnInfo
+from UseCases.parcel_store import ParcelStore
+from function_app import app
+from shared.GoogleServices import google_clients
+from shared.GoogleServices.gmail import (
+    DeferredCheckpointStore,
+    MailDispatcher,
+    ProcessedMessageCache,
+    default_checkpoint_store,
+)
+from shared.html_fingerprint import UnknownTemplateLog
+
+
+@dataclass
+class MailOutputs:
+    """Output events collected by the mail handlers during one poll."""
+
+    tasks: list[func.EventGridOutputEvent] = field(default_factory=list)
+    # packed into as few messages as possible when the poll is done
+    telegram: TelegramDigest = field(
+        default_factory=lambda: TelegramDigest("mail_poller")
+    )
+    # parsed mails by Gmail message ID, stored in the parcel store after the poll
+    shipments: list[tuple[str, EmailData]] = field(default_factory=list)
+    returns: list[tuple[str, ReturnInfo]] = field(default_factory=list)
+    # handler results by Gmail message ID, marked as processed once the other
+    # outputs are set
+    processed: dict[str, dict[str, dict]] = field(default_factory=dict)
+    # one reference clock for all mails of the poll
+    now: datetime = field(default_factory=datetime.now)
+
+
+# Mail driven use cases register their handlers here, e.g.
+# @mail_dispatcher.route("dhl_pickup", MessageFilter(sender=..., subject=...))
+mail_dispatcher: MailDispatcher[MailOutputs] = MailDispatcher(
+    checkpoint_key="mail_poller", processed=ProcessedMessageCache("mail_poller")
+)
+
+parcel_store = ParcelStore()
+
+# Handlers record the mails they reject because of an unknown layout here and
+# re-raise. The dispatcher keeps the failed mail in its retry list, so every
+# poll fetches it again until its fingerprint is registered. Only the newest
+# MAX_RETRY_MESSAGES failures are kept, older ones need a backfill.
+unknown_templates = UnknownTemplateLog()
+
+
+def store_parcels(outputs: MailOutputs) -> None:
+    """Write the shipments and returns parsed during a poll in one batch each."""
+    shipments = parcel_store.add_shipments(outputs.shipments)
+    returns = parcel_store.add_returns(outputs.returns)
+    logging.info(f"Stored {shipments} shipments and {returns} returns")
+
+
+@app.timer_trigger(
+    schedule="30 * * * *", arg_name="mytimer", run_on_startup=False, use_monitor=False
+)
+@task_output_binding()
+@telegram_output_binding()
+def mail_poller(
+    mytimer: func.TimerRequest,
+    taskOutput: func.Out[func.EventGridOutputEvent],
+    telegramOutput: func.Out[func.EventGridOutputEvent],
+):
+    """
+    Time-triggered Azure Function that:
+    1. Syncs the new mails of all registered mail routes with one Gmail query
+    2. Hands each mail to the handlers whose sender/subject it matches
+    3. Sends the tasks and Telegram messages the handlers produced
+    """
+    outputs = MailOutputs()
+    checkpoints = DeferredCheckpointStore(default_checkpoint_store())
+    try:
+        result = mail_dispatcher.run(
+            google_clients.gmail(), outputs, checkpoints=checkpoints, remember=False
+        )
+        outputs.processed.update(result.processed)
+
+        logging.info(
+            f"Dispatched {result.messages} mails: "
+            + ", ".join(
+                f"{route.name}={result.handled.get(route.name, 0)}"
+                for route in mail_dispatcher.routes
+            )
+        )
+        logging.info(f"Mail poller stages: {result.timings.summary()}")
+        for error in result.errors:
+            logging.error(error)
+            outputs.telegram.add(f"Error in mail_poller: {error}")
+
+        store_parcels(outputs)
+
+        stats = mail_dispatcher.processed.stats()  # type: ignore
+        logging.info(
+            f"Processed mail cache: {stats.hits} hits, {stats.misses} misses "
+            f"({stats.hit_rate:.0%} hit rate), {stats.size} stored"
+        )
+        mail_dispatcher.processed.prune()  # type: ignore
+    except Exception as e:
+        logging.error(str(e))
+        outputs.telegram.add(f"Error in mail_poller: {str(e)}")
+
+    if outputs.tasks:
+        taskOutput.set(batch_task_events(outputs.tasks))  # type: ignore
+    if outputs.telegram:
+        telegramOutput.set(outputs.telegram.flush())  # type: ignore
+    # only now the dispatched mails count as done, a failure above polls them again
+    mail_dispatcher.remember(outputs.processed)
+    checkpoints.commit()
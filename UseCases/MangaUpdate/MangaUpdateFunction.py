@@ -8,12 +8,13 @@ from .MangaUpdateService import (
 )
 from function_app import app
 from Infrastructure.google_task.azure_helper import (
+    batch_task_events,
     create_task_output_event,
     TaskListType,
     task_output_binding,
 )
 from Infrastructure.telegram.azure_helper import (
-    create_telegram_output_event,
+    TelegramDigest,
     telegram_output_binding,
 )
 from shared.date_utils import is_at_most_one_day_old
@@ -68,6 +69,7 @@ def manga_update(
     taskOutput: func.Out[func.EventGridOutputEvent],
     telegramOutput: func.Out[func.EventGridOutputEvent],
 ) -> None:
+    digest = TelegramDigest("manga_update")
     try:
         logging.info("MangaUpdate timer function processed a request.")
 
@@ -87,6 +89,7 @@ def manga_update(
                             title=f"{manga.title} Chapter {latest_chapter.chapter}",
                             notes=manga.url,
                             tasklist=TaskListType.MANGA,
+                            dedupe_key=f"manga:{manga.title}:{latest_chapter.chapter}",
                         )
                     )
 
@@ -97,12 +100,15 @@ def manga_update(
             except Exception as e:
                 error_msg = f"Failed to process manga {manga.title}: {str(e)}"
                 logging.error(error_msg)
-                tasks.append(create_telegram_output_event(message=error_msg))
+                digest.add(error_msg)
 
         if tasks:
             # azure functions is wrongly typed here, it actually accepts a list of events to publish
-            taskOutput.set(tasks)  # type: ignore
+            taskOutput.set(batch_task_events(tasks))  # type: ignore
     except Exception as e:
         error_msg = f"Error in manga_update: {str(e)}"
         logging.error(error_msg)
-        telegramOutput.set(create_telegram_output_event(message=error_msg))
+        digest.add(error_msg)
+
+    if digest:
+        telegramOutput.set(digest.flush())  # type: ignore
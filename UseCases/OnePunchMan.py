@@ -4,6 +4,7 @@ import azure.functions as func
 
 from Infrastructure.google_task.azure_helper import (
     TaskListType,
+    batch_task_events,
     create_task_output_event,
     task_output_binding,
 )
@@ -58,11 +59,12 @@ def one_punch_man_update(
                     title=f"One Punch Man {chapter.title}",
                     notes=chapter.destination_url or "no url found",
                     tasklist=TaskListType.MANGA,
+                    dedupe_key=f"manga:One Punch Man:{chapter.title}",
                 )
             )
 
         if tasks:
-            taskOutput.set(tasks)  # type: ignore
+            taskOutput.set(batch_task_events(tasks))  # type: ignore
 
     except Exception as e:
         logging.error(str(e))
@@ -1,21 +1,5 @@
-from datetime import datetime, timedelta, timezone
-from shared.GoogleServices import GmailQueryBuilder
-from shared.GoogleServices.gmail.service import GmailService
+from shared.GoogleServices.gmail import MessageFilter
 
-
-def get_amazon_return_mails(gmail_service: GmailService, hours: int = 1) -> list[str]:
-    # Calculate time threshold
-    time_threshold = datetime.now(timezone.utc) - timedelta(hours=hours)
-
-    # Build query
-    query = (
-        GmailQueryBuilder()
-        .from_email("rueckgabe@amazon.de")
-        .after_date(time_threshold)
-        .subject("Ihre Rücksendung von")
-        .build()
-    )
-
-    messages = gmail_service.query_messages_with_body(query)
-
-    return messages
+RETURN_FILTER = MessageFilter(
+    sender="rueckgabe@amazon.de", subject="Ihre Rücksendung von"
+)
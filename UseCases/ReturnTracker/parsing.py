@@ -1,7 +1,11 @@
 from dataclasses import dataclass
+from functools import partial
 import re
+from typing import Iterable, Iterator
 
-from bs4 import BeautifulSoup
+from shared.batch_parsing import ParseResult, iter_parse_batch
+from shared.html_fingerprint import TemplateRegistry
+from shared.html_rules import Direction, Region, RowRule, RuleSet, match_group
 
 
 @dataclass
@@ -14,90 +18,75 @@ class ReturnInfo:
     item_title: str
 
 
-def _find_tr_by_text(soup, text):
-    text_element = soup.find(string=text)
-    if not text_element:
-        return None
-    return text_element.find_parent("tr")
-
-
-def _extract_return_date(soup) -> str:
-    """Extract return date from the HTML."""
-    return_text_tr = _find_tr_by_text(soup, "Rückgabe bis:")
-
-    if not return_text_tr:
-        raise ValueError("Could not find return date in the provided HTML.")
-
-    sep_tr = return_text_tr.find_next_sibling("tr")
-    if not sep_tr:
-        raise ValueError("Could not find separator row after return date.")
-
-    return_date_tr = sep_tr.find_next_sibling("tr")
-
-    if not return_date_tr:
-        raise ValueError("Could not find return date value row.")
-
-    return return_date_tr.text.strip()
-
-
-def _extract_pickup_location(soup) -> str:
-    """Extract pickup location from the HTML."""
-    location_tr = _find_tr_by_text(soup, "Abgabestandort")
-    if not location_tr:
-        raise ValueError("Could not find pickup location label in the provided HTML.")
-
-    next_tr = location_tr.find_next_sibling("tr")
-    if not next_tr:
-        raise ValueError("Could not find row after pickup location label.")
-
-    location_value_tr = next_tr.find_next_sibling("tr")
-    if not location_value_tr:
-        raise ValueError("Could not find pickup location value row.")
-
-    return location_value_tr.text.strip()
-
-
-def _extract_item_title(soup) -> str:
-    """Extract item title from the HTML."""
-    anzahl_tr = _find_tr_by_text(soup, re.compile("""^Anzahl:"""))
-    if not anzahl_tr:
-        raise ValueError("Could not find 'Anzahl' row in the provided HTML.")
-
-    prev_tr = anzahl_tr.find_previous_sibling("tr")
-    if not prev_tr:
-        raise ValueError("Could not find row before 'Anzahl' row.")
-
-    title_tr = prev_tr.find_previous_sibling("tr")
-    if not title_tr:
-        raise ValueError("Could not find item title row.")
-
-    return title_tr.text.strip()
-
-
-def _extract_order_number(soup) -> str:
-    """Extract order number from the HTML."""
-    order_number_element = soup.find(string=re.compile("^Bestellnummer"))
-    if not order_number_element:
-        raise ValueError("Could not find order number in the provided HTML.")
-
-    parts = order_number_element.split(" ")
-    if len(parts) < 2:
-        raise ValueError("Order number format is not as expected.")
-
-    return parts[1].strip()
-
-
-def parse_return_info(html: str) -> ReturnInfo:
-    soup = BeautifulSoup(html, "html.parser")
+RETURN_RULES = RuleSet(
+    [
+        # label, separator row, value
+        RowRule("return_date", "Rückgabe bis:", offset=2),
+        RowRule(
+            "order_number",
+            re.compile("^Bestellnummer"),
+            cleanup=match_group(re.compile(r"Bestellnummer\s+(\S+)")),
+        ),
+        RowRule("pickup_location", "Abgabestandort", offset=2),
+        # title, separator row, "Anzahl: 1"
+        RowRule(
+            "item_title",
+            re.compile("^Anzahl:"),
+            offset=2,
+            direction=Direction.PREVIOUS,
+        ),
+    ],
+    # from the order number to the item quantity
+    region=Region("Bestellnummer", "Anzahl:"),
+)
+
+# Fingerprints (shared.html_fingerprint) of the known return mail layouts
+RETURN_TEMPLATES: TemplateRegistry[RuleSet] = TemplateRegistry(
+    "amazon_return", {"ad9946731a62f76120e7b5d38d51674043acaaaf": RETURN_RULES}
+)
+
+
+def parse_return_info(
+    html: str, backend: str | None = None, trim: bool = True
+) -> ReturnInfo:
+    return _return_info(RETURN_RULES.parse(html, backend, trim=trim))
+
+
+def parse_known_return_info(html: str, backend: str | None = None) -> ReturnInfo:
+    """
+    Parse a return email with the rules of its template.
+
+    A mail with an unknown layout is rejected from its fingerprint with an
+    UnknownTemplateError, before it is parsed.
+    """
+    rules = RETURN_TEMPLATES.lookup(html)
+    return _return_info(rules.parse(html, backend))
+
+
+def _return_info(values: dict[str, str | None]) -> ReturnInfo:
+    missing = [name for name, value in values.items() if value is None]
+    if missing:
+        raise ValueError(f"Could not find {', '.join(missing)} in the provided HTML.")
+
+    return ReturnInfo(**values)  # type: ignore
+
+
+def iter_parse_many(
+    htmls: Iterable[str], workers: int | None = None, backend: str | None = None
+) -> Iterator[ParseResult[ReturnInfo]]:
+    """
+    Parse return emails on several processes and yield the results in input order.
+
+    Memory stays bounded, so it can be fed a generator over a long backfill.
+    Emails that cannot be parsed yield a result with `error` set.
+    """
+    return iter_parse_batch(
+        partial(parse_return_info, backend=backend), htmls, workers=workers
+    )
 
-    return_date = _extract_return_date(soup)
-    order_number = _extract_order_number(soup)
-    pickup_location = _extract_pickup_location(soup)
-    item_title = _extract_item_title(soup)
 
-    return ReturnInfo(
-        return_date=return_date,
-        order_number=order_number,
-        pickup_location=pickup_location,
-        item_title=item_title,
-    )
+def parse_many(
+    htmls: Iterable[str], workers: int | None = None, backend: str | None = None
+) -> list[ParseResult[ReturnInfo]]:
+    """Parse return emails on several processes, see `iter_parse_many`."""
+    return list(iter_parse_many(htmls, workers, backend=backend))
@@ -4,6 +4,7 @@ import azure.functions as func
 
 from Infrastructure.google_task.azure_helper import (
     TaskListType,
+    batch_task_events,
     create_task_output_event,
     task_output_binding,
 )
@@ -100,11 +101,12 @@ def skeleton_soldier_update(
                     title=f"SkeletonSoldier {chapter.title}",
                     notes="https://demonicscans.org/manga/Skeleton-Soldier",
                     tasklist=TaskListType.MANGA,
+                    dedupe_key=f"manga:SkeletonSoldier:{chapter.title}",
                 )
             )
 
         if tasks:
-            taskOutput.set(tasks)  # type: ignore
+            taskOutput.set(batch_task_events(tasks))  # type: ignore
 
     except Exception as e:
         logging.error(str(e))
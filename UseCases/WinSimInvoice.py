@@ -1,103 +1,57 @@
 import logging
 
-import azure.functions as func
+from UseCases.MailPoller import MailOutputs, mail_dispatcher
+from shared.GoogleServices import google_clients
+from shared.GoogleServices.gmail import MailMessage, MessageFilter
 
-from Infrastructure.telegram.azure_helper import (
-    create_telegram_output_event,
-    telegram_output_binding,
+WINSIM_INVOICE_FILTER = MessageFilter(
+    sender="no-reply@winsim.de", subject="Ihre winSIM-Rechnung"
 )
-from function_app import app
-from shared.AzureHelper.google_credentials import load_gcloud_credentials
-from shared.GoogleServices import GmailService, GDriveService
 
+# Google Drive folder the invoices are uploaded to
+DRIVE_FOLDER_ID = "1VGX5Wt8D3huZm3vVemjI3C6zz6W38PJr"
 
-@app.timer_trigger(
-    schedule="30 1 * * *", arg_name="mytimer", run_on_startup=False, use_monitor=False
-)
-@telegram_output_binding()
-def check_winsim_invoices(
-    mytimer: func.TimerRequest, telegramOutput: func.Out[func.EventGridOutputEvent]
-):
-    """
-    Time-triggered Azure Function that:
-    1. Checks for new WinSIM invoice emails
-    2. Downloads any PDF attachments
-    3. Uploads them to a specified Google Drive folder
 
+@mail_dispatcher.route("winsim_invoice", WINSIM_INVOICE_FILTER)
+def check_winsim_invoices(mail: MailMessage, outputs: MailOutputs) -> dict:
     """
-    try:
-        # Load credentials and initialize services
-        credentials = load_gcloud_credentials()
-        gmail_service = GmailService(credentials)
-        drive_service = GDriveService(credentials)
-
-        # Get the Drive folder ID
-        drive_folder_id = "1VGX5Wt8D3huZm3vVemjI3C6zz6W38PJr"
+    Mail handler that:
+    1. Downloads the PDF attachments of a WinSIM invoice email
+    2. Uploads them to a specified Google Drive folder
 
-        # Get WinSIM invoice message IDs from the last hour
-        message_ids = gmail_service.get_winsim_invoice_messages(hours=24)
-
-        if not message_ids:
-            logging.info("No new WinSIM invoice emails found")
-            return
-
-        logging.info(f"Found {len(message_ids)} WinSIM invoice emails")
-        telegramOutput.set(
-            create_telegram_output_event(
-                message=f"Found {len(message_ids)} WinSIM invoice emails"
+    Raises if an attachment could not be downloaded or uploaded, after trying
+    the other attachments, so the dispatcher reports the mail and the next poll
+    handles it again.
+    """
+    logging.info(f"Found WinSIM invoice email {mail.id}")
+    outputs.telegram.add("Found a WinSIM invoice email")
+
+    gmail_service = google_clients.gmail()
+    drive_service = google_clients.drive()
+
+    # Download PDF attachments, each is uploaded as soon as it arrives
+    results = []
+    failed = []
+    for pdf_file in gmail_service.iter_pdf_attachments_to_ram(mail.id):
+        try:
+            file_id = drive_service.upload_file_directly(
+                pdf_file.content,
+                pdf_file.filename,
+                DRIVE_FOLDER_ID,
+                mime_type="application/pdf",
             )
-        )
 
-        # Process each message
-        results = []
-        for msg_id in message_ids:
-            try:
-                # Download PDF attachments
-                pdf_files_in_memory = gmail_service.download_pdf_attachments_to_ram(
-                    msg_id
-                )
-
-                # Upload each PDF to Google Drive
-                for pdf_file in pdf_files_in_memory:
-
-                    try:
-                        # Upload to Drive
-                        file_id = drive_service.upload_file_directly(
-                            pdf_file.content,
-                            pdf_file.filename,
-                            drive_folder_id,
-                            mime_type="application/pdf",
-                        )
-
-                        results.append(
-                            {
-                                "message_id": msg_id,
-                                "pdf_filename": pdf_file,
-                                "drive_file_id": file_id,
-                                "status": "success",
-                            }
-                        )
-
-                    except Exception as upload_error:
-                        results.append(
-                            {
-                                "message_id": msg_id,
-                                "pdf_filename": pdf_file,
-                                "error": str(upload_error),
-                                "status": "upload_failed",
-                            }
-                        )
+            results.append(
+                {
+                    "pdf_filename": pdf_file.filename,
+                    "drive_file_id": file_id,
+                    "status": "success",
+                }
+            )
 
-            except Exception as msg_error:
-                results.append(
-                    {
-                        "message_id": msg_id,
-                        "error": str(msg_error),
-                        "status": "processing_failed",
-                    }
-                )
+        except Exception as upload_error:
+            failed.append(f"{pdf_file.filename}: {upload_error}")
 
-    except Exception as e:
-        error_msg = f"Error processing WinSIM invoices: {str(e)}"
-        logging.error(error_msg)
-        telegram_output_binding.set(create_telegram_output_event(message=error_msg))
+    if failed:
+        raise RuntimeError(f"Upload of WinSIM invoices failed: {', '.join(failed)}")
+    return {"uploads": results}
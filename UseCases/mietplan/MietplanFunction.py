@@ -8,7 +8,7 @@ import requests
 from google.oauth2.credentials import Credentials
 
 from Infrastructure.telegram.azure_helper import (
-    create_telegram_output_event,
+    TelegramDigest,
     telegram_output_binding,
 )
 from UseCases.mietplan.session_handling import (
@@ -19,9 +19,8 @@ from UseCases.mietplan.session_handling import (
     walk_from_top_folder,
 )
 from function_app import app
-from shared.AzureHelper.google_credentials import load_gcloud_credentials
-from shared.AzureHelper.secrets import get_secret
-from shared.GoogleServices import GDriveService
+from shared.AzureHelper.secrets import get_secret, prefetch, secret_cache_stats
+from shared.GoogleServices import google_clients
 
 MIETPLAN_GDRIVE_FOLDER_ID = "19gdVV_DMtdQU0xi7TgfKJCRRc4c7m0fd"
 
@@ -33,9 +32,13 @@ MIETPLAN_GDRIVE_FOLDER_ID = "19gdVV_DMtdQU0xi7TgfKJCRRc4c7m0fd"
 def mietplan(
     myTimer: func.TimerRequest, telegramOutput: func.Out[func.EventGridOutputEvent]
 ) -> None:
+    # one message for all new files instead of one per file
+    digest = TelegramDigest("mietplan")
     try:
-        credentials = load_gcloud_credentials()
-        drive_service = GDriveService(credentials)
+        prefetch(["GcloudCredentials", "MietplanUsername", "MietplanPassword"])
+        logging.info(f"Secret cache: {secret_cache_stats()}")
+
+        drive_service = google_clients.drive()
         username = get_secret("MietplanUsername")
         password = get_secret("MietplanPassword")
 
@@ -45,7 +48,6 @@ def mietplan(
 
         login(session, username, password)
 
-        new_files = []
         latest_file = None
         for folder in walk_from_top_folder(session, MAIN_FOLDER_ID):
             logging.info(f"Folder: {folder.path}")
@@ -69,19 +71,12 @@ def mietplan(
                     drive_service.upload_file_directly(
                         file_in_ram, file.name, upload_folder_id
                     )
-                    new_files.append(
-                        create_telegram_output_event(
-                            message=f"New mietplan file {file.name} at {folder.path}"
-                        )
-                    )
+                    digest.add(f"New mietplan file {file.name} at {folder.path}")
 
         logging.info(f"Latest file: {latest_file}")
-        if new_files:
-            telegramOutput.set(new_files)  # type: ignore
     except Exception as e:
         logging.error(str(e))
-        telegramOutput.set(
-            create_telegram_output_event(
-                message=f"Error in mietplan function: {str(e)}"
-            )
-        )
+        digest.add(f"Error in mietplan function: {str(e)}")
+
+    if digest:
+        telegramOutput.set(digest.flush())  # type: ignore
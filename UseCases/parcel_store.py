@@ -0,0 +1,204 @@
+"""Local store of the parsed DHL pickups and Amazon returns."""
+
+import re
+import threading
+from dataclasses import astuple
+from datetime import date, datetime
+from typing import Iterable
+
+from UseCases.DeliveryTracker.parsing import GERMAN_MONTHS, EmailData
+from UseCases.ReturnTracker.parsing import ReturnInfo
+from shared.AzureHelper.local_db import LocalDb
+
+# e.g. "5. Juli 2025"
+RETURN_DATE_PATTERN = re.compile(r"(\d+)\.\s*(\w+)\s+(\d{4})")
+
+SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS shipments ("
+    " message_id TEXT PRIMARY KEY,"
+    " tracking_number TEXT,"
+    " pickup_location TEXT NOT NULL,"
+    " due_date TEXT,"
+    " preview TEXT NOT NULL,"
+    " due_on TEXT,"
+    " stored_at REAL NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS shipments_tracking_number"
+    " ON shipments (tracking_number)",
+    "CREATE INDEX IF NOT EXISTS shipments_due_on ON shipments (due_on)",
+    "CREATE TABLE IF NOT EXISTS returns ("
+    " message_id TEXT PRIMARY KEY,"
+    " return_date TEXT NOT NULL,"
+    " order_number TEXT NOT NULL,"
+    " pickup_location TEXT NOT NULL,"
+    " item_title TEXT NOT NULL,"
+    " due_on TEXT,"
+    " stored_at REAL NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS returns_order_number ON returns (order_number)",
+    "CREATE INDEX IF NOT EXISTS returns_due_on ON returns (due_on)",
+]
+
+
+def _shipment_due_on(shipment: EmailData) -> str | None:
+    # EmailData.due_date is formatted as DD.MM.YYYY
+    if not shipment.due_date:
+        return None
+    try:
+        return datetime.strptime(shipment.due_date, "%d.%m.%Y").date().isoformat()
+    except ValueError:
+        return None
+
+
+def _return_due_on(return_info: ReturnInfo) -> str | None:
+    match = RETURN_DATE_PATTERN.search(return_info.return_date)
+    month = GERMAN_MONTHS.get(match.group(2)) if match else None
+    if not match or not month:
+        return None
+    try:
+        return date(int(match.group(3)), month, int(match.group(1))).isoformat()
+    except ValueError:
+        return None
+
+
+class ParcelStore:
+    """
+    Parsed DHL pickups and Amazon returns, keyed by the Gmail message they came from.
+
+    Lives in a SQLite file in the temp directory of the worker, indexed on the
+    tracking number, the order number and the due date, so questions like "is
+    this parcel already tracked?" or "what is due this week?" do not need a
+    Gmail search and a reparse. Storing a message again replaces its row.
+    """
+
+    def __init__(self, db_name: str = "parcels"):
+        """
+        Args:
+            db_name: Name of the SQLite database in the temp directory
+        """
+        self._db = LocalDb(db_name, SCHEMA)
+        self._lock = threading.Lock()
+
+    def add_shipments(self, shipments: Iterable[tuple[str, EmailData]]) -> int:
+        """
+        Store parsed DHL pickup mails in one transaction.
+
+        Args:
+            shipments: (Gmail message ID, parsed mail) pairs
+
+        Returns:
+            int: Number of stored shipments
+        """
+        now = datetime.now().timestamp()
+        rows = [
+            (message_id, *astuple(shipment), _shipment_due_on(shipment), now)
+            for message_id, shipment in shipments
+        ]
+        if rows:
+            with self._lock, self._db():
+                self._db().executemany(
+                    "INSERT OR REPLACE INTO shipments (message_id, tracking_number,"
+                    " pickup_location, due_date, preview, due_on, stored_at)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    rows,
+                )
+        return len(rows)
+
+    def add_returns(self, returns: Iterable[tuple[str, ReturnInfo]]) -> int:
+        """
+        Store parsed Amazon return mails in one transaction.
+
+        Args:
+            returns: (Gmail message ID, parsed mail) pairs
+
+        Returns:
+            int: Number of stored returns
+        """
+        now = datetime.now().timestamp()
+        rows = [
+            (message_id, *astuple(return_info), _return_due_on(return_info), now)
+            for message_id, return_info in returns
+        ]
+        if rows:
+            with self._lock, self._db():
+                self._db().executemany(
+                    "INSERT OR REPLACE INTO returns (message_id, return_date,"
+                    " order_number, pickup_location, item_title, due_on, stored_at)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    rows,
+                )
+        return len(rows)
+
+    def is_tracked(self, tracking_number: str) -> bool:
+        """Whether a pickup mail with this tracking number was stored."""
+        with self._lock:
+            row = (
+                self._db()
+                .execute(
+                    "SELECT 1 FROM shipments WHERE tracking_number = ? LIMIT 1",
+                    (tracking_number,),
+                )
+                .fetchone()
+            )
+            return row is not None
+
+    def has_return(self, order_number: str) -> bool:
+        """Whether a return mail of this order was stored."""
+        with self._lock:
+            row = (
+                self._db()
+                .execute(
+                    "SELECT 1 FROM returns WHERE order_number = ? LIMIT 1",
+                    (order_number,),
+                )
+                .fetchone()
+            )
+            return row is not None
+
+    def shipment(self, message_id: str) -> EmailData | None:
+        """Get the shipment parsed from a Gmail message, None if it was not stored."""
+        with self._lock:
+            row = (
+                self._db()
+                .execute(
+                    "SELECT tracking_number, pickup_location, due_date, preview"
+                    " FROM shipments WHERE message_id = ?",
+                    (message_id,),
+                )
+                .fetchone()
+            )
+            return EmailData(*row) if row else None
+
+    def shipments_due(self, start: date, end: date) -> list[EmailData]:
+        """
+        Get the pickups due in [start, end], ordered by due date.
+
+        Shipments whose due date could not be parsed are never returned.
+        """
+        with self._lock:
+            rows = (
+                self._db()
+                .execute(
+                    "SELECT tracking_number, pickup_location, due_date, preview"
+                    " FROM shipments WHERE due_on BETWEEN ? AND ? ORDER BY due_on",
+                    (start.isoformat(), end.isoformat()),
+                )
+                .fetchall()
+            )
+            return [EmailData(*row) for row in rows]
+
+    def returns_due(self, start: date, end: date) -> list[ReturnInfo]:
+        """
+        Get the returns due in [start, end], ordered by due date.
+
+        Returns whose date could not be parsed are never returned.
+        """
+        with self._lock:
+            rows = (
+                self._db()
+                .execute(
+                    "SELECT return_date, order_number, pickup_location, item_title"
+                    " FROM returns WHERE due_on BETWEEN ? AND ? ORDER BY due_on",
+                    (start.isoformat(), end.isoformat()),
+                )
+                .fetchall()
+            )
+            return [ReturnInfo(*row) for row in rows]
@@ -0,0 +1,114 @@
+"""
+Field extraction of DHL pickup emails: the old multi-pass walk against the single pass.
+
+"multi-pass" is the previous parse_dhl_pickup_email_html: soup.get_text() over the
+whole document, regexes compiled per message, datetime.now() per message and
+separate soup.find/sibling walks for address and preview. "single-pass" evaluates
+DHL_PICKUP_RULES in one pass, like parse_known_dhl_pickup_email_html without the
+template lookup. Both run on already parsed documents, so only the extraction is
+measured; the html parse itself is the same for both.
+
+    python -m benchmarks.dhl_single_pass --copies 200
+"""
+
+import argparse
+import re
+import time
+from datetime import datetime
+
+from benchmarks.fake_google_api import REPO_ROOT
+from UseCases.DeliveryTracker.parsing import (
+    DHL_PICKUP_RULES,
+    GERMAN_MONTHS,
+    EmailData,
+    _email_data,
+)
+from shared.html_backend import make_soup
+
+
+def _find_address(soup) -> str:
+    abholort_span = soup.find("span", string=re.compile(r"ABHOLORT"))
+    if not abholort_span:
+        return "Address not found"
+    abholort_tr = abholort_span.find_parent("tr")
+    location_tr = abholort_tr.find_next_sibling("tr").find_next_sibling("tr")
+    address_tr = location_tr.find_next_sibling("tr")
+    return f"{location_tr.get_text(strip=True)}, {address_tr.get_text(strip=True)}"
+
+
+def _find_preview(soup) -> str:
+    artikel_span = soup.find(
+        "span", class_="rio_15_grey", string=re.compile(r"\bARTIKEL\b")
+    )
+    if not artikel_span:
+        return "Unknown item"
+    next_tr = artikel_span.find_parent("tr").find_next_sibling("tr")
+    item_span = next_tr.find("span", class_="rio_15_heavy_black")
+    return item_span.decode_contents(formatter="html").strip()
+
+
+def _multi_pass(soup) -> EmailData:
+    text_content = soup.get_text()
+
+    tracking_match = re.search(r"Tracking-Nummer lautet:\s*([A-Z0-9]+)", text_content)
+    tracking_number = str(tracking_match.group(1)) if tracking_match else None
+
+    location_text = _find_address(soup)
+
+    due_date_match = re.search(
+        r"ABHOLUNG BIS ZUM\s*\n\s*([^,\n]+),\s*(\d+\.\s*([^\n]+))", text_content
+    )
+    due_date = None
+    if due_date_match:
+        day_str = due_date_match.group(2).strip()
+        day = int(re.search(r"(\d+)\.", day_str).group(1))  # type: ignore
+        month_name = re.search(r"\d+\.\s*(\w+)", day_str).group(1).strip()  # type: ignore
+        month = GERMAN_MONTHS.get(month_name)
+        if month:
+            current_date = datetime.now()
+            date_obj = datetime(current_date.year, month, day)
+            if date_obj < current_date:
+                date_obj = date_obj.replace(year=current_date.year + 1)
+            due_date = date_obj.strftime("%d.%m.%Y")
+
+    return EmailData(
+        tracking_number=tracking_number,
+        pickup_location=location_text,
+        due_date=due_date,
+        preview=_find_preview(soup),
+    )
+
+
+def _single_pass(soup, now: datetime) -> EmailData:
+    return _email_data(DHL_PICKUP_RULES.evaluate(soup), now)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--copies", type=int, default=200)
+    args = parser.parse_args()
+
+    html = (REPO_ROOT / "tests/test_delivery_tracker/dhl_test.html").read_text()
+    corpus = [make_soup(html) for _ in range(args.copies)]
+
+    now = datetime.now()
+    assert _multi_pass(corpus[0]) == _single_pass(corpus[0], now)
+
+    timings = {}
+    for name, extract in [
+        ("multi-pass", _multi_pass),
+        ("single-pass", lambda soup: _single_pass(soup, now)),
+    ]:
+        start = time.perf_counter()
+        for soup in corpus:
+            extract(soup)
+        timings[name] = time.perf_counter() - start
+
+    print(f"{'extractor':>12} {'ms/doc':>8}")
+    for name, elapsed in timings.items():
+        print(f"{name:>12} {elapsed / len(corpus) * 1000:>8.3f}")
+    print(f"speedup: {timings['multi-pass'] / timings['single-pass']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+"""
+Local fake of the Google REST endpoints used by the services in shared/GoogleServices.
+
+Only meant for benchmarks: it serves canned messages from memory, stores the
+created tasks, counts the HTTP round trips it receives and can inject a fixed
+latency per request.
+"""
+
+import base64
+import json
+import re
+import threading
+import time
+from email.parser import Parser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+import googleapiclient.discovery_cache
+import httplib2
+from googleapiclient.discovery import build_from_document
+
+REPO_ROOT = Path(__file__).parent.parent
+
+_PROFILE = re.compile(r"^/gmail/v1/users/me/profile$")
+_MESSAGES_LIST = re.compile(r"^/gmail/v1/users/me/messages$")
+_MESSAGE_GET = re.compile(r"^/gmail/v1/users/me/messages/([^/]+)$")
+_ATTACHMENT_GET = re.compile(
+    r"^/gmail/v1/users/me/messages/([^/]+)/attachments/([^/]+)$"
+)
+_TASK_INSERT = re.compile(r"^/tasks/v1/lists/([^/]+)/tasks$")
+
+
+def make_html_message(message_id: str, html: str) -> dict:
+    """Build a Gmail API message resource (format=full) with a single html part."""
+    data = base64.urlsafe_b64encode(html.encode("utf-8")).decode("ascii")
+    return {
+        "id": message_id,
+        "threadId": message_id,
+        "historyId": "1",
+        "snippet": html[:100],
+        "payload": {
+            "mimeType": "multipart/alternative",
+            "headers": [
+                {"name": "From", "value": "order-update@amazon.de"},
+                {"name": "Subject", "value": "Ihr Paket kann bei DHL abgeholt werden"},
+                {"name": "Date", "value": "Fri, 23 May 2025 10:00:00 +0200"},
+            ],
+            "body": {"size": 0},
+            "parts": [
+                {
+                    "partId": "0",
+                    "mimeType": "text/html",
+                    "filename": "",
+                    "body": {"size": len(html), "data": data},
+                }
+            ],
+        },
+    }
+
+
+def make_attachment_message(message_id: str, attachments: dict[str, str]) -> dict:
+    """Build a Gmail API message resource with one part per attachment ID -> filename."""
+    return {
+        "id": message_id,
+        "threadId": message_id,
+        "payload": {
+            "mimeType": "multipart/mixed",
+            "body": {"size": 0},
+            "parts": [
+                {
+                    "partId": str(i),
+                    "mimeType": "application/pdf",
+                    "filename": filename,
+                    "body": {"attachmentId": attachment_id, "size": 0},
+                }
+                for i, (attachment_id, filename) in enumerate(attachments.items())
+            ],
+        },
+    }
+
+
+class FakeGoogleApi:
+    """In-memory Google API server listening on 127.0.0.1."""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.messages: dict[str, dict] = {}
+        self.attachments: dict[str, bytes] = {}
+        # tasklist ID -> created tasks
+        self.tasks: dict[str, list[dict]] = {}
+        self.http_requests = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def __enter__(self) -> "FakeGoogleApi":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def reset_counters(self) -> None:
+        with self._lock:
+            self.http_requests = 0
+
+    def build_service(self, api: str, version: str):
+        """Build a googleapiclient resource that talks to this fake server."""
+        documents = Path(googleapiclient.discovery_cache.__file__).parent / "documents"
+        document = json.loads((documents / f"{api}.{version}.json").read_text())
+        document["rootUrl"] = self.base_url
+        return build_from_document(document, http=httplib2.Http())
+
+    # request handling
+
+    def handle(self, method: str, path: str, body: str) -> tuple[int, dict]:
+        """Answer a single (non batch) API call."""
+        url = urlparse(path)
+        query = parse_qs(url.query)
+
+        if method == "GET" and _PROFILE.match(url.path):
+            return 200, {"emailAddress": "me@example.com", "historyId": "1"}
+
+        if method == "GET" and _MESSAGES_LIST.match(url.path):
+            return 200, self._list_messages(query)
+
+        match = _ATTACHMENT_GET.match(url.path)
+        if method == "GET" and match:
+            data = self.attachments.get(match.group(2))
+            if data is None:
+                return 404, {"error": {"code": 404, "message": "Not Found"}}
+            encoded = base64.urlsafe_b64encode(data).decode("ascii")
+            return 200, {"size": len(data), "data": encoded}
+
+        match = _MESSAGE_GET.match(url.path)
+        if method == "GET" and match:
+            message = self.messages.get(match.group(1))
+            if message is None:
+                return 404, {"error": {"code": 404, "message": "Not Found"}}
+            return 200, message
+
+        match = _TASK_INSERT.match(url.path)
+        if method == "POST" and match:
+            return 200, self._insert_task(match.group(1), json.loads(body))
+
+        return 404, {"error": {"code": 404, "message": f"No route for {path}"}}
+
+    def _insert_task(self, tasklist: str, task: dict) -> dict:
+        with self._lock:
+            tasks = self.tasks.setdefault(tasklist, [])
+            task = {**task, "id": f"task{len(tasks):05d}", "status": "needsAction"}
+            tasks.append(task)
+        return task
+
+    def _list_messages(self, query: dict[str, list[str]]) -> dict:
+        ids = list(self.messages)
+        page_size = int(query.get("maxResults", ["100"])[0])
+        start = int(query.get("pageToken", ["0"])[0])
+        page = ids[start : start + page_size]
+        response: dict = {
+            "messages": [
+                {"id": i, "threadId": self.messages[i]["threadId"]} for i in page
+            ],
+            "resultSizeEstimate": len(ids),
+        }
+        if start + page_size < len(ids):
+            response["nextPageToken"] = str(start + page_size)
+        return response
+
+    def handle_batch(self, content_type: str, body: str) -> tuple[str, str]:
+        """Answer a multipart/mixed batch request, returning (content_type, body)."""
+        envelope = Parser().parsestr(f"Content-Type: {content_type}\r\n\r\n{body}")
+        boundary = "batch_fake_google_api"
+        parts = []
+        for part in envelope.get_payload():
+            request_line, _, rest = part.get_payload().partition("\n")
+            method, path, _ = request_line.split(" ", 2)
+            _, _, inner_body = rest.partition("\n\n")
+            status, payload = self.handle(method, path, inner_body)
+            parts.append(
+                f"--{boundary}\r\n"
+                "Content-Type: application/http\r\n"
+                f"Content-ID: <response-{part['Content-ID'][1:]}\r\n"
+                "\r\n"
+                f"HTTP/1.1 {status} {'OK' if status < 300 else 'Error'}\r\n"
+                "Content-Type: application/json; charset=UTF-8\r\n"
+                "\r\n"
+                f"{json.dumps(payload)}\r\n"
+            )
+        parts.append(f"--{boundary}--\r\n")
+        return f"multipart/mixed; boundary={boundary}", "".join(parts)
+
+    def _handler_class(self):
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # answers are written in two parts, Nagle would hold back the second
+            disable_nagle_algorithm = True
+
+            def log_message(self, format, *args):
+                pass
+
+            def _respond(self, status: int, content_type: str, body: str):
+                data = body.encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _dispatch(self, method: str):
+                with api._lock:
+                    api.http_requests += 1
+                if api.latency:
+                    time.sleep(api.latency)
+
+                length = int(self.headers.get("Content-Length", 0))
+                body = self.rfile.read(length).decode("utf-8") if length else ""
+
+                if urlparse(self.path).path == "/batch":
+                    content_type, payload = api.handle_batch(
+                        self.headers["Content-Type"], body
+                    )
+                    self._respond(200, content_type, payload)
+                    return
+
+                status, payload = api.handle(method, self.path, body)
+                self._respond(status, "application/json", json.dumps(payload))
+
+            def do_GET(self):
+                self._dispatch("GET")
+
+            def do_POST(self):
+                self._dispatch("POST")
+
+        return Handler
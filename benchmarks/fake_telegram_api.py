@@ -0,0 +1,175 @@
+"""
+Local fake of the Telegram Bot API endpoints used by Infrastructure/telegram.
+
+Only meant for benchmarks and load tests: it answers getMe and sendMessage,
+records the delivered messages and enforces a global and a per chat rate
+limit like Telegram's flood control, answering 429 with retry_after.
+"""
+
+import json
+import threading
+import time
+from collections import defaultdict, deque
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+import telegram
+from telegram.request import HTTPXRequest
+
+FAKE_TOKEN = "123456:fake-token"
+
+
+class FakeTelegramApi:
+    """In-memory Telegram Bot API server listening on 127.0.0.1."""
+
+    def __init__(
+        self,
+        per_chat_limit: int = 1,
+        global_limit: int = 30,
+        retry_after: int = 1,
+        latency: float = 0.0,
+    ):
+        """
+        Args:
+            per_chat_limit: Messages per chat accepted in any one second window
+            global_limit: Messages accepted in any one second window
+            retry_after: Seconds announced in the 429 answers
+            latency: Seconds added to every request
+        """
+        self.per_chat_limit = per_chat_limit
+        self.global_limit = global_limit
+        self.retry_after = retry_after
+        self.latency = latency
+        self.delivered: list[tuple[int, str]] = []
+        self.rejected = 0
+        self._sent_at: deque[float] = deque()
+        self._chat_sent_at: dict[int, deque[float]] = defaultdict(deque)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/bot"
+
+    def __enter__(self) -> "FakeTelegramApi":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def make_bot(self, token: str = FAKE_TOKEN) -> telegram.Bot:
+        """Build a bot that talks to this fake server."""
+        return telegram.Bot(
+            token,
+            base_url=self.base_url,
+            request=HTTPXRequest(connection_pool_size=16),
+        )
+
+    # request handling
+
+    def _allowed(self, chat_id: int) -> bool:
+        now = time.monotonic()
+        chat_sent_at = self._chat_sent_at[chat_id]
+        for sent_at in (self._sent_at, chat_sent_at):
+            while sent_at and sent_at[0] <= now - 1:
+                sent_at.popleft()
+        if (
+            len(self._sent_at) >= self.global_limit
+            or len(chat_sent_at) >= self.per_chat_limit
+        ):
+            return False
+        self._sent_at.append(now)
+        chat_sent_at.append(now)
+        return True
+
+    def handle(self, method: str, params: dict) -> dict:
+        if method == "getMe":
+            return {
+                "ok": True,
+                "result": {
+                    "id": 1,
+                    "is_bot": True,
+                    "first_name": "Fake",
+                    "username": "fake_bot",
+                },
+            }
+
+        if method == "sendMessage":
+            chat_id = int(params["chat_id"])
+            with self._lock:
+                if not self._allowed(chat_id):
+                    self.rejected += 1
+                    return {
+                        "ok": False,
+                        "error_code": 429,
+                        "description": (
+                            f"Too Many Requests: retry after {self.retry_after}"
+                        ),
+                        "parameters": {"retry_after": self.retry_after},
+                    }
+                self.delivered.append((chat_id, params["text"]))
+                message_id = len(self.delivered)
+            return {
+                "ok": True,
+                "result": {
+                    "message_id": message_id,
+                    "date": int(time.time()),
+                    "chat": {"id": chat_id, "type": "private"},
+                    "text": params["text"],
+                },
+            }
+
+        return {"ok": False, "error_code": 404, "description": "Not Found"}
+
+    def _handler_class(self):
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def _params(self) -> dict:
+                length = int(self.headers.get("Content-Length", 0))
+                body = self.rfile.read(length) if length else b""
+                content_type = self.headers.get("Content-Type", "")
+                if content_type.startswith("application/json"):
+                    return json.loads(body or b"{}")
+                if content_type.startswith("multipart/form-data"):
+                    message = BytesParser(policy=HTTP).parsebytes(
+                        f"Content-Type: {content_type}\r\n\r\n".encode() + body
+                    )
+                    return {
+                        part.get_param("name", header="content-disposition"): (
+                            part.get_content()
+                        )
+                        for part in message.iter_parts()
+                    }
+                return {
+                    key: values[0]
+                    for key, values in parse_qs(body.decode("utf-8")).items()
+                }
+
+            def do_POST(self):
+                if api.latency:
+                    time.sleep(api.latency)
+                method = self.path.rsplit("/", 1)[-1]
+                payload = api.handle(method, self._params())
+
+                status = 200 if payload["ok"] else payload["error_code"]
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        return Handler
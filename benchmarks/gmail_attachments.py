@@ -0,0 +1,66 @@
+"""
+Sequential vs concurrent PDF attachment download in GmailService.iter_pdf_attachments.
+
+Runs against a local fake Gmail endpoint that adds a fixed latency to every request:
+
+    python -m benchmarks.gmail_attachments --latency 0.1 --attachments 8
+"""
+
+import argparse
+import time
+
+import httplib2
+
+from benchmarks.fake_google_api import FakeGoogleApi, make_attachment_message
+from shared.GoogleServices.gmail.service import GmailService
+
+
+class FakeGmailService(GmailService):
+    def _new_http(self):
+        # the fake endpoint needs no authorization
+        return httplib2.Http()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--latency", type=float, default=0.1)
+    parser.add_argument("--attachments", type=int, default=8)
+    parser.add_argument("--size-kb", type=int, default=200)
+    args = parser.parse_args()
+
+    with FakeGoogleApi(latency=args.latency) as api:
+        attachment_ids = {
+            f"att{i}": f"invoice_{i}.pdf" for i in range(args.attachments)
+        }
+        api.messages["msg"] = make_attachment_message("msg", attachment_ids)
+        # the same attachment listed twice must only be downloaded once
+        parts = api.messages["msg"]["payload"]["parts"]
+        parts.append(dict(parts[0]))
+        for attachment_id in attachment_ids:
+            api.attachments[attachment_id] = b"%PDF" + b"0" * args.size_kb * 1024
+
+        print(
+            f"{'workers':>7} {'requests':>8} {'first ms':>9} {'total ms':>9} {'att/s':>7}"
+        )
+        for workers in [1, 2, 4, 8]:
+            gmail_service = FakeGmailService(credentials=None)  # type: ignore
+            gmail_service.service = api.build_service("gmail", "v1")
+            api.reset_counters()
+
+            start = time.perf_counter()
+            first = None
+            count = 0
+            for _ in gmail_service.iter_pdf_attachments("msg", max_workers=workers):
+                first = first or time.perf_counter() - start
+                count += 1
+            total = time.perf_counter() - start
+
+            assert count == args.attachments
+            print(
+                f"{workers:>7} {api.http_requests:>8} {first * 1000:>9.1f} "
+                f"{total * 1000:>9.1f} {count / total:>7.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
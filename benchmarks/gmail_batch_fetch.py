@@ -0,0 +1,57 @@
+"""
+Compare per-message and batched message fetching in GmailService.
+
+Measures GmailService._fetch_messages for a given list of message IDs.
+
+Runs against a local fake Gmail endpoint, so no credentials are needed:
+
+    python -m benchmarks.gmail_batch_fetch --latency 0.02
+"""
+
+import argparse
+import time
+
+from benchmarks.fake_google_api import REPO_ROOT, FakeGoogleApi, make_html_message
+from shared.GoogleServices.gmail.service import GMAIL_BATCH_SIZE, GmailService
+
+MESSAGE_COUNTS = [1, 10, 100, 1000]
+
+
+def _run(api: FakeGoogleApi, batch_size: int | None) -> tuple[float, int]:
+    gmail_service = GmailService(credentials=None)  # type: ignore
+    gmail_service.service = api.build_service("gmail", "v1")
+
+    api.reset_counters()
+    start = time.perf_counter()
+    messages = gmail_service._fetch_messages(list(api.messages), batch_size=batch_size)
+    elapsed = time.perf_counter() - start
+
+    assert len(messages) == len(api.messages)
+    return elapsed, api.http_requests
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--latency", type=float, default=0.0, help="Seconds added to every request"
+    )
+    parser.add_argument("--batch-size", type=int, default=GMAIL_BATCH_SIZE)
+    args = parser.parse_args()
+
+    html = (REPO_ROOT / "tests/test_delivery_tracker/dhl_test.html").read_text()
+
+    print(f"{'messages':>8} {'mode':>10} {'requests':>8} {'seconds':>8} {'msg/s':>8}")
+    for count in MESSAGE_COUNTS:
+        with FakeGoogleApi(latency=args.latency) as api:
+            for i in range(count):
+                api.messages[f"msg{i}"] = make_html_message(f"msg{i}", html)
+
+            for mode, batch_size in [("single", None), ("batched", args.batch_size)]:
+                elapsed, requests = _run(api, batch_size)
+                print(
+                    f"{count:>8} {mode:>10} {requests:>8} {elapsed:>8.3f} {count / elapsed:>8.1f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Per-invocation setup cost of the Google API clients, before and after GoogleClientFactory.
+
+"before" mirrors the old code path: build credentials and call
+googleapiclient.discovery.build for every invocation. "after" asks a warm
+GoogleClientFactory for the same services. The Key Vault lookup and token refresh
+are left out (no network), so the real saving per invocation is larger.
+
+    python -m benchmarks.google_client_setup
+"""
+
+import argparse
+import statistics
+import time
+from datetime import datetime, timedelta
+
+from google.oauth2.credentials import Credentials
+
+from shared.GoogleServices import GoogleClientFactory, GmailService, TaskService
+
+
+def _fake_credentials() -> Credentials:
+    return Credentials(
+        token="token",
+        refresh_token="refresh-token",
+        client_id="client-id",
+        client_secret="client-secret",
+        token_uri="https://oauth2.googleapis.com/token",
+        expiry=datetime.utcnow() + timedelta(hours=1),
+    )
+
+
+def _setup_before():
+    credentials = _fake_credentials()
+    gmail_service = GmailService(credentials)
+    gmail_service.authenticate()
+    task_service = TaskService(credentials)
+    return gmail_service, task_service
+
+
+def _measure(setup, runs: int) -> list[float]:
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        setup()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=50)
+    args = parser.parse_args()
+
+    factory = GoogleClientFactory(load_credentials=_fake_credentials)
+
+    def _setup_after():
+        return factory.gmail(), factory.tasks()
+
+    # the first (cold) call of the factory pays the same as the old path
+    cold = _measure(_setup_after, 1)[0]
+
+    print(f"{'path':>8} {'median ms':>10} {'max ms':>8}")
+    for name, setup in [("before", _setup_before), ("after", _setup_after)]:
+        timings = _measure(setup, args.runs)
+        print(
+            f"{name:>8} {statistics.median(timings) * 1000:>10.3f} {max(timings) * 1000:>8.3f}"
+        )
+    print(f"factory cold start: {cold * 1000:.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Parse time and peak memory of the html mail parsers per HTML backend.
+
+Runs parse_dhl_pickup_email_html and parse_return_info over their test fixtures
+with every installed backend of shared.html_backend. Peak memory is measured
+with tracemalloc, so it only includes allocations made through Python (the tree
+objects BeautifulSoup builds), not memory used inside the C parser itself.
+
+    python -m benchmarks.html_backends --runs 50
+"""
+
+import argparse
+import time
+import tracemalloc
+
+from benchmarks.fake_google_api import REPO_ROOT
+from UseCases.DeliveryTracker.parsing import parse_dhl_pickup_email_html
+from UseCases.ReturnTracker.parsing import parse_return_info
+from shared.html_backend import HTML_BACKENDS, available_backends
+
+DOCUMENTS = [
+    ("dhl", "tests/test_delivery_tracker/dhl_test.html", parse_dhl_pickup_email_html),
+    (
+        "return",
+        "tests/test_return_tracker/amazon_rueckgabe_test.html",
+        parse_return_info,
+    ),
+]
+
+
+def _ms_per_document(parse, html: str, backend: str, runs: int) -> float:
+    start = time.perf_counter()
+    for _ in range(runs):
+        parse(html, backend=backend)
+    return (time.perf_counter() - start) / runs * 1000
+
+
+def _peak_kib(parse, html: str, backend: str) -> float:
+    tracemalloc.start()
+    parse(html, backend=backend)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=50)
+    args = parser.parse_args()
+
+    backends = available_backends()
+    missing = [backend for backend in HTML_BACKENDS if backend not in backends]
+    if missing:
+        print(f"not installed: {', '.join(missing)}")
+
+    print(f"{'document':>8} {'backend':>12} {'ms/doc':>8} {'peak KiB':>9}")
+    for name, path, parse in DOCUMENTS:
+        html = (REPO_ROOT / path).read_text()
+        for backend in backends:
+            parse(html, backend=backend)  # warm up
+            ms = _ms_per_document(parse, html, backend, args.runs)
+            peak = _peak_kib(parse, html, backend)
+            print(f"{name:>8} {backend:>12} {ms:>8.2f} {peak:>9.0f}")
+
+
+if __name__ == "__main__":
+    main()
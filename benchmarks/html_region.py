@@ -0,0 +1,74 @@
+"""
+Parsing the whole mail against parsing only the region of the fields.
+
+The region is cut out of the raw html with a byte level search (RuleSet.region)
+before the tree is built, so the styles, tracking pixels and footers around it
+are never parsed. Reports size, DOM node count and parse time per fixture.
+
+    python -m benchmarks.html_region --iterations 50
+"""
+
+import argparse
+import time
+
+from benchmarks.fake_google_api import REPO_ROOT
+from UseCases.DeliveryTracker.parsing import (
+    DHL_PICKUP_RULES,
+    parse_dhl_pickup_email_html,
+)
+from UseCases.ReturnTracker.parsing import RETURN_RULES, parse_return_info
+from shared.html_backend import make_soup
+from shared.html_rules import count_nodes
+
+FIXTURES = [
+    (
+        "dhl_pickup",
+        "tests/test_delivery_tracker/dhl_test.html",
+        DHL_PICKUP_RULES,
+        parse_dhl_pickup_email_html,
+    ),
+    (
+        "amazon_return",
+        "tests/test_return_tracker/amazon_rueckgabe_test.html",
+        RETURN_RULES,
+        parse_return_info,
+    ),
+]
+
+
+def _time_ms(parse, html: str, trim: bool, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        parse(html, trim=trim)
+    return (time.perf_counter() - start) / iterations * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=50)
+    args = parser.parse_args()
+
+    print(
+        f"{'mail':>14} {'parse':>7} {'KiB':>6} {'nodes':>6} {'ms/doc':>8} {'saved':>6}"
+    )
+    for name, path, rules, parse in FIXTURES:
+        html = (REPO_ROOT / path).read_text()
+        region = rules.region.cut(html)
+        assert region is not None, f"region of {name} not found"
+        assert parse(html, trim=True) == parse(html, trim=False)
+
+        full_ms = _time_ms(parse, html, False, args.iterations)
+        region_ms = _time_ms(parse, html, True, args.iterations)
+        for label, document, ms in [
+            ("full", html, full_ms),
+            ("region", region, region_ms),
+        ]:
+            print(
+                f"{name:>14} {label:>7} {len(document) / 1024:>6.1f} "
+                f"{count_nodes(make_soup(document)):>6} {ms:>8.3f} "
+                f"{1 - ms / full_ms:>6.0%}"
+            )
+
+
+if __name__ == "__main__":
+    main()
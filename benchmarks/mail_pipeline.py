@@ -0,0 +1,106 @@
+"""
+Sequential against pipelined mail dispatch: fetch -> decode -> handle.
+
+Runs MailDispatcher.run over DHL pickup mails served by the local fake Gmail
+endpoint, with a handler that parses each mail and builds its task notes.
+"sequential" handles every mail before the next one is fetched (queue_size=0),
+"pipelined" handles them on a worker thread while the next batch downloads.
+Reports the wall time, the time per stage and the peak Python memory.
+
+    python -m benchmarks.mail_pipeline --messages 200 --latency 0.05
+"""
+
+import argparse
+import time
+import tracemalloc
+from datetime import datetime
+
+from benchmarks.fake_google_api import REPO_ROOT, FakeGoogleApi, make_html_message
+from UseCases.DeliveryTracker.fetch_mail import DHL_PICKUP_FILTER
+from UseCases.DeliveryTracker.parsing import parse_known_dhl_pickup_email_html
+from shared.GoogleServices.gmail import CheckpointStore, MailDispatcher, MailMessage
+from shared.GoogleServices.gmail.service import GmailService
+from shared.pipeline import DEFAULT_QUEUE_SIZE
+
+
+class _NoCheckpoints(CheckpointStore):
+    # always take the search path, which lists and fetches every mail
+    def load(self, key: str) -> str | None:
+        return None
+
+    def save(self, key: str, history_id: str) -> None:
+        pass
+
+
+def _to_notes(mail: MailMessage, notes: list[str]) -> dict:
+    parsed = parse_known_dhl_pickup_email_html(mail.text, now=datetime(2025, 5, 1))
+    notes.append(f"{parsed.preview}\nTracking: {parsed.tracking_number}")
+    return {}
+
+
+def _run(api: FakeGoogleApi, queue_size: int, batch_size: int):
+    gmail_service = GmailService(credentials=None)  # type: ignore
+    gmail_service.service = api.build_service("gmail", "v1")
+
+    dispatcher: MailDispatcher[list[str]] = MailDispatcher()
+    dispatcher.register("dhl_pickup", DHL_PICKUP_FILTER, _to_notes)
+
+    notes: list[str] = []
+    start = time.perf_counter()
+    result = dispatcher.run(
+        gmail_service,
+        notes,
+        _NoCheckpoints(),
+        batch_size=batch_size,
+        queue_size=queue_size,
+    )
+    elapsed = time.perf_counter() - start
+
+    assert len(notes) == len(api.messages), result.errors
+    return elapsed, result.timings
+
+
+def _peak_memory(api: FakeGoogleApi, queue_size: int, batch_size: int) -> int:
+    # separate run, tracemalloc slows everything down
+    tracemalloc.start()
+    _run(api, queue_size, batch_size)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--messages", type=int, default=200)
+    parser.add_argument(
+        "--latency", type=float, default=0.05, help="Seconds added to every request"
+    )
+    parser.add_argument("--batch-size", type=int, default=20)
+    args = parser.parse_args()
+
+    html = (REPO_ROOT / "tests/test_delivery_tracker/dhl_test.html").read_text()
+    with FakeGoogleApi(latency=args.latency) as api:
+        for i in range(args.messages):
+            api.messages[f"msg{i:05d}"] = make_html_message(f"msg{i:05d}", html)
+
+        results = {
+            name: (
+                *_run(api, queue_size, args.batch_size),
+                _peak_memory(api, queue_size, args.batch_size),
+            )
+            for name, queue_size in [
+                ("sequential", 0),
+                ("pipelined", DEFAULT_QUEUE_SIZE),
+            ]
+        }
+
+    print(f"{'mode':>10} {'wall s':>8} {'peak KiB':>9}  stages")
+    for name, (elapsed, timings, peak) in results.items():
+        print(f"{name:>10} {elapsed:>8.3f} {peak / 1024:>9.0f}  {timings.summary()}")
+    print(
+        f"speedup: {results['sequential'][0] / results['pipelined'][0]:.2f}x",
+    )
+
+
+if __name__ == "__main__":
+    main()
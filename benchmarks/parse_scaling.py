@@ -0,0 +1,55 @@
+"""
+Scaling of the multi-process batch parsers from 1 to N worker processes.
+
+Parses a corpus of copies of the DHL and return fixtures with
+UseCases.*.parsing.parse_many and reports documents/second and the speedup over
+a single process (which parses in-process, without a pool).
+
+    python -m benchmarks.parse_scaling --documents 400 --max-workers 8
+"""
+
+import argparse
+import os
+import time
+
+from benchmarks.fake_google_api import REPO_ROOT
+from UseCases.DeliveryTracker import parsing as dhl_parsing
+from UseCases.ReturnTracker import parsing as return_parsing
+
+PARSERS = [
+    ("dhl", "tests/test_delivery_tracker/dhl_test.html", dhl_parsing.parse_many),
+    (
+        "return",
+        "tests/test_return_tracker/amazon_rueckgabe_test.html",
+        return_parsing.parse_many,
+    ),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--documents", type=int, default=400)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    print(f"cpu count: {os.cpu_count()}")
+    print(f"{'parser':>8} {'workers':>8} {'docs/s':>8} {'speedup':>8}")
+    for name, path, parse_many in PARSERS:
+        corpus = [(REPO_ROOT / path).read_text()] * args.documents
+
+        single = None
+        for workers in range(1, args.max_workers + 1):
+            start = time.perf_counter()
+            results = parse_many(corpus, workers=workers)
+            elapsed = time.perf_counter() - start
+
+            assert all(result.ok for result in results)
+            single = single or elapsed
+            print(
+                f"{name:>8} {workers:>8} {len(corpus) / elapsed:>8.1f} "
+                f"{single / elapsed:>7.2f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,243 @@
+"""
+Offline performance suite of the parsers, with JSON baselines and a regression gate.
+
+Every case runs in a fresh process, so its peak RSS is not inflated by the
+cases before it. Per case it reports:
+
+- median and p95 latency of one iteration
+- peak_alloc_kib: peak memory allocated through Python during one iteration (tracemalloc)
+- peak_rss_kib: peak resident memory of the process running the case
+
+Results are compared to benchmarks/baseline.json and the run exits with status 1
+if a gated metric got worse than the baseline by more than the threshold.
+Baselines are machine specific, record them with --update-baseline on the
+machine the gate runs on.
+
+    python -m benchmarks.suite
+    python -m benchmarks.suite --case dhl_parser --threshold 0.5
+    python -m benchmarks.suite --update-baseline
+"""
+
+import argparse
+import json
+import multiprocessing
+import resource
+import statistics
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable
+
+from benchmarks.fake_google_api import REPO_ROOT
+
+BASELINE_PATH = Path(__file__).parent / "baseline.json"
+
+# Metrics that fail the run when they regress, RSS is too noisy to gate on
+GATED_METRICS = ("median_ms", "p95_ms", "peak_alloc_kib")
+
+DEFAULT_THRESHOLD = 0.25
+
+# Smaller absolute changes are noise, whatever their relative size
+NOISE_FLOOR = {"median_ms": 0.05, "p95_ms": 0.1, "peak_alloc_kib": 1.0}
+
+FILE_METADATA_RECORDS = 1000
+
+
+@dataclass(frozen=True)
+class BenchmarkCase:
+    """A function measured over a corpus, loaded once before the timed iterations."""
+
+    name: str
+    load: Callable[[], Any]
+    run: Callable[[Any], Any]
+
+
+def _read(path: str) -> str:
+    return (REPO_ROOT / path).read_text()
+
+
+def _load_csrf_page() -> str:
+    # the flame page is a large real world document, with the login form at its
+    # very end it is the worst case for the token lookup
+    page = _read("investigations/flame.html")
+    form = '<form><input type="hidden" name="csrf" value="0123456789abcdef"></form>'
+    return page.replace("</body>", f"{form}</body>")
+
+
+def _load_file_records() -> list[dict]:
+    return [
+        {
+            "filecrea": f"{i % 28 + 1:02d}.{i % 12 + 1:02d}.2020",
+            "filepath": f"/download/a70u1smb38fl73prjb08la6m294/{i} Stra&szlig;e BP.pdf",
+        }
+        for i in range(FILE_METADATA_RECORDS)
+    ]
+
+
+def _run_dhl(html: str):
+    from UseCases.DeliveryTracker.parsing import parse_dhl_pickup_email_html
+
+    return parse_dhl_pickup_email_html(html)
+
+
+def _run_return(html: str):
+    from UseCases.ReturnTracker.parsing import parse_return_info
+
+    return parse_return_info(html)
+
+
+def _run_csrf(html: str):
+    from UseCases.mietplan.session_handling import extract_csrf_token
+
+    return extract_csrf_token(html)
+
+
+def _run_file_metadata(records: list[dict]):
+    from UseCases.mietplan.FileMetadata import FileMetadata
+
+    return [FileMetadata.from_json(record) for record in records]
+
+
+def _run_reddit(raw_posts: dict):
+    from shared.Reddit.RedditClient import RedditClient
+
+    return RedditClient.parse_posts(raw_posts, "OnePunchMan")
+
+
+CASES = {
+    case.name: case
+    for case in [
+        BenchmarkCase(
+            "dhl_parser",
+            lambda: _read("tests/test_delivery_tracker/dhl_test.html"),
+            _run_dhl,
+        ),
+        BenchmarkCase(
+            "return_parser",
+            lambda: _read("tests/test_return_tracker/amazon_rueckgabe_test.html"),
+            _run_return,
+        ),
+        BenchmarkCase("csrf_token", _load_csrf_page, _run_csrf),
+        BenchmarkCase("file_metadata", _load_file_records, _run_file_metadata),
+        BenchmarkCase(
+            "reddit_posts",
+            lambda: json.loads(_read("investigations/reddit_response.json")),
+            _run_reddit,
+        ),
+    ]
+}
+
+
+def _percentile(values: list[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def measure(name: str, iterations: int) -> dict[str, float]:
+    """Measure one case in the current process."""
+    case = CASES[name]
+    corpus = case.load()
+    case.run(corpus)  # warm up imports and caches
+
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        case.run(corpus)
+        timings.append((time.perf_counter() - start) * 1000)
+
+    tracemalloc.start()
+    case.run(corpus)
+    _, peak_alloc = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "median_ms": round(statistics.median(timings), 3),
+        "p95_ms": round(_percentile(timings, 0.95), 3),
+        "peak_alloc_kib": round(peak_alloc / 1024, 1),
+        # kilobytes on Linux
+        "peak_rss_kib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    }
+
+
+def run_suite(names: list[str], iterations: int) -> dict[str, dict[str, float]]:
+    """Measure every case in its own fresh process."""
+    context = multiprocessing.get_context("spawn")
+    results = {}
+    for name in names:
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+            results[name] = executor.submit(measure, name, iterations).result()
+    return results
+
+
+def compare(
+    results: dict[str, dict[str, float]],
+    baseline: dict[str, dict[str, float]],
+    threshold: float,
+) -> list[str]:
+    """
+    Find the gated metrics that are worse than the baseline by more than `threshold`.
+
+    Returns:
+        list[str]: One message per regression, empty if there are none
+    """
+    regressions = []
+    for name, metrics in results.items():
+        for metric in GATED_METRICS:
+            previous = baseline.get(name, {}).get(metric)
+            if not previous:
+                continue
+            change = metrics[metric] / previous - 1
+            if change > threshold and metrics[metric] - previous > NOISE_FLOOR[metric]:
+                regressions.append(
+                    f"{name} {metric}: {previous} -> {metrics[metric]} (+{change:.0%})"
+                )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--case", action="append", choices=list(CASES))
+    parser.add_argument("--iterations", type=int, default=30)
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=DEFAULT_THRESHOLD,
+        help="Allowed relative regression, 0.25 means 25%% slower/larger",
+    )
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    parser.add_argument("--update-baseline", action="store_true")
+    args = parser.parse_args()
+
+    results = run_suite(args.case or list(CASES), args.iterations)
+
+    print(
+        f"{'case':>14} {'median ms':>10} {'p95 ms':>8} {'alloc KiB':>10} {'RSS KiB':>9}"
+    )
+    for name, metrics in results.items():
+        print(
+            f"{name:>14} {metrics['median_ms']:>10.3f} {metrics['p95_ms']:>8.3f} "
+            f"{metrics['peak_alloc_kib']:>10.1f} {metrics['peak_rss_kib']:>9}"
+        )
+
+    baseline = json.loads(args.baseline.read_text()) if args.baseline.exists() else {}
+
+    if args.update_baseline:
+        baseline.update(results)
+        args.baseline.write_text(json.dumps(baseline, indent=2, sort_keys=True) + "\n")
+        print(f"Baseline written to {args.baseline}")
+        return
+
+    regressions = compare(results, baseline, args.threshold)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
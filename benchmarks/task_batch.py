@@ -0,0 +1,74 @@
+"""
+Google Tasks creation: one invocation per task against batched inserts.
+
+Creates the tasks of one run (e.g. dhl_mail_to_task with 20 parcels) on the
+local fake Tasks endpoint:
+
+- "cold": a new TaskService and discovery build per task, like one create_task
+  invocation per event used to do. Key Vault and the token refresh are left out
+  (no network), so the real cost per task is larger.
+- "warm": one TaskService, one insert request per task.
+- "batched": one TaskService, TaskService.create_tasks with HTTP batch requests,
+  like create_task does for an event of batch_task_events.
+
+    python -m benchmarks.task_batch --tasks 20 --latency 0.05
+"""
+
+import argparse
+import time
+
+from benchmarks.fake_google_api import FakeGoogleApi
+from shared.GoogleServices import NewTask, TaskService
+
+TASKLIST_ID = "tasklist"
+
+
+def _cold(api: FakeGoogleApi, tasks: list[NewTask]) -> None:
+    for task in tasks:
+        service = TaskService(None, service=api.build_service("tasks", "v1"))
+        service.create_task_with_notes(task.tasklist_id, task.title, task.notes)
+
+
+def _warm(api: FakeGoogleApi, tasks: list[NewTask]) -> None:
+    service = TaskService(None, service=api.build_service("tasks", "v1"))
+    for task in tasks:
+        service.create_task_with_notes(task.tasklist_id, task.title, task.notes)
+
+
+def _batched(api: FakeGoogleApi, tasks: list[NewTask]) -> None:
+    service = TaskService(None, service=api.build_service("tasks", "v1"))
+    result = service.create_tasks(tasks)
+    assert not result.errors, result.errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tasks", type=int, default=20)
+    parser.add_argument(
+        "--latency", type=float, default=0.05, help="Seconds added to every request"
+    )
+    args = parser.parse_args()
+
+    tasks = [
+        NewTask(TASKLIST_ID, f"Paket abholen {i}", f"Tracking: {i:020d}")
+        for i in range(args.tasks)
+    ]
+
+    print(f"{'mode':>8} {'seconds':>8} {'tasks/s':>8} {'requests':>9}")
+    with FakeGoogleApi(latency=args.latency) as api:
+        for name, run in [("cold", _cold), ("warm", _warm), ("batched", _batched)]:
+            api.tasks.clear()
+            api.reset_counters()
+            start = time.perf_counter()
+            run(api, tasks)
+            elapsed = time.perf_counter() - start
+
+            assert len(api.tasks[TASKLIST_ID]) == len(tasks)
+            print(
+                f"{name:>8} {elapsed:>8.3f} {len(tasks) / elapsed:>8.1f} "
+                f"{api.http_requests:>9}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Load test of the Telegram rate limiter against a local fake Telegram endpoint.
+
+A burst of concurrent messages to a few chats is delivered twice:
+
+- "direct": every message sent right away, like send_telegram_message did
+  before the rate limiter. Messages rejected with 429 are lost.
+- "limited": every message sent through send_rate_limited() with one shared
+  rate limiter, waiting out the 429s.
+
+The fake enforces per_chat_limit messages per chat and global_limit messages
+overall in any one second window. The limiter is configured with the same
+limits (Telegram's are 1 and 30 per second).
+
+    python -m benchmarks.telegram_rate_limit --messages 120 --chats 6
+"""
+
+import argparse
+import asyncio
+import time
+
+from benchmarks.fake_telegram_api import FakeTelegramApi
+from Infrastructure.telegram.rate_limit import RateLimiter, send_rate_limited
+from Infrastructure.telegram.sender import TelegramSender
+
+
+async def _direct(api: FakeTelegramApi, burst: list[tuple[int, str]]) -> int:
+    sender = TelegramSender(lambda: "123:direct", bot_factory=api.make_bot)
+
+    async def _send(chat_id: int, text: str) -> None:
+        try:
+            await sender.send(text, chat_id=chat_id)
+        except Exception:
+            pass
+
+    await asyncio.gather(*(_send(chat_id, text) for chat_id, text in burst))
+    await sender.close()
+    return len(api.delivered)
+
+
+async def _limited(
+    api: FakeTelegramApi, burst: list[tuple[int, str]], limiter: RateLimiter
+) -> int:
+    sender = TelegramSender(lambda: "123:limited", bot_factory=api.make_bot)
+    await asyncio.gather(
+        *(send_rate_limited(sender, limiter, text, chat_id) for chat_id, text in burst)
+    )
+    await sender.close()
+    return len(api.delivered)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--messages", type=int, default=120)
+    parser.add_argument("--chats", type=int, default=6)
+    parser.add_argument("--per-chat-limit", type=int, default=5)
+    parser.add_argument("--global-limit", type=int, default=20)
+    parser.add_argument(
+        "--latency", type=float, default=0.01, help="Seconds added to every request"
+    )
+    args = parser.parse_args()
+
+    burst = [(i % args.chats + 1, f"message {i}") for i in range(args.messages)]
+
+    print(f"{'mode':>7} {'delivered':>9} {'429s':>5} {'seconds':>8} {'msg/s':>6}")
+    for name in ["direct", "limited"]:
+        with FakeTelegramApi(
+            per_chat_limit=args.per_chat_limit,
+            global_limit=args.global_limit,
+            latency=args.latency,
+        ) as api:
+            start = time.perf_counter()
+            if name == "direct":
+                delivered = asyncio.run(_direct(api, burst))
+            else:
+                limiter = RateLimiter(
+                    global_rate=args.global_limit,
+                    per_chat_rate=args.per_chat_limit,
+                )
+                delivered = asyncio.run(_limited(api, burst, limiter))
+            elapsed = time.perf_counter() - start
+
+        print(
+            f"{name:>7} {delivered:>9} {api.rejected:>5} {elapsed:>8.2f} "
+            f"{delivered / elapsed:>6.1f}"
+        )
+
+    print(f"optimum: {min(args.global_limit, args.per_chat_limit * args.chats)} msg/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,8 @@ import azure.functions as func
 
 app = func.FunctionApp(http_auth_level=func.AuthLevel.FUNCTION)
 
+import UseCases.MailPoller
+import UseCases.MailBackfill
 from UseCases.DeliveryTracker import DeliveryTracker
 from UseCases.ReturnTracker import ReturnTracker
 import UseCases.SkeletonSoldier
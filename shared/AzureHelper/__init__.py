@@ -1,2 +1,3 @@
-from .secrets import get_secret
+from .secrets import get_secret, prefetch, secret_cache_stats
 from .download import get_temp_dir
+from .local_db import LocalDb, open_local_db
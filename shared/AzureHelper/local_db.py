@@ -0,0 +1,59 @@
+import sqlite3
+import threading
+from typing import Sequence
+
+from shared.AzureHelper.download import get_temp_dir
+
+
+def open_local_db(name: str) -> sqlite3.Connection:
+    """
+    Open (and create if needed) a SQLite database in the temp directory of the worker.
+
+    The temp directory survives between invocations on a warm worker, but not a
+    redeployment or scale-out, so only use it for state that can be rebuilt.
+
+    Args:
+        name: Name of the database file without extension
+
+    Returns:
+        sqlite3.Connection: Connection in WAL mode, usable from multiple threads
+    """
+    connection = sqlite3.connect(
+        get_temp_dir() / f"{name}.sqlite3", check_same_thread=False, timeout=30
+    )
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    return connection
+
+
+class LocalDb:
+    """
+    A local SQLite database that is opened on first use.
+
+    Stores are created at import time of the functions, before the temp
+    directory is needed. Calling the instance opens the database with
+    `open_local_db`, runs the schema statements once and returns the shared
+    connection.
+    """
+
+    def __init__(self, name: str, schema: Sequence[str] = ()):
+        """
+        Args:
+            name: Name of the database file without extension
+            schema: Statements run when the database is opened, e.g. CREATE TABLE IF NOT EXISTS
+        """
+        self.name = name
+        self.schema = list(schema)
+        self._connection: sqlite3.Connection | None = None
+        self._open_lock = threading.Lock()
+
+    def __call__(self) -> sqlite3.Connection:
+        if self._connection is None:
+            with self._open_lock:
+                if self._connection is None:
+                    connection = open_local_db(self.name)
+                    with connection:
+                        for statement in self.schema:
+                            connection.execute(statement)
+                    self._connection = connection
+        return self._connection
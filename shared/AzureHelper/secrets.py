@@ -1,17 +1,124 @@
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
 from azure.identity import DefaultAzureCredential
 from azure.keyvault.secrets import SecretClient
 
+KEY_VAULT_URL = "https://omlnaut-vaultier.vault.azure.net/"
+
+# How long a fetched secret is served from memory before Key Vault is asked again
+DEFAULT_SECRET_TTL_SECONDS = 60 * 60
+
+# Least recently used secrets are evicted beyond this size
+MAX_CACHED_SECRETS = 32
+
+
+@dataclass
+class SecretCacheStats:
+    """Counters of the in-memory secret cache."""
+
+    hits: int
+    misses: int
+    size: int
+
+
+# One credential and client per worker process. Creating them probes the whole
+# DefaultAzureCredential chain, which is far slower than the secret lookup itself.
+_secret_client: SecretClient | None = None
+_client_lock = threading.Lock()
 
-def get_secret(secret_name: str) -> str:
-    key_vault_url = "https://omlnaut-vaultier.vault.azure.net/"
+_cache: OrderedDict[str, tuple[str, float]] = OrderedDict()
+_cache_lock = threading.Lock()
+_hits = 0
+_misses = 0
 
-    # Create a secret client using the DefaultAzureCredential
-    credential = DefaultAzureCredential()
-    secret_client = SecretClient(vault_url=key_vault_url, credential=credential)
 
-    secret_str = secret_client.get_secret(secret_name).value
+def _get_secret_client() -> SecretClient:
+    global _secret_client
+
+    with _client_lock:
+        if _secret_client is None:
+            credential = DefaultAzureCredential()
+            _secret_client = SecretClient(
+                vault_url=KEY_VAULT_URL, credential=credential
+            )
+        return _secret_client
+
+
+def _fetch_secret(secret_name: str) -> str:
+    secret_str = _get_secret_client().get_secret(secret_name).value
 
     if not secret_str:
         raise Exception(f"Secret {secret_name} not found in Key Vault")
 
     return secret_str
+
+
+def _store(secret_name: str, secret_str: str, ttl: float) -> None:
+    with _cache_lock:
+        _cache[secret_name] = (secret_str, time.monotonic() + ttl)
+        _cache.move_to_end(secret_name)
+        while len(_cache) > MAX_CACHED_SECRETS:
+            _cache.popitem(last=False)
+
+
+def get_secret(secret_name: str, ttl: float = DEFAULT_SECRET_TTL_SECONDS) -> str:
+    """
+    Get a secret from Key Vault, served from memory while it is younger than `ttl`.
+
+    Args:
+        secret_name: Name of the secret in Key Vault
+        ttl: Seconds the fetched value may be reused
+
+    Returns:
+        str: The secret value
+    """
+    global _hits, _misses
+
+    with _cache_lock:
+        cached = _cache.get(secret_name)
+        if cached and cached[1] > time.monotonic():
+            _cache.move_to_end(secret_name)
+            _hits += 1
+            return cached[0]
+
+        _cache.pop(secret_name, None)
+        _misses += 1
+
+    secret_str = _fetch_secret(secret_name)
+    _store(secret_name, secret_str, ttl)
+    return secret_str
+
+
+def prefetch(secret_names: list[str], ttl: float = DEFAULT_SECRET_TTL_SECONDS) -> None:
+    """
+    Fetch several secrets concurrently, e.g. at the start of a function.
+
+    Secrets that are already cached are not fetched again.
+
+    Args:
+        secret_names: Names of the secrets in Key Vault
+        ttl: Seconds the fetched values may be reused
+    """
+    unique_names = list(dict.fromkeys(secret_names))
+    if not unique_names:
+        return
+
+    with ThreadPoolExecutor(max_workers=len(unique_names)) as executor:
+        # list() re-raises the first failure
+        list(executor.map(lambda name: get_secret(name, ttl=ttl), unique_names))
+
+
+def secret_cache_stats() -> SecretCacheStats:
+    """Get the hit/miss counters of the secret cache since the worker started."""
+    with _cache_lock:
+        return SecretCacheStats(hits=_hits, misses=_misses, size=len(_cache))
+
+
+def clear_secret_cache() -> None:
+    """Drop all cached secrets, e.g. after a secret was rotated."""
+    with _cache_lock:
+        _cache.clear()
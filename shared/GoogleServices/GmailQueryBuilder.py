@@ -12,6 +12,16 @@ class GmailQueryBuilder:
         self._query_parts.append(f"from:{email}")
         return self
 
+    def from_any(self, emails):
+        """Add a from: filter matching any of the senders, grouped as {from:a from:b}"""
+        senders = list(dict.fromkeys(emails))
+        if len(senders) == 1:
+            return self.from_email(senders[0])
+        self._query_parts.append(
+            "{" + " ".join(f"from:{email}" for email in senders) + "}"
+        )
+        return self
+
     def subject(self, text, exact=True):
         """Add subject: filter"""
         if exact:
@@ -1,11 +1,44 @@
+from dataclasses import dataclass, field
 from datetime import datetime, timezone
 from googleapiclient.discovery import build
 
+# Maximum number of task inserts sent in one HTTP batch request
+TASKS_BATCH_SIZE = 50
+
+
+@dataclass
+class NewTask:
+    """A task to create with TaskService.create_tasks."""
+
+    tasklist_id: str
+    title: str
+    notes: str = ""
+    due_date: datetime | None = None
+
+
+@dataclass
+class TaskBatchResult:
+    """Outcome of TaskService.create_tasks, keyed by the index of the new task."""
+
+    tasks: dict[int, dict] = field(default_factory=dict)
+    errors: dict[int, Exception] = field(default_factory=dict)
+
+
+def _end_of_today() -> datetime:
+    return datetime.now(timezone.utc).replace(
+        hour=23, minute=59, second=59, microsecond=0
+    )
+
 
 class TaskService:
-    def __init__(self, credentials):
+    def __init__(self, credentials, service=None):
+        """
+        Args:
+            credentials: Google OAuth2 credentials
+            service: Already built tasks resource to reuse. Built from the credentials if omitted.
+        """
         self.credentials = credentials
-        self.service = build(
+        self.service = service or build(
             "tasks", "v1", credentials=credentials, cache_discovery=False
         )
 
@@ -14,20 +47,61 @@ class TaskService:
         tasklists = self.service.tasklists().list().execute()
         return tasklists["items"][0]["id"]  # Get the first (default) task list
 
-    def create_task_with_notes(self, tasklist_id, title, notes, due_date=None):
-        """Creates a new task in the specified task list with notes."""
-        if due_date is None:
-            # Set due date to end of today
-            due_date = datetime.now(timezone.utc).replace(
-                hour=23, minute=59, second=59, microsecond=0
-            )
-
+    def _insert_request(self, tasklist_id, title, notes, due_date=None):
+        # due date defaults to the end of today
         task_body = {
             "title": title,
             "notes": notes,
-            "due": due_date.isoformat(),
+            "due": (due_date or _end_of_today()).isoformat(),
         }
-        task = (
-            self.service.tasks().insert(tasklist=tasklist_id, body=task_body).execute()
-        )
-        return task
+        return self.service.tasks().insert(tasklist=tasklist_id, body=task_body)
+
+    def create_task_with_notes(self, tasklist_id, title, notes, due_date=None):
+        """Creates a new task in the specified task list with notes."""
+        return self._insert_request(tasklist_id, title, notes, due_date).execute()
+
+    def create_tasks(
+        self, tasks: list[NewTask], batch_size: int = TASKS_BATCH_SIZE
+    ) -> TaskBatchResult:
+        """
+        Create several tasks using HTTP batch requests.
+
+        The inserts are grouped into chunks of `batch_size`, so N tasks cost
+        ceil(N / batch_size) round trips instead of N.
+
+        Args:
+            tasks (list[NewTask]): The tasks to create, in any task lists
+            batch_size (int): Maximum number of inserts per batch request
+
+        Returns:
+            TaskBatchResult: Created tasks and per-task errors, keyed by index in `tasks`
+        """
+        result = TaskBatchResult()
+
+        def _collect(request_id, response, exception):
+            if exception is not None:
+                result.errors[int(request_id)] = exception
+            else:
+                result.tasks[int(request_id)] = response
+
+        for start in range(0, len(tasks), batch_size):
+            chunk = range(start, min(start + batch_size, len(tasks)))
+            batch = self.service.new_batch_http_request(callback=_collect)
+            for index in chunk:
+                task = tasks[index]
+                batch.add(
+                    self._insert_request(
+                        task.tasklist_id, task.title, task.notes, task.due_date
+                    ),
+                    request_id=str(index),
+                )
+
+            try:
+                batch.execute()
+            except Exception as e:
+                # the whole batch failed (transport error, malformed response)
+                for index in chunk:
+                    if index not in result.tasks:
+                        result.errors.setdefault(index, e)
+
+        return result
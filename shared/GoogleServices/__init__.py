@@ -1,4 +1,8 @@
 from .gmail.service import GmailService as GmailService
+from .gmail.async_service import AsyncGmailService as AsyncGmailService
 from .TaskService import TaskService as TaskService
+from .TaskService import NewTask as NewTask
 from .GoogleDriveService import GoogleDriveService as GDriveService
 from .GmailQueryBuilder import GmailQueryBuilder as GmailQueryBuilder
+from .client_factory import GoogleClientFactory as GoogleClientFactory
+from .client_factory import google_clients as google_clients
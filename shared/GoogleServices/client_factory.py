@@ -0,0 +1,100 @@
+import threading
+from typing import Callable
+
+from google.auth.transport.requests import Request
+from google.oauth2.credentials import Credentials
+from googleapiclient.discovery import build
+
+from shared.AzureHelper.google_credentials import load_gcloud_credentials
+
+from .GoogleDriveService import GoogleDriveService
+from .TaskService import TaskService
+from .gmail.async_service import DEFAULT_MAX_CONCURRENCY, AsyncGmailService
+from .gmail.service import GmailService
+
+
+class GoogleClientFactory:
+    """
+    Process-wide source of Google credentials and API clients.
+
+    Warm Azure Functions workers keep module state between invocations, so the
+    credentials are only loaded from Key Vault once and only refreshed when they
+    expire. Built API resources are cached per thread, because the httplib2
+    transport underneath them is not thread safe.
+    """
+
+    def __init__(
+        self, load_credentials: Callable[[], Credentials] = load_gcloud_credentials
+    ):
+        """
+        Args:
+            load_credentials: Loads fresh credentials, called at most once per process
+        """
+        self._load_credentials = load_credentials
+        self._credentials: Credentials | None = None
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        # bumped by clear(), so every thread rebuilds its resources
+        self._generation = 0
+
+    def credentials(self) -> Credentials:
+        """Get the cached credentials, refreshing the access token if it expired."""
+        with self._lock:
+            if self._credentials is None:
+                self._credentials = self._load_credentials()
+
+            if not self._credentials.valid:
+                self._credentials.refresh(Request())
+
+            return self._credentials
+
+    def resource(self, api: str, version: str):
+        """Get the googleapiclient resource for the API, building it on first use."""
+        if getattr(self._local, "generation", None) != self._generation:
+            self._local.generation = self._generation
+            self._local.resources = {}
+
+        resources: dict[tuple[str, str], object] = self._local.resources
+        key = (api, version)
+        if key not in resources:
+            resources[key] = build(
+                api, version, credentials=self.credentials(), cache_discovery=False
+            )
+        return resources[key]
+
+    def gmail(self) -> GmailService:
+        """Get a GmailService on the cached gmail resource."""
+        service = GmailService(self.credentials())
+        service.service = self.resource("gmail", "v1")
+        return service
+
+    def async_gmail(
+        self, max_concurrency: int = DEFAULT_MAX_CONCURRENCY
+    ) -> AsyncGmailService:
+        """
+        Get an AsyncGmailService on the cached credentials.
+
+        Its connection pool belongs to the running event loop, so it is not
+        cached; close it with `async with` when the invocation is done.
+        """
+        return AsyncGmailService(self.credentials(), max_concurrency=max_concurrency)
+
+    def tasks(self) -> TaskService:
+        """Get a TaskService on the cached tasks resource."""
+        return TaskService(self.credentials(), service=self.resource("tasks", "v1"))
+
+    def drive(self) -> GoogleDriveService:
+        """Get a GoogleDriveService on the cached drive resource."""
+        service = GoogleDriveService(self.credentials())
+        service.service = self.resource("drive", "v3")
+        return service
+
+    def clear(self) -> None:
+        """Drop the cached credentials and all built resources."""
+        with self._lock:
+            self._credentials = None
+            self._generation += 1
+
+
+# shared by all functions of the worker process
+google_clients = GoogleClientFactory()
@@ -1,11 +1,41 @@
 """Gmail service module for interacting with Gmail API."""
 
 from .service import GmailService
-from .models import MessageId, AttachmentData, MemoryAttachment
+from .async_service import AsyncGmailService
+from .models import (
+    MessageId,
+    AttachmentData,
+    MemoryAttachment,
+    MessageBatchResult,
+    MessageFilter,
+)
+from .processed_cache import ProcessedMessageCache, ProcessedCacheStats
+from .dispatch import MailDispatcher, MailMessage, MailRoute, DispatchResult
+from .checkpoints import (
+    CheckpointStore,
+    DeferredCheckpointStore,
+    SqliteCheckpointStore,
+    BlobCheckpointStore,
+    default_checkpoint_store,
+)
 
 __all__ = [
     "GmailService",
+    "AsyncGmailService",
     "MessageId",
     "AttachmentData",
     "MemoryAttachment",
+    "MessageBatchResult",
+    "MessageFilter",
+    "ProcessedMessageCache",
+    "ProcessedCacheStats",
+    "MailDispatcher",
+    "MailMessage",
+    "MailRoute",
+    "DispatchResult",
+    "CheckpointStore",
+    "DeferredCheckpointStore",
+    "SqliteCheckpointStore",
+    "BlobCheckpointStore",
+    "default_checkpoint_store",
 ]
@@ -0,0 +1,256 @@
+"""Asyncio Gmail service for concurrent fan-out inside async Azure functions."""
+
+import asyncio
+import base64
+from io import BytesIO
+from typing import AsyncIterator
+
+import httpx
+from google.auth.transport.requests import Request
+from google.oauth2.credentials import Credentials
+
+from .mime import extract_html_body, walk_parts
+from .models import AttachmentData, MemoryAttachment, MessageBatchResult, MessageId
+from .service import (
+    ATTACHMENT_FIELDS,
+    GMAIL_PAGE_SIZE,
+    MAIL_FIELDS,
+    MESSAGE_ID_FIELDS,
+)
+
+GMAIL_API_URL = "https://gmail.googleapis.com/gmail/v1/users/me"
+
+# Concurrent requests per AsyncGmailService
+DEFAULT_MAX_CONCURRENCY = 10
+
+
+class AsyncGmailService:
+    """
+    Async counterpart of GmailService on a pooled httpx client.
+
+    All requests share one keep-alive connection pool and at most
+    `max_concurrency` of them are in flight at the same time. Use it as an async
+    context manager, or call `aclose()`, to release the connections.
+    """
+
+    def __init__(
+        self,
+        credentials: Credentials,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        client: httpx.AsyncClient | None = None,
+        base_url: str = GMAIL_API_URL,
+    ):
+        """
+        Args:
+            credentials: Google OAuth2 credentials
+            max_concurrency: Maximum number of requests in flight
+            client: httpx client to use instead of a new pooled one
+            base_url: Gmail API base URL of the user
+        """
+        self.credentials = credentials
+        self.base_url = base_url
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._refresh_lock = asyncio.Lock()
+        self._client = client or httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=max_concurrency,
+                max_keepalive_connections=max_concurrency,
+            ),
+            timeout=30,
+        )
+
+    async def __aenter__(self) -> "AsyncGmailService":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        """Close the connection pool."""
+        await self._client.aclose()
+
+    async def _auth_headers(self) -> dict[str, str]:
+        async with self._refresh_lock:
+            if not self.credentials.valid:
+                # google-auth only has a blocking refresh
+                await asyncio.to_thread(self.credentials.refresh, Request())
+
+        headers: dict[str, str] = {}
+        self.credentials.apply(headers)
+        return headers
+
+    async def _get(self, path: str, params: dict | None = None) -> dict:
+        async with self._semaphore:
+            response = await self._client.get(
+                f"{self.base_url}/{path}",
+                params=params,
+                headers=await self._auth_headers(),
+            )
+        response.raise_for_status()
+        return response.json()
+
+    async def iter_message_ids(
+        self, query: str, page_size: int = GMAIL_PAGE_SIZE
+    ) -> AsyncIterator[MessageId]:
+        """
+        Query messages with the given query, following all result pages.
+
+        Args:
+            query (str): Gmail search query, e.g. built with GmailQueryBuilder
+            page_size (int): Number of message IDs requested per page
+
+        Yields:
+            MessageId: Message ID and thread ID of each matching message
+
+        Raises:
+            httpx.HTTPError: If a page could not be listed. A partial listing is
+                never returned as if it were complete.
+        """
+        params = {"q": query, "maxResults": page_size, "fields": MESSAGE_ID_FIELDS}
+        while True:
+            try:
+                results = await self._get("messages", params)
+            except Exception as e:
+                print(f"Error querying messages: {str(e)}")
+                raise
+
+            for message in results.get("messages", []):
+                yield MessageId(id=message["id"], thread_id=message.get("threadId", ""))
+
+            page_token = results.get("nextPageToken")
+            if not page_token:
+                return
+            params = {**params, "pageToken": page_token}
+
+    async def query_messages_ids(self, query: str) -> list[MessageId]:
+        """
+        Query messages using Gmail API with the given query.
+
+        Args:
+            query (str): Gmail search query
+
+        Returns:
+            list: List of message IDs and thread IDs
+        """
+        return [message async for message in self.iter_message_ids(query)]
+
+    async def fetch_messages(
+        self, message_ids: list[str], fields: str | None = MAIL_FIELDS
+    ) -> MessageBatchResult:
+        """
+        Fetch several messages concurrently, limited by `max_concurrency`.
+
+        Args:
+            message_ids (list[str]): The IDs of the messages to fetch
+            fields (str | None): Field mask of the message resource, None for all fields
+
+        Returns:
+            MessageBatchResult: Fetched messages and per-message errors, keyed by message ID
+        """
+        result = MessageBatchResult()
+        params = {"format": "full", **({"fields": fields} if fields else {})}
+
+        async def _fetch(message_id: str) -> None:
+            try:
+                result.messages[message_id] = await self._get(
+                    f"messages/{message_id}", params
+                )
+            except Exception as e:
+                print(f"Error fetching message details for {message_id}: {str(e)}")
+                result.errors[message_id] = e
+
+        await asyncio.gather(*(_fetch(i) for i in dict.fromkeys(message_ids)))
+        return result
+
+    async def query_messages_with_body(self, query: str) -> list[str]:
+        """
+        Query messages using Gmail API with the given query and return their body.
+
+        The bodies are fetched concurrently, limited by `max_concurrency`.
+
+        Args:
+            query (str): Gmail search query
+
+        Returns:
+            list: List of message bodies, in the order of the search results
+
+        Raises:
+            RuntimeError: If a message could not be fetched
+        """
+        message_ids = [message.id for message in await self.query_messages_ids(query)]
+        result = await self.fetch_messages(message_ids)
+        if result.errors:
+            raise RuntimeError(
+                f"Could not fetch {len(result.errors)} of {len(message_ids)} messages"
+            ) from next(iter(result.errors.values()))
+        return [
+            extract_html_body(result.messages[i]["payload"]).decode("utf-8")
+            for i in message_ids
+        ]
+
+    async def _download_attachment(
+        self, message_id: str, attachment_id: str, filename: str
+    ) -> AttachmentData | None:
+        try:
+            attachment = await self._get(
+                f"messages/{message_id}/attachments/{attachment_id}"
+            )
+        except Exception as e:
+            print(f"Error fetching PDF attachment {filename}: {str(e)}")
+            return None
+
+        return AttachmentData(
+            filename=filename, data=base64.urlsafe_b64decode(attachment["data"])
+        )
+
+    async def get_pdf_attachments(self, message_id: str) -> list[AttachmentData]:
+        """
+        Download the PDF attachments of a message concurrently.
+
+        Args:
+            message_id (str): The ID of the message to get attachments from
+
+        Returns:
+            list[AttachmentData]: Filename and data of each distinct PDF attachment
+        """
+        try:
+            message = await self._get(
+                f"messages/{message_id}", {"fields": ATTACHMENT_FIELDS}
+            )
+        except Exception as e:
+            print(f"Error fetching PDF attachments: {str(e)}")
+            return []
+
+        attachments: dict[str, str] = {}
+        for part in walk_parts(message.get("payload", {})):
+            filename: str = part.get("filename", "")
+            attachment_id = part.get("body", {}).get("attachmentId")
+            if filename.lower().endswith(".pdf") and attachment_id:
+                attachments.setdefault(attachment_id, filename)
+
+        downloads = await asyncio.gather(
+            *(
+                self._download_attachment(message_id, attachment_id, filename)
+                for attachment_id, filename in attachments.items()
+            )
+        )
+        return [attachment for attachment in downloads if attachment is not None]
+
+    async def download_pdf_attachments_to_ram(
+        self, message_id: str
+    ) -> list[MemoryAttachment]:
+        """
+        Download all PDF attachments from a given message into memory.
+
+        Args:
+            message_id (str): The ID of the message to get attachments from
+
+        Returns:
+            list[MemoryAttachment]: Filename and content (BytesIO object) of each attachment
+        """
+        return [
+            MemoryAttachment(
+                filename=attachment.filename, content=BytesIO(attachment.data)
+            )
+            for attachment in await self.get_pdf_attachments(message_id)
+        ]
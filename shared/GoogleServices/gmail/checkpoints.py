@@ -0,0 +1,128 @@
+"""Stores for the Gmail historyId checkpoints used by incremental sync."""
+
+import os
+import threading
+from abc import ABC, abstractmethod
+
+from shared.AzureHelper.local_db import LocalDb
+
+CHECKPOINTS_SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS checkpoints ("
+    " key TEXT PRIMARY KEY,"
+    " history_id TEXT NOT NULL,"
+    " updated_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP)",
+]
+
+
+class CheckpointStore(ABC):
+    """Persists the last processed Gmail historyId per sync key."""
+
+    @abstractmethod
+    def load(self, key: str) -> str | None:
+        """Return the stored historyId for the key, or None if there is none."""
+
+    @abstractmethod
+    def save(self, key: str, history_id: str) -> None:
+        """Store the historyId for the key."""
+
+
+class DeferredCheckpointStore(CheckpointStore):
+    """
+    Holds back the saves to another store until `commit` is called.
+
+    Lets a consumer that handles messages after the sync iterator is exhausted
+    (e.g. on another thread) only advance the checkpoint once they are handled.
+    """
+
+    def __init__(self, store: CheckpointStore):
+        self._store = store
+        self._pending: dict[str, str] = {}
+
+    def load(self, key: str) -> str | None:
+        return self._pending.get(key) or self._store.load(key)
+
+    def save(self, key: str, history_id: str) -> None:
+        self._pending[key] = history_id
+
+    def commit(self) -> None:
+        """Write the held back checkpoints to the underlying store."""
+        for key, history_id in self._pending.items():
+            self._store.save(key, history_id)
+        self._pending.clear()
+
+
+class SqliteCheckpointStore(CheckpointStore):
+    """Checkpoint store backed by a SQLite file in the temp directory of the worker."""
+
+    def __init__(self, db_name: str = "gmail_checkpoints"):
+        self._db = LocalDb(db_name, CHECKPOINTS_SCHEMA)
+        self._lock = threading.Lock()
+
+    def load(self, key: str) -> str | None:
+        with self._lock:
+            row = (
+                self._db()
+                .execute("SELECT history_id FROM checkpoints WHERE key = ?", (key,))
+                .fetchone()
+            )
+        return row[0] if row else None
+
+    def save(self, key: str, history_id: str) -> None:
+        with self._lock, self._db():
+            self._db().execute(
+                "INSERT INTO checkpoints (key, history_id) VALUES (?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET"
+                " history_id = excluded.history_id,"
+                " updated_at = CURRENT_TIMESTAMP",
+                (key, history_id),
+            )
+
+
+class BlobCheckpointStore(CheckpointStore):
+    """
+    Checkpoint store backed by Azure Blob Storage, one blob per key.
+
+    Survives redeployments and scale-out, unlike the SQLite store. Requires the
+    optional azure-storage-blob package.
+    """
+
+    def __init__(self, connection_string: str, container: str):
+        try:
+            from azure.storage.blob import ContainerClient
+        except ImportError as e:
+            raise ImportError(
+                "BlobCheckpointStore requires the azure-storage-blob package"
+            ) from e
+
+        self._container = ContainerClient.from_connection_string(
+            connection_string, container
+        )
+
+    def load(self, key: str) -> str | None:
+        from azure.core.exceptions import ResourceNotFoundError
+
+        try:
+            return self._container.download_blob(key).readall().decode("utf-8")
+        except ResourceNotFoundError:
+            return None
+
+    def save(self, key: str, history_id: str) -> None:
+        self._container.upload_blob(key, history_id.encode("utf-8"), overwrite=True)
+
+
+# one connection for all polls of this worker, opened by the first one
+_local_checkpoint_store = SqliteCheckpointStore()
+
+
+def default_checkpoint_store() -> CheckpointStore:
+    """
+    Return the checkpoint store configured for this function app.
+
+    Uses blob storage if GMAIL_CHECKPOINT_CONTAINER is set (with the
+    AzureWebJobsStorage connection string), a local SQLite file otherwise.
+    """
+    container = os.environ.get("GMAIL_CHECKPOINT_CONTAINER")
+    if container:
+        return BlobCheckpointStore(os.environ["AzureWebJobsStorage"], container)
+
+    return _local_checkpoint_store
@@ -0,0 +1,318 @@
+"""Routes the messages of one combined Gmail sync to the handlers registered for them."""
+
+from dataclasses import dataclass, field
+from itertools import chain
+from typing import Callable, Collection, Generic, Iterable, Iterator, TypeVar
+
+from shared.pipeline import DEFAULT_QUEUE_SIZE, StageTimings, run_pipelined, timed
+
+from .checkpoints import CheckpointStore, DeferredCheckpointStore
+from .mime import extract_html_body, message_headers
+from .models import MessageFilter
+from .processed_cache import ProcessedMessageCache
+from .service import GMAIL_BATCH_SIZE, GmailService, is_gone
+
+C = TypeVar("C")
+
+# Failed messages retried by the next runs at most, the newest are kept
+MAX_RETRY_MESSAGES = 100
+
+
+@dataclass
+class MailMessage:
+    """Dataclass to represent a dispatched message with its headers and raw html body."""
+
+    id: str
+    headers: dict[str, str]
+    html: bytes
+
+    @property
+    def text(self) -> str:
+        """The html body decoded as UTF-8."""
+        return self.html.decode("utf-8")
+
+    @staticmethod
+    def from_api(msg_details: dict) -> "MailMessage":
+        """Create from a message fetched with HEADERS_AND_BODY_FIELDS."""
+        return MailMessage(
+            id=msg_details["id"],
+            headers=message_headers(msg_details),
+            html=extract_html_body(msg_details["payload"]),
+        )
+
+
+# Gets the message and the context of the run (e.g. the outputs to fill) and
+# returns a JSON serializable result to remember for the processed message
+MailHandler = Callable[[MailMessage, C], dict | None]
+
+
+@dataclass
+class MailRoute(Generic[C]):
+    """A registered handler and the messages it is interested in."""
+
+    name: str
+    message_filter: MessageFilter
+    handler: MailHandler[C]
+
+
+@dataclass
+class DispatchResult:
+    """Dataclass to summarize one dispatch run."""
+
+    messages: int = 0
+    handled: dict[str, int] = field(default_factory=dict)
+    errors: list[str] = field(default_factory=list)
+    # IDs of the messages that could not be fetched or handled, retried next run
+    failed: list[str] = field(default_factory=list)
+    # handler results by message ID of a run with remember=False, for `remember`
+    processed: dict[str, dict[str, dict]] = field(default_factory=dict)
+    # fetch and decode, and the handlers as "handle:<route>"
+    timings: StageTimings = field(default_factory=StageTimings)
+
+
+class MailDispatcher(Generic[C]):
+    """
+    Runs one incremental Gmail sync for all registered routes per tick.
+
+    Instead of one search per use case, the senders of all routes are combined
+    into a single query (`{from:a from:b}`) or a single history listing, each
+    message is fetched once and handed to every route whose filter matches it.
+    The handlers run on a worker thread while the next messages are fetched.
+    A failing handler does not stop the other handlers or messages; its error is
+    returned in the DispatchResult.
+    """
+
+    def __init__(
+        self,
+        checkpoint_key: str = "mail_dispatch",
+        processed: ProcessedMessageCache | None = None,
+    ):
+        """
+        Args:
+            checkpoint_key: Key of the combined sync in the checkpoint store
+            processed: Cache of handled messages, which are then not fetched again
+        """
+        self.checkpoint_key = checkpoint_key
+        self.processed = processed
+        self._routes: list[MailRoute[C]] = []
+
+    @property
+    def routes(self) -> list[MailRoute[C]]:
+        return list(self._routes)
+
+    def register(
+        self, name: str, message_filter: MessageFilter, handler: MailHandler[C]
+    ) -> None:
+        """
+        Register a handler for the messages matching the filter.
+
+        Args:
+            name: Unique name of the route, used in results and errors
+            message_filter: Sender/subject of the messages to handle
+            handler: Called with each matching message and the run context
+        """
+        if any(route.name == name for route in self._routes):
+            raise ValueError(f"Mail route {name} is already registered")
+        self._routes.append(MailRoute(name, message_filter, handler))
+
+    def route(
+        self, name: str, message_filter: MessageFilter
+    ) -> Callable[[MailHandler[C]], MailHandler[C]]:
+        """Decorator version of `register`."""
+
+        def _decorator(handler: MailHandler[C]) -> MailHandler[C]:
+            self.register(name, message_filter, handler)
+            return handler
+
+        return _decorator
+
+    def filters(
+        self, route_names: Collection[str] | None = None
+    ) -> list[MessageFilter]:
+        """Get the filters of the given routes, of all routes by default."""
+        return [
+            route.message_filter
+            for route in self._routes
+            if route_names is None or route.name in route_names
+        ]
+
+    def dispatch(
+        self,
+        message: MailMessage,
+        context: C,
+        result: DispatchResult,
+        route_names: Collection[str] | None = None,
+        remember: bool = True,
+    ) -> dict[str, dict]:
+        """
+        Hand one message to every (given) route whose filter matches it.
+
+        Args:
+            message: The message to dispatch
+            context: Passed to every handler
+            result: Collects the handled counts and errors
+            route_names: Only dispatch to these routes, to all routes by default
+            remember: Mark the message as processed if no handler failed
+
+        Returns:
+            dict[str, dict]: Result of each handler that ran successfully
+        """
+        handler_results: dict[str, dict] = {}
+        failed = False
+        for route in self._routes:
+            if route_names is not None and route.name not in route_names:
+                continue
+            if not route.message_filter.matches(message.headers):
+                continue
+
+            try:
+                with result.timings.measure(f"handle:{route.name}"):
+                    handler_results[route.name] = route.handler(message, context) or {}
+                result.handled[route.name] = result.handled.get(route.name, 0) + 1
+            except Exception as e:
+                failed = True
+                if message.id not in result.failed:
+                    result.failed.append(message.id)
+                result.errors.append(
+                    f"{route.name} failed for message {message.id}: {str(e)}"
+                )
+
+        # failed messages are not remembered, so a retry handles them again
+        if remember and self.processed is not None and not failed:
+            self.processed.put(message.id, handler_results)
+        return handler_results
+
+    def remember(self, handler_results: dict[str, dict[str, dict]]) -> None:
+        """
+        Mark messages dispatched with `remember=False` as processed.
+
+        Args:
+            handler_results: Results of `dispatch` by message ID
+        """
+        if self.processed is None:
+            return
+        for message_id, results in handler_results.items():
+            self.processed.put(message_id, results)
+
+    @property
+    def _retry_key(self) -> str:
+        return f"{self.checkpoint_key}:retry"
+
+    def _load_retries(self, checkpoints: CheckpointStore) -> list[str]:
+        stored = checkpoints.load(self._retry_key)
+        return stored.split(",") if stored else []
+
+    def _fetch_retries(
+        self,
+        gmail_service: GmailService,
+        message_ids: list[str],
+        result: DispatchResult,
+        batch_size: int | None,
+    ) -> Iterator[dict]:
+        if not message_ids:
+            return
+        fetched = gmail_service.fetch_messages(message_ids, batch_size=batch_size)
+        for message_id in message_ids:
+            error = fetched.errors.get(message_id)
+            if message_id in fetched.messages:
+                yield fetched.messages[message_id]
+            elif error is not None and not is_gone(error):
+                result.failed.append(message_id)
+                result.errors.append(f"retry of message {message_id} failed: {error}")
+
+    def _decode(
+        self, messages: Iterable[dict], result: DispatchResult
+    ) -> Iterator[MailMessage]:
+        for msg_details in messages:
+            with result.timings.measure("decode"):
+                message = MailMessage.from_api(msg_details)
+            result.messages += 1
+            yield message
+
+    def run(
+        self,
+        gmail_service: GmailService,
+        context: C,
+        checkpoints: CheckpointStore,
+        fallback_hours: int = 1,
+        batch_size: int | None = GMAIL_BATCH_SIZE,
+        queue_size: int = DEFAULT_QUEUE_SIZE,
+        remember: bool = True,
+    ) -> DispatchResult:
+        """
+        Sync the new messages of all routes and dispatch them to their handlers.
+
+        Messages are fetched and decoded on this thread and handled on a worker
+        thread, so the next batch downloads while the previous messages are
+        parsed. The handlers run one at a time, in message order, and may use
+        their own (thread local) Google clients. The checkpoint advances once
+        every message is dispatched. The IDs of the messages that failed are
+        kept next to it (at most MAX_RETRY_MESSAGES) and fetched directly by the
+        next run, so one failing message does not hold back the sync.
+
+        With `remember=False` the handled messages are returned in
+        `DispatchResult.processed` instead of being marked as processed. Pass a
+        DeferredCheckpointStore then and commit it, like the processed messages,
+        once the outputs of the handlers are delivered.
+
+        Args:
+            gmail_service: Service used for the sync
+            context: Passed to every handler, e.g. the outputs of the function
+            checkpoints: Store for the historyId of the combined sync
+            fallback_hours: Lookback of the search used without a valid checkpoint
+            batch_size: Messages per batch request. None fetches one by one.
+            queue_size: Decoded messages waiting for the handlers at most. 0
+                handles every message on this thread before fetching the next.
+            remember: Mark the handled messages as processed right away
+
+        Returns:
+            DispatchResult: Message and handled counts, errors and stage timings
+        """
+        result = DispatchResult()
+        if not self._routes:
+            return result
+
+        deferred = DeferredCheckpointStore(checkpoints)
+        retry_ids = [
+            message_id
+            for message_id in self._load_retries(deferred)
+            if self.processed is None or message_id not in self.processed
+        ]
+
+        def skip(message_id: str) -> bool:
+            # retries are fetched on their own
+            if message_id in retry_ids:
+                return True
+            return self.processed is not None and message_id in self.processed
+
+        messages = timed(
+            chain(
+                self._fetch_retries(gmail_service, retry_ids, result, batch_size),
+                gmail_service.iter_new_messages(
+                    self.filters(),
+                    deferred,
+                    self.checkpoint_key,
+                    fallback_hours=fallback_hours,
+                    batch_size=batch_size,
+                    skip=skip,
+                ),
+            ),
+            result.timings,
+            "fetch",
+        )
+
+        def _dispatch(message: MailMessage) -> None:
+            handler_results = self.dispatch(message, context, result, remember=remember)
+            if not remember and message.id not in result.failed:
+                result.processed[message.id] = handler_results
+
+        run_pipelined(self._decode(messages, result), _dispatch, queue_size=queue_size)
+        if result.failed:
+            print(
+                f"{len(result.failed)} messages failed, retrying them in the next"
+                f" run of {self.checkpoint_key}"
+            )
+        deferred.save(self._retry_key, ",".join(result.failed[-MAX_RETRY_MESSAGES:]))
+        deferred.commit()
+
+        return result
@@ -0,0 +1,78 @@
+"""Helpers for the MIME tree of Gmail API message payloads."""
+
+import base64
+from typing import Iterator
+
+
+def payload_fields(part_fields: str, depth: int = 4, root_fields: str = "") -> str:
+    """
+    Build a `fields` mask selecting `part_fields` on the payload and nested parts.
+
+    Args:
+        part_fields: Comma separated fields to select on every part, e.g. "mimeType,body/data"
+        depth: How many levels of nested `parts` to include
+        root_fields: Additional fields selected on the top level payload only, e.g. "headers"
+
+    Returns:
+        str: Mask like "payload(mimeType,body/data,parts(mimeType,body/data))"
+    """
+    selection = part_fields
+    for _ in range(depth):
+        selection = f"{part_fields},parts({selection})"
+    if root_fields:
+        selection = f"{root_fields},{selection}"
+    return f"payload({selection})"
+
+
+# Everything needed to locate and decode the html body, nothing else
+HTML_BODY_FIELDS = f"id,{payload_fields('mimeType,body/data')}"
+
+# The html body plus the top level headers, to route a message by sender/subject
+HEADERS_AND_BODY_FIELDS = (
+    f"id,{payload_fields('mimeType,body/data', root_fields='headers')}"
+)
+
+
+def message_headers(msg_details: dict) -> dict[str, str]:
+    """Map header names to values for a message fetched in full or metadata format."""
+    return {
+        header["name"]: header["value"]
+        for header in msg_details.get("payload", {}).get("headers", [])
+    }
+
+
+def walk_parts(payload: dict) -> Iterator[dict]:
+    """Yield the payload and all of its nested parts, depth first in document order."""
+    stack = [payload]
+    while stack:
+        part = stack.pop()
+        yield part
+        stack.extend(reversed(part.get("parts", [])))
+
+
+def find_part(payload: dict, mime_type: str) -> dict | None:
+    """Find the first part of the given MIME type that carries inline data."""
+    for part in walk_parts(payload):
+        if part.get("mimeType") == mime_type and part.get("body", {}).get("data"):
+            return part
+    return None
+
+
+def decode_part(part: dict) -> bytes:
+    """Decode the base64url body data of a part without intermediate copies."""
+    # b64decode accepts the ASCII str directly, no .encode() needed
+    return base64.urlsafe_b64decode(part["body"]["data"])
+
+
+def extract_html_body(payload: dict) -> bytes:
+    """
+    Get the raw html body of a message payload.
+
+    Falls back to the body of a single-part message, whatever its type, and to
+    b"" if there is nothing to decode.
+    """
+    part = find_part(payload, "text/html")
+    if part is None and payload.get("body", {}).get("data"):
+        part = payload
+
+    return decode_part(part) if part is not None else b""
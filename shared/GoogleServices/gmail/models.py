@@ -1,6 +1,6 @@
 """Models for Gmail service."""
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from io import BytesIO
 
 
@@ -26,3 +26,35 @@ class MemoryAttachment:
 
     filename: str
     content: BytesIO
+
+
+@dataclass
+class MessageBatchResult:
+    """Dataclass to collect the per-message results and errors of a batched fetch."""
+
+    messages: dict[str, dict] = field(default_factory=dict)
+    errors: dict[str, Exception] = field(default_factory=dict)
+
+
+@dataclass
+class MessageFilter:
+    """
+    Sender/subject filter for Gmail messages.
+
+    Can be turned into a Gmail search query or applied to already fetched headers,
+    e.g. for messages returned by the history API, which cannot be searched.
+    """
+
+    sender: str
+    subject: str | None = None
+
+    def matches(self, headers: dict[str, str]) -> bool:
+        """Check if the From/Subject headers of a message match the filter."""
+        if self.sender.lower() not in headers.get("From", "").lower():
+            return False
+        if (
+            self.subject
+            and self.subject.lower() not in headers.get("Subject", "").lower()
+        ):
+            return False
+        return True
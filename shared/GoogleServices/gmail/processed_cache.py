@@ -0,0 +1,201 @@
+"""Cache of already processed Gmail messages and their parsed results."""
+
+import json
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from shared.AzureHelper.local_db import LocalDb
+
+# Processed messages are remembered for this long after they were last seen
+DEFAULT_PROCESSED_TTL_SECONDS = 30 * 24 * 60 * 60
+
+# Least recently seen entries beyond this are dropped from the SQLite file
+MAX_PROCESSED_ENTRIES = 10_000
+
+# Entries kept in the in-memory layer in front of SQLite
+MAX_MEMORY_ENTRIES = 512
+
+
+SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS processed_messages ("
+    " namespace TEXT NOT NULL,"
+    " message_id TEXT NOT NULL,"
+    " result TEXT NOT NULL,"
+    " last_seen REAL NOT NULL,"
+    " PRIMARY KEY (namespace, message_id))",
+    "CREATE INDEX IF NOT EXISTS processed_messages_last_seen"
+    " ON processed_messages (namespace, last_seen)",
+]
+
+
+@dataclass
+class ProcessedCacheStats:
+    """Counters of a ProcessedMessageCache."""
+
+    hits: int
+    misses: int
+    size: int
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+class ProcessedMessageCache:
+    """
+    Remembers which Gmail messages were processed, together with their parsed result.
+
+    Lookups go to an in-memory LRU first and to a SQLite file in the temp
+    directory of the worker second, so overlapping lookback windows and retries
+    can skip messages without fetching or parsing them again. Entries expire
+    `ttl` seconds after they were last seen and the file is capped at
+    `max_entries` per namespace.
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        db_name: str = "processed_messages",
+        ttl: float = DEFAULT_PROCESSED_TTL_SECONDS,
+        max_entries: int = MAX_PROCESSED_ENTRIES,
+        max_memory_entries: int = MAX_MEMORY_ENTRIES,
+    ):
+        """
+        Args:
+            namespace: Separates the entries of different use cases in one file
+            db_name: Name of the SQLite database in the temp directory
+            ttl: Seconds an entry is kept after it was last seen
+            max_entries: Maximum number of entries of this namespace in SQLite
+            max_memory_entries: Maximum number of entries held in memory
+        """
+        self.namespace = namespace
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_memory_entries = max_memory_entries
+        self._db = LocalDb(db_name, SCHEMA)
+        self._lock = threading.Lock()
+        self._memory: OrderedDict[str, tuple[dict, float]] = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+
+    def _remember(self, message_id: str, result: dict, expires_at: float) -> None:
+        self._memory[message_id] = (result, expires_at)
+        self._memory.move_to_end(message_id)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def _lookup(self, message_id: str) -> dict | None:
+        now = time.time()
+
+        cached = self._memory.get(message_id)
+        if cached and cached[1] > now:
+            self._memory.move_to_end(message_id)
+            return cached[0]
+        self._memory.pop(message_id, None)
+
+        row = (
+            self._db()
+            .execute(
+                "SELECT result FROM processed_messages"
+                " WHERE namespace = ? AND message_id = ? AND last_seen > ?",
+                (self.namespace, message_id, now - self.ttl),
+            )
+            .fetchone()
+        )
+        if row is None:
+            return None
+
+        # seen again, so keep it for another ttl
+        with self._db():
+            self._db().execute(
+                "UPDATE processed_messages SET last_seen = ?"
+                " WHERE namespace = ? AND message_id = ?",
+                (now, self.namespace, message_id),
+            )
+        result = json.loads(row[0])
+        self._remember(message_id, result, now + self.ttl)
+        return result
+
+    def get(self, message_id: str) -> dict | None:
+        """
+        Get the stored result of a processed message.
+
+        Args:
+            message_id: Gmail message ID
+
+        Returns:
+            dict | None: The stored result, or None if the message was not processed
+        """
+        with self._lock:
+            result = self._lookup(message_id)
+            if result is None:
+                self._misses += 1
+            else:
+                self._hits += 1
+            return result
+
+    def __contains__(self, message_id: str) -> bool:
+        return self.get(message_id) is not None
+
+    def put(self, message_id: str, result: dict) -> None:
+        """
+        Mark a message as processed.
+
+        Args:
+            message_id: Gmail message ID
+            result: JSON serializable parsed result, e.g. `dataclasses.asdict(...)`
+        """
+        now = time.time()
+        with self._lock, self._db():
+            self._db().execute(
+                "INSERT INTO processed_messages (namespace, message_id, result, last_seen)"
+                " VALUES (?, ?, ?, ?)"
+                " ON CONFLICT(namespace, message_id) DO UPDATE SET"
+                " result = excluded.result, last_seen = excluded.last_seen",
+                (self.namespace, message_id, json.dumps(result), now),
+            )
+            self._remember(message_id, result, now + self.ttl)
+
+    def prune(self) -> int:
+        """
+        Drop expired entries and the least recently seen ones beyond `max_entries`.
+
+        Returns:
+            int: Number of dropped entries
+        """
+        with self._lock, self._db():
+            expired = (
+                self._db()
+                .execute(
+                    "DELETE FROM processed_messages WHERE namespace = ? AND last_seen <= ?",
+                    (self.namespace, time.time() - self.ttl),
+                )
+                .rowcount
+            )
+            evicted = (
+                self._db()
+                .execute(
+                    "DELETE FROM processed_messages WHERE namespace = ? AND message_id IN ("
+                    " SELECT message_id FROM processed_messages WHERE namespace = ?"
+                    " ORDER BY last_seen DESC LIMIT -1 OFFSET ?)",
+                    (self.namespace, self.namespace, self.max_entries),
+                )
+                .rowcount
+            )
+            return expired + evicted
+
+    def stats(self) -> ProcessedCacheStats:
+        """Get the hit/miss counters since the worker started and the stored entry count."""
+        with self._lock:
+            (size,) = (
+                self._db()
+                .execute(
+                    "SELECT COUNT(*) FROM processed_messages WHERE namespace = ?",
+                    (self.namespace,),
+                )
+                .fetchone()
+            )
+            return ProcessedCacheStats(hits=self._hits, misses=self._misses, size=size)
@@ -1,22 +1,72 @@
 """Gmail service implementation for interacting with Gmail API."""
 
+from concurrent.futures import ThreadPoolExecutor
+import threading
+
+import httplib2
+from google_auth_httplib2 import AuthorizedHttp
 from googleapiclient.discovery import build
+from googleapiclient.errors import HttpError
 from google.oauth2.credentials import Credentials
 from datetime import datetime, timedelta, timezone
 import base64
 import re
 from io import BytesIO
-from typing import List
+from typing import Callable, Iterator, List
 
 from shared.AzureHelper.download import get_temp_dir
 from ..GmailQueryBuilder import GmailQueryBuilder
-from .models import MessageId, AttachmentData, MemoryAttachment
+from .checkpoints import CheckpointStore
+from .mime import (
+    HEADERS_AND_BODY_FIELDS,
+    HTML_BODY_FIELDS,
+    extract_html_body,
+    message_headers,
+    payload_fields,
+    walk_parts,
+)
+from .models import (
+    MessageId,
+    AttachmentData,
+    MemoryAttachment,
+    MessageBatchResult,
+    MessageFilter,
+)
+
+# Gmail accepts up to 100 calls per batch, but starts rate limiting well before
+# that. 50 is the size recommended in the Gmail API docs.
+GMAIL_BATCH_SIZE = 50
+
+# Default page size of messages.list (the API allows up to 500)
+GMAIL_PAGE_SIZE = 100
+
+# Only request what MessageId needs from messages.list
+MESSAGE_ID_FIELDS = "messages(id,threadId),nextPageToken"
+
+# Only request what is needed to find the attachments of a message
+ATTACHMENT_FIELDS = f"id,{payload_fields('filename,body/attachmentId')}"
+
+# Concurrent attachment downloads per message
+ATTACHMENT_WORKERS = 4
+
+# Headers, receive time and html body of a message, what the mail handlers work with
+MAIL_FIELDS = f"internalDate,{HEADERS_AND_BODY_FIELDS}"
+
+# Only request the added messages from users.history.list
+HISTORY_FIELDS = "history(messagesAdded(message(id,threadId))),historyId,nextPageToken"
+
+
+def is_gone(error: Exception) -> bool:
+    """Check if a messages.get failed because the message no longer exists."""
+    return isinstance(error, HttpError) and error.resp.status == 404
 
 
 class GmailService:
     def __init__(self, credentials: Credentials):
         self.credentials = credentials
         self.service = None
+        # per worker thread state for concurrent downloads
+        self._local = threading.local()
 
     def authenticate(self):
         """Authenticate with Gmail API."""
@@ -25,6 +75,70 @@ class GmailService:
             "gmail", "v1", credentials=self.credentials, cache_discovery=False
         )
 
+    def _iter_message_id_pages(
+        self, query: str, page_size: int = GMAIL_PAGE_SIZE
+    ) -> Iterator[list[MessageId]]:
+        """
+        Lazily page through the messages matching the query.
+
+        Args:
+            query (str): Gmail search query
+            page_size (int): Number of message IDs requested per page
+
+        Yields:
+            list[MessageId]: One page of message IDs and thread IDs
+
+        Raises:
+            HttpError: If a page could not be listed. A partial listing is never
+                returned as if it were complete.
+        """
+        if not self.service:
+            self.authenticate()
+
+        page_token = None
+        while True:
+            kwargs = {
+                "userId": "me",
+                "q": query,
+                "maxResults": page_size,
+                "fields": MESSAGE_ID_FIELDS,
+            }
+            if page_token:
+                kwargs["pageToken"] = page_token
+
+            try:
+                results = self.service.users().messages().list(**kwargs).execute()  # type: ignore
+            except Exception as e:
+                print(f"Error querying messages: {str(e)}")
+                raise
+
+            yield [
+                MessageId(id=message["id"], thread_id=message.get("threadId", ""))
+                for message in results.get("messages", [])
+            ]
+
+            page_token = results.get("nextPageToken")
+            if not page_token:
+                return
+
+    def iter_message_ids(
+        self, query: str, page_size: int = GMAIL_PAGE_SIZE
+    ) -> Iterator[MessageId]:
+        """
+        Query messages using Gmail API with the given query, following all result pages.
+
+        Pages are only requested once the previous one has been consumed.
+
+        Args:
+            query (str): Gmail search query
+            page_size (int): Number of message IDs requested per page
+
+        Yields:
+            MessageId: Message ID and thread ID of each matching message
+        """
+        for page in self._iter_message_id_pages(query, page_size=page_size):
+            yield from page
+
     def _query_messages_ids(self, query) -> list[MessageId]:
         """
         Query messages using Gmail API with the given query.
@@ -35,24 +149,36 @@ class GmailService:
         Returns:
             list: List of message IDs and thread IDs
         """
+        return list(self.iter_message_ids(query))
+
+    def _message_get_request(
+        self, message_id: str, format="full", metadata_headers=None, fields=None
+    ):
+        """
+        Build (but do not execute) a messages.get request.
+
+        Args:
+            message_id (str): The ID of the message to fetch
+            format (str): The format to return the message in (full, metadata, minimal)
+            metadata_headers (list): List of headers to include when format is metadata
+            fields (str): Optional field mask to only receive part of the message resource
+
+        Returns:
+            HttpRequest: The prepared request
+        """
         if not self.service:
             self.authenticate()
 
-        try:
-            results = (
-                self.service.users().messages().list(userId="me", q=query).execute()  # type: ignore
-            )
-            messages = results.get("messages", [])
-            return [
-                MessageId(id=message["id"], thread_id=message.get("threadId", ""))
-                for message in messages
-            ]
-        except Exception as e:
-            print(f"Error querying messages: {str(e)}")
-            return []
+        kwargs = {"userId": "me", "id": message_id, "format": format}
+        if metadata_headers and format == "metadata":
+            kwargs["metadataHeaders"] = metadata_headers
+        if fields:
+            kwargs["fields"] = fields
+
+        return self.service.users().messages().get(**kwargs)  # type: ignore
 
     def _fetch_message_details(
-        self, message_id: str, format="full", metadata_headers=None
+        self, message_id: str, format="full", metadata_headers=None, fields=None
     ):
         """
         Fetch details for a specific message.
@@ -61,69 +187,341 @@ class GmailService:
             message_id (str): The ID of the message to fetch
             format (str): The format to return the message in (full, metadata, minimal)
             metadata_headers (list): List of headers to include when format is metadata
+            fields (str): Optional field mask to only receive part of the message resource
 
         Returns:
             dict: Message details
         """
         try:
-            kwargs = {"userId": "me", "id": message_id, "format": format}
-            if metadata_headers and format == "metadata":
-                kwargs["metadataHeaders"] = metadata_headers
-
-            return self.service.users().messages().get(**kwargs).execute()  # type: ignore
+            return self._message_get_request(
+                message_id,
+                format=format,
+                metadata_headers=metadata_headers,
+                fields=fields,
+            ).execute()
         except Exception as e:
             print(f"Error fetching message details: {str(e)}")
             return None
 
-    def _get_pdf_attachments(self, message_id) -> List[AttachmentData]:
+    def _fetch_messages_batch(
+        self,
+        message_ids: list[str],
+        format="full",
+        metadata_headers=None,
+        fields=None,
+        batch_size: int = GMAIL_BATCH_SIZE,
+    ) -> MessageBatchResult:
         """
-        Helper method to get PDF attachments from a message.
+        Fetch details for several messages using HTTP batch requests.
+
+        The message gets are grouped into chunks of `batch_size`, so N messages
+        cost ceil(N / batch_size) round trips instead of N.
+
+        Args:
+            message_ids (list[str]): The IDs of the messages to fetch
+            format (str): The format to return the messages in (full, metadata, minimal)
+            metadata_headers (list): List of headers to include when format is metadata
+            fields (str): Optional field mask to only receive part of the message resource
+            batch_size (int): Maximum number of message gets per batch request
+
+        Returns:
+            MessageBatchResult: Fetched messages and per-message errors, keyed by message ID
+        """
+        if not self.service:
+            self.authenticate()
+
+        result = MessageBatchResult()
+
+        def _collect(request_id, response, exception):
+            if exception is not None:
+                result.errors[request_id] = exception
+            else:
+                result.messages[request_id] = response
+
+        unique_ids = list(dict.fromkeys(message_ids))
+        for start in range(0, len(unique_ids), batch_size):
+            chunk = unique_ids[start : start + batch_size]
+            batch = self.service.new_batch_http_request(callback=_collect)  # type: ignore
+            for message_id in chunk:
+                batch.add(
+                    self._message_get_request(
+                        message_id,
+                        format=format,
+                        metadata_headers=metadata_headers,
+                        fields=fields,
+                    ),
+                    request_id=message_id,
+                )
+
+            try:
+                batch.execute()
+            except Exception as e:
+                # the whole batch failed (transport error, malformed response)
+                for message_id in chunk:
+                    if message_id not in result.messages:
+                        result.errors.setdefault(message_id, e)
+
+        for message_id, error in result.errors.items():
+            print(f"Error fetching message details for {message_id}: {str(error)}")
+
+        return result
+
+    def fetch_messages(
+        self,
+        message_ids: list[str],
+        format="full",
+        metadata_headers=None,
+        fields: str | None = MAIL_FIELDS,
+        batch_size: int | None = GMAIL_BATCH_SIZE,
+    ) -> MessageBatchResult:
+        """
+        Fetch several messages, by default with their headers, receive time and html body.
+
+        Use `format` and `fields` to request other parts of the message resource,
+        e.g. format="metadata" for the headers only or fields=None for all of it.
+
+        Args:
+            message_ids (list[str]): The IDs of the messages to fetch
+            format (str): The format to return the messages in (full, metadata, minimal)
+            metadata_headers (list): List of headers to include when format is metadata
+            fields (str | None): Field mask of the message resource, None for all fields
+            batch_size (int | None): Messages per batch request. None fetches one by one.
+
+        Returns:
+            MessageBatchResult: Fetched messages and per-message errors, keyed by message ID
+        """
+        if batch_size is not None:
+            return self._fetch_messages_batch(
+                message_ids,
+                format=format,
+                metadata_headers=metadata_headers,
+                fields=fields,
+                batch_size=batch_size,
+            )
+
+        result = MessageBatchResult()
+        for message_id in dict.fromkeys(message_ids):
+            try:
+                result.messages[message_id] = self._message_get_request(
+                    message_id,
+                    format=format,
+                    metadata_headers=metadata_headers,
+                    fields=fields,
+                ).execute()
+            except Exception as e:
+                print(f"Error fetching message details for {message_id}: {str(e)}")
+                result.errors[message_id] = e
+        return result
+
+    def _fetch_messages(
+        self,
+        message_ids: list[str],
+        format="full",
+        metadata_headers=None,
+        fields=None,
+        batch_size: int | None = GMAIL_BATCH_SIZE,
+    ) -> list[dict]:
+        """
+        Fetch details for several messages, keeping the order of `message_ids`.
+
+        Messages that could not be fetched are skipped.
+
+        Args:
+            message_ids (list[str]): The IDs of the messages to fetch
+            format (str): The format to return the messages in (full, metadata, minimal)
+            metadata_headers (list): List of headers to include when format is metadata
+            fields (str): Optional field mask to only receive part of the message resource
+            batch_size (int | None): Messages per batch request. None fetches one by one.
+
+        Returns:
+            list[dict]: Message details
+        """
+        result = self.fetch_messages(
+            message_ids,
+            format=format,
+            metadata_headers=metadata_headers,
+            fields=fields,
+            batch_size=batch_size,
+        )
+        return [
+            result.messages[message_id]
+            for message_id in message_ids
+            if result.messages.get(message_id)
+        ]
+
+    def iter_messages_with_body(
+        self,
+        query: str,
+        page_size: int = GMAIL_BATCH_SIZE,
+        batch_size: int | None = GMAIL_BATCH_SIZE,
+    ) -> Iterator[str]:
+        """
+        Query messages using Gmail API with the given query and yield their body.
+
+        Bodies are fetched with `fetch_messages` one result page at a time, so
+        only a single page of messages is held in memory.
+
+        Args:
+            query (str): Gmail search query
+            page_size (int): Number of messages listed (and fetched) per page
+            batch_size (int | None): Messages per batch request. None fetches one by one.
+
+        Yields:
+            str: Message body, in the order of the search results
+
+        Raises:
+            RuntimeError: If a message of the page could not be fetched
+        """
+        for page in self._iter_message_id_pages(query, page_size=page_size):
+            message_ids = [message.id for message in page]
+            result = self.fetch_messages(
+                message_ids, fields=HTML_BODY_FIELDS, batch_size=batch_size
+            )
+            if result.errors:
+                raise RuntimeError(
+                    f"Could not fetch {len(result.errors)} of {len(message_ids)} messages"
+                ) from next(iter(result.errors.values()))
+            for message_id in message_ids:
+                payload = result.messages[message_id]["payload"]
+                yield extract_html_body(payload).decode("utf-8")
+
+    def query_messages_with_body(
+        self, query: str, batch_size: int | None = GMAIL_BATCH_SIZE
+    ) -> list[str]:
+        """
+        Query messages using Gmail API with the given query and return their body.
+
+        Args:
+            query (str): Gmail search query
+            batch_size (int | None): Messages per batch request. None fetches one by one.
+
+        Returns:
+            list: List of message bodies
+
+        Raises:
+            RuntimeError: If a message could not be fetched
+        """
+        return list(self.iter_messages_with_body(query, batch_size=batch_size))
+
+    def _thread_http(self):
+        """Get the authorized http object of the calling worker thread."""
+        http = getattr(self._local, "http", None)
+        if http is None:
+            http = self._local.http = self._new_http()
+        return http
+
+    def _new_http(self):
+        """Create an authorized http object, httplib2 objects must not be shared between threads."""
+        return AuthorizedHttp(self.credentials, http=httplib2.Http())
+
+    def _list_pdf_attachments(self, message_id) -> dict[str, str]:
+        """
+        Find the PDF attachments of a message anywhere in its MIME tree.
 
         Args:
             message_id (str): The ID of the message to get attachments from
 
         Returns:
-            List[AttachmentData]: List of AttachmentData named tuples with filename and data
+            dict[str, str]: Filename per attachment ID, each attachment ID only once
+
+        Raises:
+            HttpError: If the message could not be fetched
+        """
+        message = self._message_get_request(
+            message_id, fields=ATTACHMENT_FIELDS
+        ).execute()
+
+        attachments = {}
+        for part in walk_parts(message.get("payload", {})):
+            filename: str = part.get("filename", "")
+            attachment_id = part.get("body", {}).get("attachmentId")
+            if filename.lower().endswith(".pdf") and attachment_id:
+                attachments.setdefault(attachment_id, filename)
+
+        return attachments
+
+    def _download_attachment(self, filename: str, request) -> AttachmentData:
+        """Execute an attachments.get request on the http object of the worker thread."""
+        attachment = request.execute(http=self._thread_http())
+        return AttachmentData(
+            filename=filename, data=base64.urlsafe_b64decode(attachment["data"])
+        )
+
+    def iter_pdf_attachments(
+        self, message_id, max_workers: int = ATTACHMENT_WORKERS
+    ) -> Iterator[AttachmentData]:
+        """
+        Download the PDF attachments of a message concurrently.
+
+        Attachments are downloaded by a bounded pool of worker threads and
+        yielded in the order of their MIME parts, each as soon as it and the
+        ones before it are done, so callers can process the first attachment
+        while the others are still downloading. Attachments sharing an
+        attachment ID are downloaded once.
+
+        Args:
+            message_id (str): The ID of the message to get attachments from
+            max_workers (int): Maximum number of concurrent downloads
+
+        Yields:
+            AttachmentData: Filename and data of each PDF attachment, in MIME part order
+
+        Raises:
+            HttpError: If the attachments of the message could not be listed
+            RuntimeError: After the other attachments, if any download failed, so
+                a caller never mistakes a partial download for all attachments
         """
         if not self.service:
             self.authenticate()
 
+        attachments = self._list_pdf_attachments(message_id)
+        if not attachments:
+            return
+
+        executor = ThreadPoolExecutor(
+            max_workers=min(max_workers, len(attachments)),
+            thread_name_prefix="gmail-attachments",
+        )
         try:
-            message = self._fetch_message_details(message_id)
-            if not message:
-                return []
-
-            attachments = []
-            parts = message.get("payload", {}).get("parts", [])
-
-            for part in parts:
-                filename: str = part.get("filename", "")
-                if filename.lower().endswith(".pdf"):
-                    if "body" in part and "attachmentId" in part["body"]:
-                        attachment = (
-                            self.service.users()  # type: ignore
-                            .messages()
-                            .attachments()
-                            .get(
-                                userId="me",
-                                messageId=message_id,
-                                id=part["body"]["attachmentId"],
-                            )
-                            .execute()
-                        )
-
-                        if attachment:
-                            attachment_data = base64.urlsafe_b64decode(
-                                attachment["data"]
-                            )
-                            attachments.append(
-                                AttachmentData(filename=filename, data=attachment_data)
-                            )
-
-            return attachments
-        except Exception as e:
-            print(f"Error fetching PDF attachments: {str(e)}")
-            return []
+            futures = []
+            for attachment_id, filename in attachments.items():
+                # requests are built here, only their execution runs in the workers
+                request = (
+                    self.service.users()  # type: ignore
+                    .messages()
+                    .attachments()
+                    .get(userId="me", messageId=message_id, id=attachment_id)
+                )
+                future = executor.submit(self._download_attachment, filename, request)
+                futures.append((filename, future))
+
+            failed = []
+            for filename, future in futures:
+                try:
+                    yield future.result()
+                except Exception as e:
+                    print(f"Error fetching PDF attachment {filename}: {str(e)}")
+                    failed.append((filename, e))
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        if failed:
+            raise RuntimeError(
+                f"Could not download {', '.join(name for name, _ in failed)}"
+                f" of message {message_id}"
+            ) from failed[0][1]
+
+    def _get_pdf_attachments(self, message_id) -> List[AttachmentData]:
+        """
+        Helper method to get PDF attachments from a message.
+
+        Args:
+            message_id (str): The ID of the message to get attachments from
+
+        Returns:
+            List[AttachmentData]: List of AttachmentData named tuples with filename and data
+        """
+        return list(self.iter_pdf_attachments(message_id))
 
     def download_pdf_attachments(self, message_id) -> list[str]:
         """
@@ -135,10 +533,9 @@ class GmailService:
         Returns:
             list[str]: List of file paths to the saved PDF attachments
         """
-        attachments = self._get_pdf_attachments(message_id)
         file_paths = []
 
-        for attachment in attachments:
+        for attachment in self.iter_pdf_attachments(message_id):
             download_path = get_temp_dir() / attachment.filename
             with open(download_path, "wb") as f:
                 f.write(attachment.data)
@@ -146,6 +543,27 @@ class GmailService:
 
         return file_paths
 
+    def iter_pdf_attachments_to_ram(
+        self, message_id, max_workers: int = ATTACHMENT_WORKERS
+    ) -> Iterator[MemoryAttachment]:
+        """
+        Download the PDF attachments of a message into memory, yielding each as it finishes.
+
+        Args:
+            message_id (str): The ID of the message to get attachments from
+            max_workers (int): Maximum number of concurrent downloads
+
+        Yields:
+            MemoryAttachment: Filename and content (BytesIO object) of each attachment
+
+        Raises:
+            HttpError | RuntimeError: Like `iter_pdf_attachments`
+        """
+        for attachment in self.iter_pdf_attachments(message_id, max_workers):
+            yield MemoryAttachment(
+                filename=attachment.filename, content=BytesIO(attachment.data)
+            )
+
     def download_pdf_attachments_to_ram(self, message_id) -> List[MemoryAttachment]:
         """
         Download all PDF attachments from a given message into memory.
@@ -157,23 +575,15 @@ class GmailService:
             List[MemoryAttachment]: List of MemoryAttachment objects containing
             attachment details with filename and content (BytesIO object)
         """
-        attachments = self._get_pdf_attachments(message_id)
-        memory_files = []
-
-        for attachment in attachments:
-            file_obj = BytesIO(attachment.data)
-            memory_files.append(
-                MemoryAttachment(filename=attachment.filename, content=file_obj)
-            )
+        return list(self.iter_pdf_attachments_to_ram(message_id))
 
-        return memory_files
-
-    def get_recent_emails(self, days=2):
+    def get_recent_emails(self, days=2, batch_size: int | None = GMAIL_BATCH_SIZE):
         """
         Fetch emails received in the last specified days.
 
         Args:
             days (int): Number of days to look back (default: 2)
+            batch_size (int | None): Messages per batch request. None fetches one by one.
 
         Returns:
             list: List of dictionaries containing email details
@@ -187,92 +597,182 @@ class GmailService:
         messages = self._query_messages_ids(query)
         emails = []
 
-        for message in messages:
-            msg_details = self._fetch_message_details(
-                message.id,
-                format="metadata",
-                metadata_headers=["From", "Subject", "Date"],
-            )
-
-            if msg_details:
-                headers = msg_details["payload"]["headers"]
-                email_data = {
-                    "id": message.id,
-                    "from": next(
-                        (h["value"] for h in headers if h["name"] == "From"), ""
-                    ),
-                    "subject": next(
-                        (h["value"] for h in headers if h["name"] == "Subject"), ""
-                    ),
-                    "date": next(
-                        (h["value"] for h in headers if h["name"] == "Date"), ""
-                    ),
-                    "snippet": msg_details.get("snippet", ""),
-                }
-                emails.append(email_data)
+        for msg_details in self._fetch_messages(
+            [message.id for message in messages],
+            format="metadata",
+            metadata_headers=["From", "Subject", "Date"],
+            batch_size=batch_size,
+        ):
+            headers = msg_details["payload"]["headers"]
+            email_data = {
+                "id": msg_details["id"],
+                "from": next((h["value"] for h in headers if h["name"] == "From"), ""),
+                "subject": next(
+                    (h["value"] for h in headers if h["name"] == "Subject"), ""
+                ),
+                "date": next((h["value"] for h in headers if h["name"] == "Date"), ""),
+                "snippet": msg_details.get("snippet", ""),
+            }
+            emails.append(email_data)
 
         return emails
 
-    def query_messages_with_body(self, query: str) -> list[str]:
-        """
-        Query messages using Gmail API with the given query and return their body.
+    def _get_current_history_id(self) -> str:
+        """Get the current historyId of the mailbox."""
+        if not self.service:
+            self.authenticate()
 
-        Args:
-            query (str): Gmail search query
+        profile = (
+            self.service.users().getProfile(userId="me", fields="historyId").execute()  # type: ignore
+        )
+        return str(profile["historyId"])
 
-        Returns:
-            list: List of message bodies
+    def _list_added_message_ids(
+        self, start_history_id: str
+    ) -> tuple[list[MessageId], str]:
         """
-        messages = self._query_messages_ids(query)
-        message_bodies = []
+        List the messages added to the mailbox since the given historyId.
 
-        for message in messages:
-            msg_details = self._fetch_message_details(message.id)
-            if msg_details:
-                if "parts" in msg_details["payload"]:
-                    parts = msg_details["payload"]["parts"]
-                    body = ""
-                    for part in parts:
-                        if part["mimeType"] == "text/html":
-                            body = base64.urlsafe_b64decode(
-                                part["body"]["data"].encode("utf-8")
-                            ).decode("utf-8")
-                            break
-                else:
-                    body = base64.urlsafe_b64decode(
-                        msg_details["payload"]["body"]["data"].encode("utf-8")
-                    ).decode("utf-8")
+        Args:
+            start_history_id (str): historyId to start listing from
 
-                message_bodies.append(body)
+        Returns:
+            tuple[list[MessageId], str]: Added messages and the current historyId
 
-        return message_bodies
+        Raises:
+            HttpError: With status 404 if the historyId is too old to be listed
+        """
+        if not self.service:
+            self.authenticate()
 
-    def get_winsim_invoice_messages(self, hours=1) -> list[str]:
+        added: dict[str, MessageId] = {}
+        history_id = start_history_id
+        page_token = None
+        while True:
+            kwargs = {
+                "userId": "me",
+                "startHistoryId": start_history_id,
+                "historyTypes": ["messageAdded"],
+                "fields": HISTORY_FIELDS,
+            }
+            if page_token:
+                kwargs["pageToken"] = page_token
+
+            results = self.service.users().history().list(**kwargs).execute()  # type: ignore
+
+            for record in results.get("history", []):
+                for added_message in record.get("messagesAdded", []):
+                    message = added_message["message"]
+                    added[message["id"]] = MessageId(
+                        id=message["id"], thread_id=message.get("threadId", "")
+                    )
+
+            history_id = str(results.get("historyId", history_id))
+            page_token = results.get("nextPageToken")
+            if not page_token:
+                return list(added.values()), history_id
+
+    def iter_new_messages(
+        self,
+        message_filters: list[MessageFilter],
+        checkpoints: CheckpointStore,
+        checkpoint_key: str,
+        fallback_hours: int = 1,
+        batch_size: int | None = GMAIL_BATCH_SIZE,
+        skip: Callable[[str], bool] | None = None,
+    ) -> Iterator[dict]:
         """
-        Fetch WinSIM invoice notification emails from the last specified hours.
+        Incrementally sync the messages matching any of the filters since the last run.
 
-        Args:
-            hours (int): Number of hours to look back (default: 1)
+        Uses users.history.list to only look at messages added after the stored
+        historyId. If there is no checkpoint yet or it has expired, falls back to
+        a single search for all senders over the last `fallback_hours`. The new
+        checkpoint is only saved once the returned iterator has been fully
+        consumed, so a run that fails halfway is retried from the old checkpoint.
+        It is not saved either if a message could not be fetched, so the next
+        run lists and fetches it again.
 
-        Returns:
-            list[dict]: List of dictionaries containing message IDs and invoice details
-                Each dict contains:
-                - id: The Gmail message ID
-                - invoice_number: The invoice number extracted from the PDF filename
-                - date: The date of the email
+        Args:
+            message_filters (list[MessageFilter]): Sender/subject of the wanted messages
+            checkpoints (CheckpointStore): Store for the last processed historyId
+            checkpoint_key (str): Key of this sync in the checkpoint store
+            fallback_hours (int): Lookback of the search used without a valid checkpoint
+            batch_size (int | None): Messages per batch request. None fetches one by one.
+            skip (Callable[[str], bool] | None): Messages whose ID it returns True for
+                are not fetched, e.g. because they were already processed
+
+        Yields:
+            dict: Message with its top level headers and the html body parts
         """
-        # Calculate time threshold
-        time_threshold = datetime.now(timezone.utc) - timedelta(hours=hours)
 
-        # Build query
-        query = (
-            GmailQueryBuilder()
-            .from_email("no-reply@winsim.de")
-            .subject("Ihre winSIM-Rechnung", exact=True)
-            .after_date(time_threshold)
-            .build()
-        )
+        def _matches(msg_details: dict) -> bool:
+            headers = message_headers(msg_details)
+            return any(f.matches(headers) for f in message_filters)
+
+        fetch_failed = False
+
+        def _fetch(message_ids: list[str], **kwargs) -> list[dict]:
+            nonlocal fetch_failed
+            result = self.fetch_messages(message_ids, batch_size=batch_size, **kwargs)
+            # a message deleted since it was listed will not come back
+            if any(not is_gone(error) for error in result.errors.values()):
+                fetch_failed = True
+            return [result.messages[i] for i in message_ids if i in result.messages]
+
+        start_history_id = checkpoints.load(checkpoint_key)
+
+        added = None
+        if start_history_id:
+            try:
+                added, new_history_id = self._list_added_message_ids(start_history_id)
+            except HttpError as e:
+                if e.resp.status != 404:
+                    raise
+                print(
+                    f"History {start_history_id} of {checkpoint_key} expired, "
+                    "falling back to search"
+                )
+
+        if added is None:
+            # read the history id first, so mails arriving during the search are
+            # seen again next time instead of being skipped
+            new_history_id = self._get_current_history_id()
+
+            query_builder = GmailQueryBuilder().from_any(
+                f.sender for f in message_filters
+            )
+            if len(message_filters) == 1 and message_filters[0].subject:
+                query_builder.subject(message_filters[0].subject, exact=True)
+            time_threshold = datetime.now(timezone.utc) - timedelta(
+                hours=fallback_hours
+            )
+            query = query_builder.after_date(time_threshold).build()
+
+            for page in self._iter_message_id_pages(query, page_size=GMAIL_BATCH_SIZE):
+                for msg_details in _fetch(
+                    [m.id for m in page if not (skip and skip(m.id))],
+                    fields=HEADERS_AND_BODY_FIELDS,
+                ):
+                    # the search has no per-sender subjects, so check them here
+                    if _matches(msg_details):
+                        yield msg_details
+        else:
+            candidates = _fetch(
+                [m.id for m in added if not (skip and skip(m.id))],
+                format="metadata",
+                metadata_headers=["From", "Subject"],
+                fields="id,payload/headers",
+            )
+            matching_ids = [
+                msg_details["id"] for msg_details in candidates if _matches(msg_details)
+            ]
 
-        messages = self._query_messages_ids(query)
+            yield from _fetch(matching_ids, fields=HEADERS_AND_BODY_FIELDS)
 
-        return [msg.id for msg in messages]
+        if fetch_failed:
+            print(
+                f"Not all messages of {checkpoint_key} could be fetched, "
+                f"keeping the checkpoint {start_history_id}"
+            )
+            return
+        checkpoints.save(checkpoint_key, new_history_id)
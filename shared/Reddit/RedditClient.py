@@ -48,6 +48,11 @@ class RedditClient:
         logging.info(f"Fetching posts from subreddit: {subreddit}")
         url = self.build_subreddit_url(subreddit)
         raw_posts = self._get_raw_post_response(url)
+        return self.parse_posts(raw_posts, subreddit)
+
+    @staticmethod
+    def parse_posts(raw_posts: dict, subreddit: str) -> list[RedditPost]:
+        """Map a raw listing response of the Reddit API to posts."""
         posts_data = raw_posts.get("data", {}).get("children", [])
         return [
             RedditPost(
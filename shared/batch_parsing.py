@@ -0,0 +1,102 @@
+"""Parse many documents on several processes, keeping input order and isolating errors."""
+
+import os
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass
+from itertools import islice
+from typing import Callable, Generic, Iterable, Iterator, TypeVar
+
+T = TypeVar("T")
+
+# Documents sent to a worker at once, amortizes the inter-process overhead
+DEFAULT_CHUNK_SIZE = 16
+
+
+@dataclass
+class ParseResult(Generic[T]):
+    """Dataclass to represent the outcome of parsing one document of a batch."""
+
+    index: int
+    value: T | None = None
+    error: str | None = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def _parse_chunk(
+    parse: Callable[[str], T], start: int, chunk: list[str]
+) -> list[ParseResult[T]]:
+    results: list[ParseResult[T]] = []
+    for index, document in enumerate(chunk, start):
+        try:
+            results.append(ParseResult(index=index, value=parse(document)))
+        except Exception as e:
+            # the exception itself might not be picklable
+            results.append(ParseResult(index=index, error=f"{type(e).__name__}: {e}"))
+    return results
+
+
+def _chunks(documents: Iterable[str], chunk_size: int) -> Iterator[list[str]]:
+    iterator = iter(documents)
+    while chunk := list(islice(iterator, chunk_size)):
+        yield chunk
+
+
+def iter_parse_batch(
+    parse: Callable[[str], T],
+    documents: Iterable[str],
+    workers: int | None = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> Iterator[ParseResult[T]]:
+    """
+    Parse documents on a process pool and yield the results in input order.
+
+    Documents are read from the iterable lazily: at most two chunks per worker
+    are in flight, so memory stays bounded for arbitrarily long inputs. A
+    document that fails to parse yields a result with `error` set instead of
+    stopping the batch.
+
+    Args:
+        parse: Picklable (module level) function parsing one document
+        documents: The documents, e.g. a generator over fetched mails
+        workers: Number of processes, defaults to the CPU count. 1 parses in
+            this process without a pool.
+        chunk_size: Documents per work unit sent to a process
+
+    Yields:
+        ParseResult: Index, parsed value or error of each document
+    """
+    workers = workers or os.cpu_count() or 1
+    chunks = _chunks(documents, chunk_size)
+
+    if workers == 1:
+        start = 0
+        for chunk in chunks:
+            yield from _parse_chunk(parse, start, chunk)
+            start += len(chunk)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending: deque[Future[list[ParseResult[T]]]] = deque()
+        start = 0
+        for chunk in chunks:
+            pending.append(executor.submit(_parse_chunk, parse, start, chunk))
+            start += len(chunk)
+            if len(pending) >= 2 * workers:
+                yield from pending.popleft().result()
+
+        while pending:
+            yield from pending.popleft().result()
+
+
+def parse_batch(
+    parse: Callable[[str], T],
+    documents: Iterable[str],
+    workers: int | None = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> list[ParseResult[T]]:
+    """Parse documents on a process pool, see `iter_parse_batch`."""
+    return list(iter_parse_batch(parse, documents, workers, chunk_size))
@@ -0,0 +1,53 @@
+"""Selectable BeautifulSoup tree builders for the html mail parsers."""
+
+import os
+
+from bs4 import BeautifulSoup
+from bs4.builder import builder_registry
+
+# Fastest first. lxml is a C parser and optional, html.parser is pure Python
+# but always available, so it is the fallback.
+HTML_BACKENDS = ("lxml", "html.parser")
+
+FALLBACK_BACKEND = "html.parser"
+
+
+def available_backends() -> list[str]:
+    """Get the backends whose parser library is installed, fastest first."""
+    return [backend for backend in HTML_BACKENDS if builder_registry.lookup(backend)]
+
+
+def default_backend() -> str:
+    """
+    Get the backend used when a parser is not given one.
+
+    The HTML_PARSER_BACKEND environment variable selects a backend explicitly,
+    otherwise the fastest installed one is used.
+    """
+    backend = os.environ.get("HTML_PARSER_BACKEND")
+    if backend:
+        return backend
+    return available_backends()[0]
+
+
+def make_soup(html: str | bytes, backend: str | None = None) -> BeautifulSoup:
+    """
+    Parse html with the given backend.
+
+    Args:
+        html: The html document
+        backend: One of HTML_BACKENDS, defaults to `default_backend()`
+
+    Returns:
+        BeautifulSoup: The parsed document
+
+    Raises:
+        ValueError: If the backend is unknown or its parser library is not installed
+    """
+    backend = backend or default_backend()
+    if backend not in HTML_BACKENDS or not builder_registry.lookup(backend):
+        raise ValueError(
+            f"HTML backend {backend} is not available, "
+            f"installed backends: {', '.join(available_backends())}"
+        )
+    return BeautifulSoup(html, backend)
@@ -0,0 +1,197 @@
+"""Structural fingerprints of html mails, to recognize their template before parsing."""
+
+import hashlib
+import re
+import threading
+import time
+from dataclasses import dataclass
+from typing import Generic, TypeVar
+
+from shared.AzureHelper.local_db import LocalDb
+
+T = TypeVar("T")
+
+# Comments are matched too, so the tags inside them are skipped like the parser does
+TAG_PATTERN = re.compile(r"<!--.*?-->|<(/?)([a-zA-Z][a-zA-Z0-9]*)\b([^>]*)>", re.DOTALL)
+CLASS_PATTERN = re.compile(r"""\bclass\s*=\s*["']([^"']*)""", re.IGNORECASE)
+# Class name segments with digits are numbered or per mail ids, e.g. rio-text-38
+NUMBERED_SEGMENT_PATTERN = re.compile(r"[A-Za-z0-9]*\d[A-Za-z0-9]*")
+
+SKELETON_TAGS = frozenset(("table", "tr", "td", "th"))
+
+
+def fingerprint(html: str) -> str:
+    """
+    Hash the class names and the table skeleton of a mail.
+
+    Computed in one pass over the tags with regular expressions, without building
+    a tree. Numbered class name segments are ignored and only the distinct class
+    names and table paths count, so mails of one template with different
+    content, or a different number of items, share a fingerprint.
+
+    Args:
+        html: The raw html of the mail
+
+    Returns:
+        str: Hex digest identifying the template
+    """
+    classes: set[str] = set()
+    paths: set[str] = set()
+    stack: list[str] = []
+
+    for tag in TAG_PATTERN.finditer(html):
+        name = tag.group(2)
+        if name is None:
+            continue
+        name = name.lower()
+
+        if tag.group(1):
+            if name in stack:
+                while stack.pop() != name:
+                    pass
+            continue
+
+        attributes = tag.group(3)
+        if "class" in attributes:
+            for match in CLASS_PATTERN.finditer(attributes):
+                classes.update(
+                    NUMBERED_SEGMENT_PATTERN.sub("#", class_name)
+                    for class_name in match.group(1).split()
+                )
+        if name in SKELETON_TAGS and not attributes.rstrip().endswith("/"):
+            stack.append(name)
+            paths.add("/".join(stack))
+
+    digest = hashlib.sha1()
+    for part in sorted(classes) + ["|"] + sorted(paths):
+        digest.update(part.encode())
+        digest.update(b"\n")
+    return digest.hexdigest()
+
+
+class UnknownTemplateError(ValueError):
+    """The fingerprint of a mail matches none of the templates of a registry."""
+
+    def __init__(self, registry: str, fingerprint: str):
+        super().__init__(f"Unknown {registry} template {fingerprint}")
+        self.registry = registry
+        self.fingerprint = fingerprint
+
+
+class TemplateRegistry(Generic[T]):
+    """
+    Maps the fingerprints of the known templates of a mail type to their extractor.
+
+    A new layout of the same mail is usually handled by registering its
+    fingerprint with the existing extractor.
+    """
+
+    def __init__(self, name: str, templates: dict[str, T] | None = None):
+        """
+        Args:
+            name: Name of the mail type, used in errors and the unknown template log
+            templates: Extractor per fingerprint
+        """
+        self.name = name
+        self.templates: dict[str, T] = dict(templates or {})
+
+    def register(self, template_fingerprint: str, extractor: T) -> None:
+        self.templates[template_fingerprint] = extractor
+
+    def lookup(self, html: str) -> T:
+        """
+        Get the extractor of the template of a mail.
+
+        Raises:
+            UnknownTemplateError: If the fingerprint of the mail is not registered
+        """
+        template_fingerprint = fingerprint(html)
+        extractor = self.templates.get(template_fingerprint)
+        if extractor is None:
+            raise UnknownTemplateError(self.name, template_fingerprint)
+        return extractor
+
+
+UNKNOWN_TEMPLATES_SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS unknown_templates ("
+    " registry TEXT NOT NULL,"
+    " fingerprint TEXT NOT NULL,"
+    " sample_message_id TEXT NOT NULL,"
+    " first_seen REAL NOT NULL,"
+    " last_seen REAL NOT NULL,"
+    " count INTEGER NOT NULL,"
+    " PRIMARY KEY (registry, fingerprint))",
+]
+
+
+@dataclass
+class UnknownTemplate:
+    """An unknown fingerprint with one of the messages it was seen in."""
+
+    registry: str
+    fingerprint: str
+    sample_message_id: str
+    first_seen: float
+    last_seen: float
+    count: int
+
+
+class UnknownTemplateLog:
+    """
+    Records unknown fingerprints with a sample message ID, in a SQLite file in the temp directory.
+    """
+
+    def __init__(self, db_name: str = "templates"):
+        """
+        Args:
+            db_name: Name of the SQLite database in the temp directory
+        """
+        self._db = LocalDb(db_name, UNKNOWN_TEMPLATES_SCHEMA)
+        self._lock = threading.Lock()
+
+    def record(self, error: UnknownTemplateError, message_id: str) -> bool:
+        """
+        Record a mail rejected because of its unknown template.
+
+        The first message ID stays the sample of the fingerprint.
+
+        Args:
+            error: The error raised by `TemplateRegistry.lookup`
+            message_id: Gmail message ID of the mail
+
+        Returns:
+            bool: True if the fingerprint was not seen before
+        """
+        now = time.time()
+        with self._lock, self._db():
+            updated = (
+                self._db()
+                .execute(
+                    "UPDATE unknown_templates SET last_seen = ?, count = count + 1"
+                    " WHERE registry = ? AND fingerprint = ?",
+                    (now, error.registry, error.fingerprint),
+                )
+                .rowcount
+            )
+            if updated:
+                return False
+            self._db().execute(
+                "INSERT INTO unknown_templates VALUES (?, ?, ?, ?, ?, 1)",
+                (error.registry, error.fingerprint, message_id, now, now),
+            )
+            return True
+
+    def unknown(self, registry: str | None = None) -> list[UnknownTemplate]:
+        """Get the recorded fingerprints, most recently seen first."""
+        query = "SELECT * FROM unknown_templates"
+        parameters: tuple = ()
+        if registry is not None:
+            query += " WHERE registry = ?"
+            parameters = (registry,)
+        with self._lock:
+            rows = (
+                self._db()
+                .execute(query + " ORDER BY last_seen DESC", parameters)
+                .fetchall()
+            )
+            return [UnknownTemplate(*row) for row in rows]
@@ -0,0 +1,242 @@
+"""Declarative anchor and row offset rules for table based html mails."""
+
+import re
+from dataclasses import dataclass
+from enum import Enum
+from typing import Callable
+
+from bs4 import BeautifulSoup, Tag
+
+from shared.html_backend import make_soup
+
+
+class Direction(Enum):
+    NEXT = "next"
+    PREVIOUS = "previous"
+
+
+def row_text(row: Tag) -> str:
+    """Text of the row with outer whitespace removed."""
+    return row.get_text().strip()
+
+
+def compact_row_text(row: Tag) -> str:
+    """Text of the row with every text node stripped and joined without separator."""
+    return row.get_text(strip=True)
+
+
+def match_group(
+    pattern: re.Pattern[str], group: int = 1
+) -> Callable[[Tag], str | None]:
+    """Cleanup returning a group of the first match of `pattern` in the row text."""
+
+    def _cleanup(row: Tag) -> str | None:
+        match = pattern.search(row.get_text())
+        return match.group(group) if match else None
+
+    return _cleanup
+
+
+@dataclass(frozen=True)
+class RowRule:
+    """
+    Extract a value from the `tr` row `offset` rows away from the row of an anchor text.
+
+    Args:
+        name: Name of the extracted value
+        anchor: Text node equal to this string (ignoring outer whitespace), or
+            matching this pattern
+        offset: Number of sibling rows to move from the anchor row, 0 is the anchor row
+        direction: Whether to move to following or preceding rows
+        cleanup: Turns the target row into the value, None if it cannot
+        tag: Only text nodes directly inside a tag of this name count as anchor
+    """
+
+    name: str
+    anchor: str | re.Pattern[str]
+    offset: int = 0
+    direction: Direction = Direction.NEXT
+    cleanup: Callable[[Tag], str | None] = row_text
+    tag: str | None = None
+
+
+# (anchor, tag) of a rule
+AnchorKey = tuple[str | re.Pattern[str], str | None]
+
+# Comments are matched too, the conditional comments for Outlook contain tables
+TABLE_TAG_PATTERN = re.compile(r"<!--.*?-->|<(/?)table\b", re.IGNORECASE | re.DOTALL)
+
+
+@dataclass(frozen=True)
+class Region:
+    """
+    The smallest `table` of a document containing two literal markers.
+
+    Cutting it out of the raw html before parsing skips the styles, tracking
+    pixels and footers around it. The markers should be plain ascii text
+    from the first and last anchor rows of the rules.
+
+    Args:
+        start: Text before or at the first anchor
+        end: Text at or after the last anchor
+    """
+
+    start: str
+    end: str
+
+    def cut(self, html: str) -> str | None:
+        """
+        Find the region in `html` with a byte level search, without parsing it.
+
+        Returns:
+            str | None: The balanced `<table>...</table>` markup, None if a
+                marker or an enclosing table is missing
+        """
+        start = html.find(self.start)
+        end = html.find(self.end, start) if start >= 0 else -1
+        if end < 0:
+            return None
+
+        tags = [
+            tag
+            for tag in TABLE_TAG_PATTERN.finditer(html)
+            if not tag.group(0).startswith("<!--")
+        ]
+        # tables opened before the start marker and not closed before it
+        open_tables: list[int] = []
+        for tag in tags:
+            if tag.start() > start:
+                break
+            if tag.group(1):
+                if open_tables:
+                    open_tables.pop()
+            else:
+                open_tables.append(tag.start())
+
+        # try the innermost table first, widen until it also contains the end
+        for table_start in reversed(open_tables):
+            depth = 0
+            for tag in tags:
+                if tag.start() < table_start:
+                    continue
+                depth += -1 if tag.group(1) else 1
+                if depth == 0:
+                    if tag.start() > end:
+                        return html[table_start : html.index(">", tag.end()) + 1]
+                    break
+        return None
+
+
+class RuleSet:
+    """
+    A template's rules, compiled once and evaluated in a single pass over the document.
+
+    The pass visits every text node once and records the `tr` of the first
+    node matching each anchor, stopping as soon as all anchors are found. The
+    rules then only walk the few sibling rows from their anchor row.
+
+    With a `region`, `parse` builds the tree of that region only and falls back
+    to the whole document if the region is gone or misses a value, e.g. after
+    a template change moved the anchors.
+    """
+
+    def __init__(self, rules: list[RowRule], region: Region | None = None):
+        names = [rule.name for rule in rules]
+        if len(set(names)) != len(names):
+            raise ValueError(f"Rule names must be unique: {names}")
+
+        self.rules = list(rules)
+        self.region = region
+        # several rules can share an anchor, which is then only looked up once
+        self._anchors = list(dict.fromkeys((rule.anchor, rule.tag) for rule in rules))
+        self._exact: dict[str, list[AnchorKey]] = {}
+        self._patterns: list[tuple[AnchorKey, re.Pattern[str]]] = []
+        for key in self._anchors:
+            anchor = key[0]
+            if isinstance(anchor, str):
+                self._exact.setdefault(anchor.strip(), []).append(key)
+            else:
+                self._patterns.append((key, anchor))
+
+    def find_anchor_rows(self, soup: BeautifulSoup) -> dict[AnchorKey, Tag]:
+        """Map each (anchor, tag) of the rules to the row of its first occurrence."""
+        rows: dict[AnchorKey, Tag] = {}
+
+        def _record(key: AnchorKey, string) -> None:
+            if key in rows or (key[1] is not None and string.parent.name != key[1]):
+                return
+            row = string.find_parent("tr")
+            if row is not None:
+                rows[key] = row
+
+        for string in soup.strings:
+            text = string.strip()
+            if not text:
+                continue
+
+            for key in self._exact.get(text, ()):
+                _record(key, string)
+            for key, pattern in self._patterns:
+                if key not in rows and pattern.search(text):
+                    _record(key, string)
+
+            if len(rows) == len(self._anchors):
+                break
+
+        return rows
+
+    @staticmethod
+    def _walk(row: Tag | None, direction: Direction, offset: int) -> Tag | None:
+        for _ in range(offset):
+            if row is None:
+                return None
+            if direction is Direction.NEXT:
+                row = row.find_next_sibling("tr")  # type: ignore
+            else:
+                row = row.find_previous_sibling("tr")  # type: ignore
+        return row
+
+    def evaluate(self, soup: BeautifulSoup) -> dict[str, str | None]:
+        """
+        Evaluate all rules on a parsed document.
+
+        Returns:
+            dict[str, str | None]: Value per rule name, None if its anchor or
+                target row was not found
+        """
+        anchor_rows = self.find_anchor_rows(soup)
+
+        values: dict[str, str | None] = {}
+        for rule in self.rules:
+            row = self._walk(
+                anchor_rows.get((rule.anchor, rule.tag)), rule.direction, rule.offset
+            )
+            values[rule.name] = rule.cleanup(row) if row is not None else None
+        return values
+
+    def parse(
+        self, html: str, backend: str | None = None, trim: bool = True
+    ) -> dict[str, str | None]:
+        """
+        Parse `html` and evaluate all rules, on the region only if possible.
+
+        Args:
+            html: The raw document
+            backend: HTML parser backend, see shared.html_backend
+            trim: Whether to cut out the region before parsing
+
+        Returns:
+            dict[str, str | None]: Value per rule name, see `evaluate`
+        """
+        if trim and self.region is not None:
+            fragment = self.region.cut(html)
+            if fragment is not None:
+                values = self.evaluate(make_soup(fragment, backend))
+                if None not in values.values():
+                    return values
+        return self.evaluate(make_soup(html, backend))
+
+
+def count_nodes(soup: BeautifulSoup) -> int:
+    """Number of tags and text nodes in the tree."""
+    return sum(1 for _ in soup.descendants)
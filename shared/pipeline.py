@@ -0,0 +1,111 @@
+"""Run the stages of a message pipeline concurrently and time them."""
+
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterable, Iterator, TypeVar
+
+T = TypeVar("T")
+
+# Items waiting for the consumer, bounds the memory when the producer is faster
+DEFAULT_QUEUE_SIZE = 16
+
+_DONE = object()
+
+
+class StageTimings:
+    """Total seconds and item count per pipeline stage, safe to update from several threads."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.seconds: dict[str, float] = {}
+        self.counts: dict[str, int] = {}
+
+    def add(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            self.seconds[stage] = self.seconds.get(stage, 0.0) + seconds
+            self.counts[stage] = self.counts.get(stage, 0) + 1
+
+    @contextmanager
+    def measure(self, stage: str):
+        """Add the time spent in the block to `stage`."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(stage, time.perf_counter() - start)
+
+    def summary(self) -> str:
+        """One line with the total and the mean time per item of every stage."""
+        with self._lock:
+            return ", ".join(
+                f"{stage} {seconds:.3f}s"
+                f" ({seconds / self.counts[stage] * 1000:.1f} ms/item)"
+                for stage, seconds in self.seconds.items()
+            )
+
+
+def timed(items: Iterable[T], timings: StageTimings, stage: str) -> Iterator[T]:
+    """Yield the items, adding the time spent producing each one to `stage`."""
+    iterator = iter(items)
+    while True:
+        start = time.perf_counter()
+        try:
+            item = next(iterator)
+        except StopIteration:
+            return
+        timings.add(stage, time.perf_counter() - start)
+        yield item
+
+
+def run_pipelined(
+    items: Iterable[T],
+    consume: Callable[[T], None],
+    queue_size: int = DEFAULT_QUEUE_SIZE,
+) -> None:
+    """
+    Produce the items on this thread while a worker thread consumes them.
+
+    The next item is produced (e.g. downloaded) while the previous ones are
+    consumed (e.g. parsed), and at most `queue_size` items wait in between. Returns
+    once every item is consumed. If the consumer raises, producing stops and the
+    exception is raised here.
+
+    Args:
+        items: Produced lazily on the calling thread
+        consume: Called with every item, in order, on the worker thread
+        queue_size: Maximum number of produced items waiting for the consumer.
+            0 consumes every item on the calling thread, without a worker.
+    """
+    if queue_size == 0:
+        for item in items:
+            consume(item)
+        return
+
+    pending: queue.Queue = queue.Queue(maxsize=queue_size)
+    failures: list[BaseException] = []
+
+    def _worker() -> None:
+        while (item := pending.get()) is not _DONE:
+            # after a failure keep draining, so the producer never blocks
+            if failures:
+                continue
+            try:
+                consume(item)
+            except BaseException as e:
+                failures.append(e)
+
+    worker = threading.Thread(target=_worker, name="pipeline-consumer", daemon=True)
+    worker.start()
+    try:
+        for item in items:
+            if failures:
+                break
+            pending.put(item)
+    finally:
+        pending.put(_DONE)
+        worker.join()
+
+    if failures:
+        raise failures[0]
@@ -0,0 +1,269 @@
+import base64
+import re
+import threading
+import time
+from datetime import datetime
+
+import httplib2
+import pytest
+from googleapiclient.errors import HttpError
+
+from shared.GoogleServices.gmail import (
+    CheckpointStore,
+    MessageBatchResult,
+    MessageId,
+)
+from shared.GoogleServices.gmail.service import GmailService
+
+
+class MemoryCheckpointStore(CheckpointStore):
+    def __init__(self, **checkpoints):
+        self.checkpoints = dict(checkpoints)
+
+    def load(self, key):
+        return self.checkpoints.get(key)
+
+    def save(self, key, history_id):
+        self.checkpoints[key] = history_id
+
+
+def _message(
+    message_id: str,
+    sender: str,
+    subject: str,
+    html: bytes | None = None,
+    received: datetime | None = None,
+) -> dict:
+    # the html body defaults to the message ID
+    message = {
+        "id": message_id,
+        "payload": {
+            "headers": [
+                {"name": "From", "value": sender},
+                {"name": "Subject", "value": subject},
+            ],
+            "mimeType": "text/html",
+            "body": {
+                "data": base64.urlsafe_b64encode(
+                    message_id.encode() if html is None else html
+                ).decode()
+            },
+        },
+    }
+    if received is not None:
+        message["internalDate"] = str(int(received.timestamp() * 1000))
+    return message
+
+
+class FakeGmailService:
+    def __init__(self, messages, checkpoint=None):
+        # newest first, like the Gmail API
+        self.messages = sorted(messages, key=lambda m: -int(m.get("internalDate", 0)))
+        # saved by iter_new_messages once it is exhausted, like GmailService
+        self.checkpoint = checkpoint
+        self.syncs = []
+        self.queries = []
+        self.fetched = []
+        self.fetch_errors = {}
+        # fake time.monotonic, advanced by every listed and fetched batch
+        self.clock = 0
+        self.list_seconds = 0
+        self.fetch_seconds = 0
+
+    def iter_new_messages(self, message_filters, checkpoints, checkpoint_key, **kw):
+        self.syncs.append((message_filters, checkpoint_key))
+        skip = kw.get("skip")
+        for message in self.messages:
+            if not (skip and skip(message["id"])):
+                yield message
+        if self.checkpoint is not None:
+            checkpoints.save(checkpoint_key, self.checkpoint)
+
+    def iter_message_ids(self, query):
+        self.queries.append(query)
+        before = re.search(r"before:(\d+)", query)
+        for message in self.messages:
+            received = int(message.get("internalDate", 0)) // 1000
+            if before is None or received < int(before.group(1)):
+                self.clock += self.list_seconds
+                yield MessageId(message["id"], "")
+
+    def fetch_messages(self, message_ids, batch_size=None):
+        self.fetched.extend(message_ids)
+        self.clock += self.fetch_seconds
+        return MessageBatchResult(
+            messages={
+                m["id"]: m
+                for m in self.messages
+                if m["id"] in message_ids and m["id"] not in self.fetch_errors
+            },
+            errors={i: e for i, e in self.fetch_errors.items() if i in message_ids},
+        )
+
+
+class FakeRequest:
+    def __init__(self, resource, result, delay=0.0):
+        self.resource = resource
+        self.result = result
+        self.delay = delay
+
+    def execute(self, http=None):
+        time.sleep(self.delay)
+        if isinstance(self.result, Exception):
+            raise self.result
+        with self.resource.lock:
+            self.resource.executed.append(self.result)
+        return self.result
+
+
+class FakeBatch:
+    def __init__(self, resource, callback):
+        self.resource = resource
+        self.callback = callback
+        self.requests = []
+
+    def add(self, request, request_id):
+        self.requests.append((request_id, request))
+
+    def execute(self):
+        self.resource.batches.append([request_id for request_id, _ in self.requests])
+        for request_id, request in self.requests:
+            try:
+                response = request.execute()
+            except Exception as e:
+                self.callback(request_id, None, e)
+            else:
+                self.callback(request_id, response, None)
+
+
+class FakeAttachments:
+    def __init__(self, resource):
+        self.resource = resource
+
+    def get(self, userId, messageId, id):
+        self.resource.calls.append(f"attachments.get {id}")
+        if id in self.resource.errors:
+            return FakeRequest(self.resource, self.resource.errors[id])
+        data = base64.urlsafe_b64encode(f"pdf {id}".encode()).decode()
+        return FakeRequest(
+            self.resource, {"data": data}, self.resource.delays.get(id, 0.0)
+        )
+
+
+class FakeGmailResource:
+    """Stand-in for the googleapiclient Gmail resource, serving the given messages."""
+
+    def __init__(self, messages=(), history_expired=False):
+        self.messages_by_id = {m["id"]: m for m in messages}
+        self.history_expired = history_expired
+        # error of a messages.get or download, by message or attachment ID
+        self.errors = {}
+        # error of a messages.list page, by page token
+        self.list_errors = {}
+        # seconds each attachment download takes, by attachment ID
+        self.delays = {}
+        self.calls = []
+        self.list_calls = []
+        self.batches = []
+        self.executed = []
+        self.lock = threading.Lock()
+
+    def users(self):
+        return self
+
+    def messages(self):
+        return self
+
+    def history(self):
+        return self
+
+    def attachments(self):
+        return FakeAttachments(self)
+
+    def getProfile(self, **kwargs):
+        self.calls.append("getProfile")
+        return FakeRequest(self, {"historyId": "500"})
+
+    def list(self, **kwargs):
+        if "startHistoryId" in kwargs:
+            self.calls.append("history.list")
+            if self.history_expired:
+                return FakeRequest(
+                    self, HttpError(httplib2.Response({"status": 404}), b"")
+                )
+            added = [{"message": {"id": i}} for i in self.messages_by_id]
+            return FakeRequest(
+                self, {"history": [{"messagesAdded": added}], "historyId": "600"}
+            )
+
+        self.calls.append(f"messages.list {kwargs['q']}")
+        self.list_calls.append(kwargs)
+        token = kwargs.get("pageToken")
+        if token in self.list_errors:
+            return FakeRequest(self, self.list_errors[token])
+        start = int(token or 0)
+        end = start + kwargs.get("maxResults", len(self.messages_by_id))
+        ids = list(self.messages_by_id)
+        response = {
+            "messages": [{"id": i, "threadId": f"t{i}"} for i in ids[start:end]]
+        }
+        if end < len(ids):
+            response["nextPageToken"] = str(end)
+        return FakeRequest(self, response)
+
+    def get(self, **kwargs):
+        message_id = kwargs["id"]
+        self.calls.append(f"messages.get {message_id} {kwargs.get('format')}")
+        if message_id in self.errors:
+            return FakeRequest(self, self.errors[message_id])
+        if message_id not in self.messages_by_id:
+            return FakeRequest(self, HttpError(httplib2.Response({"status": 404}), b""))
+        return FakeRequest(self, self.messages_by_id[message_id])
+
+    def new_batch_http_request(self, callback):
+        return FakeBatch(self, callback)
+
+
+@pytest.fixture
+def checkpoints():
+    """Checkpoint store kept in memory."""
+    return MemoryCheckpointStore()
+
+
+@pytest.fixture
+def make_message():
+    """Builds a Gmail API message with headers and an html body."""
+    return _message
+
+
+@pytest.fixture
+def fake_gmail_service():
+    """Builds a stand-in for GmailService that serves the given messages."""
+    return FakeGmailService
+
+
+@pytest.fixture
+def fake_gmail_resource():
+    """Builds a stand-in for the Gmail API resource that serves the given messages."""
+    return FakeGmailResource
+
+
+@pytest.fixture
+def gmail_service():
+    """Builds a GmailService that calls the given (fake) Gmail API resource."""
+
+    def _service(resource) -> GmailService:
+        service = GmailService(credentials=None)  # type: ignore
+        service.service = resource
+        # the attachment downloads of worker threads use the resource as well
+        service._new_http = lambda: None  # type: ignore
+        return service
+
+    return _service
+
+
+@pytest.fixture
+def local_db_dir(tmp_path, monkeypatch):
+    """Keeps the local SQLite databases of the test in its tmp_path."""
+    monkeypatch.setattr("shared.AzureHelper.local_db.get_temp_dir", lambda: tmp_path)
+    return tmp_path
@@ -0,0 +1,49 @@
+from datetime import datetime
+from pathlib import Path
+
+from UseCases.DeliveryTracker import parsing as dhl_parsing
+from UseCases.ReturnTracker import parsing as return_parsing
+from shared.batch_parsing import iter_parse_batch, parse_batch
+
+TESTS_DIR = Path(__file__).parent
+DHL_HTML = (TESTS_DIR / "test_delivery_tracker/dhl_test.html").read_text()
+RETURN_HTML = (TESTS_DIR / "test_return_tracker/amazon_rueckgabe_test.html").read_text()
+
+
+def test_results_keep_input_order_and_isolate_errors_across_processes():
+    documents = [str(i) for i in range(50)] + ["not a number"] + ["7"]
+
+    results = parse_batch(int, documents, workers=2, chunk_size=4)
+
+    assert [r.index for r in results] == list(range(52))
+    assert [r.value for r in results[:50]] == list(range(50))
+    assert not results[50].ok
+    assert results[50].error.startswith("ValueError")
+    assert results[51].value == 7
+
+
+def test_streaming_reads_input_lazily():
+    consumed = []
+
+    def documents():
+        for i in range(1000):
+            consumed.append(i)
+            yield str(i)
+
+    results = iter_parse_batch(int, documents(), workers=1, chunk_size=10)
+    first = next(results)
+
+    assert first.value == 0
+    assert len(consumed) == 10
+
+
+def test_parser_batches_match_single_parses():
+    now = datetime(2025, 5, 1)
+
+    dhl = dhl_parsing.parse_many([DHL_HTML, "<html></html>"], workers=2, now=now)
+    returns = return_parsing.parse_many([RETURN_HTML, "<html></html>"], workers=2)
+
+    assert dhl[0].value == dhl_parsing.parse_dhl_pickup_email_html(DHL_HTML, now=now)
+    assert dhl[1].value.tracking_number is None
+    assert returns[0].value == return_parsing.parse_return_info(RETURN_HTML)
+    assert returns[1].error.startswith("ValueError")
@@ -0,0 +1,37 @@
+from benchmarks.suite import CASES, compare
+
+BASELINE = {"dhl_parser": {"median_ms": 10.0, "p95_ms": 12.0, "peak_alloc_kib": 300}}
+
+
+def _result(**metrics):
+    return {
+        "dhl_parser": {
+            "median_ms": 10.0,
+            "p95_ms": 12.0,
+            "peak_alloc_kib": 300,
+            "peak_rss_kib": 50000,
+            **metrics,
+        }
+    }
+
+
+def test_regression_past_threshold_is_reported():
+    regressions = compare(_result(median_ms=13.0), BASELINE, threshold=0.25)
+
+    assert regressions == ["dhl_parser median_ms: 10.0 -> 13.0 (+30%)"]
+
+
+def test_changes_within_threshold_or_noise_pass():
+    assert compare(_result(median_ms=12.0), BASELINE, threshold=0.25) == []
+    assert compare(_result(peak_rss_kib=90000), BASELINE, threshold=0.25) == []
+    tiny = {"dhl_parser": {"median_ms": 0.01}}
+    assert compare(_result(median_ms=0.03), tiny, threshold=0.25) == []
+
+
+def test_cases_without_baseline_pass():
+    assert compare(_result(median_ms=100.0), {}, threshold=0.25) == []
+
+
+def test_every_case_loads_and_runs_offline():
+    for case in CASES.values():
+        assert case.run(case.load())
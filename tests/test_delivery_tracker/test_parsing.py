@@ -1,12 +1,51 @@
-from UseCases.DeliveryTracker.parsing import parse_dhl_pickup_email_html
+from datetime import datetime
+
+from UseCases.DeliveryTracker.parsing import (
+    DHL_PICKUP_RULES,
+    parse_dhl_pickup_email_html,
+    parse_due_date,
+    parse_known_dhl_pickup_email_html,
+)
 from pathlib import Path
 
+HTML = open(Path(__file__).parent / "dhl_test.html", "r").read()
+
 
 def test_parses_correct_information_from_raw_html():
-    html = open(Path(__file__).parent / "dhl_test.html", "r").read()
-    parsed = parse_dhl_pickup_email_html(html)
+    parsed = parse_known_dhl_pickup_email_html(HTML, now=datetime(2025, 5, 1))
 
     assert parsed.tracking_number == "JJD000390016951668949"
     assert parsed.pickup_location == "Packstation 158, Südhöhe 38"
     assert parsed.due_date == "30.05.2025"
     assert parsed.preview == "WOCVRYY Autositz Organizer..."
+
+
+def test_due_date_in_the_past_rolls_over_to_next_year():
+    assert parse_due_date("Freitag, 30. Mai", datetime(2025, 6, 1)) == "30.05.2026"
+    assert parse_due_date("Freitag, 30. Foo", datetime(2025, 6, 1)) is None
+
+
+def test_known_template_parses_like_the_generic_rules():
+    now = datetime(2025, 5, 1)
+
+    assert parse_known_dhl_pickup_email_html(
+        HTML, now=now
+    ) == parse_dhl_pickup_email_html(HTML, now=now)
+
+
+def test_missing_fields_fall_back():
+    parsed = parse_dhl_pickup_email_html("<html><body><p>Hallo</p></body></html>")
+
+    assert parsed.tracking_number is None
+    assert parsed.due_date is None
+    assert parsed.pickup_location == "Address not found"
+    assert parsed.preview == "Unknown item"
+
+
+def test_region_parse_matches_full_parse():
+    now = datetime(2025, 5, 1)
+
+    assert DHL_PICKUP_RULES.region.cut(HTML) is not None
+    assert parse_dhl_pickup_email_html(HTML, now=now) == parse_dhl_pickup_email_html(
+        HTML, now=now, trim=False
+    )
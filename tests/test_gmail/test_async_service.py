@@ -0,0 +1,180 @@
+import asyncio
+import base64
+
+import httpx
+import pytest
+
+from shared.GoogleServices.gmail.async_service import AsyncGmailService
+
+BASE_URL = "https://gmail.test/gmail/v1/users/me"
+
+
+class FakeCredentials:
+    valid = True
+
+    def apply(self, headers):
+        headers["authorization"] = "Bearer token"
+
+
+def _encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).decode("ascii")
+
+
+def _html_message(message_id: str) -> dict:
+    return {
+        "id": message_id,
+        "payload": {
+            "mimeType": "multipart/alternative",
+            "parts": [
+                {"mimeType": "text/plain", "body": {"data": _encode(b"plain")}},
+                {
+                    "mimeType": "text/html",
+                    "body": {"data": _encode(f"<p>{message_id}</p>".encode())},
+                },
+            ],
+        },
+    }
+
+
+class FakeGmailApi:
+    def __init__(self, message_count: int, page_size: int):
+        self.ids = [f"m{i}" for i in range(message_count)]
+        self.page_size = page_size
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.requests: list[httpx.Request] = []
+
+    async def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(0.001)
+            return httpx.Response(200, json=self._route(request))
+        finally:
+            self.in_flight -= 1
+
+    def _route(self, request: httpx.Request) -> dict:
+        path = request.url.path.removeprefix("/gmail/v1/users/me/")
+        parts = path.split("/")
+
+        if path == "messages":
+            start = int(request.url.params.get("pageToken", 0))
+            end = start + self.page_size
+            page = {"messages": [{"id": i, "threadId": i} for i in self.ids[start:end]]}
+            if end < len(self.ids):
+                page["nextPageToken"] = str(end)
+            return page
+
+        if len(parts) == 4 and parts[2] == "attachments":
+            return {"data": _encode(f"%PDF {parts[3]}".encode())}
+
+        if parts[1] == "with-pdf":
+            return {
+                "id": parts[1],
+                "payload": {
+                    "parts": [
+                        {"filename": "a.pdf", "body": {"attachmentId": "att1"}},
+                        {"filename": "copy.PDF", "body": {"attachmentId": "att1"}},
+                        {"filename": "b.pdf", "body": {"attachmentId": "att2"}},
+                        {"filename": "logo.png", "body": {"attachmentId": "att3"}},
+                    ]
+                },
+            }
+        return _html_message(parts[1])
+
+
+def _service(api: FakeGmailApi, max_concurrency: int = 4) -> AsyncGmailService:
+    client = httpx.AsyncClient(transport=httpx.MockTransport(api))
+    return AsyncGmailService(
+        FakeCredentials(),
+        max_concurrency=max_concurrency,
+        client=client,
+        base_url=BASE_URL,
+    )
+
+
+def test_query_messages_with_body_follows_pages_and_keeps_order():
+    api = FakeGmailApi(message_count=25, page_size=10)
+
+    async def run():
+        async with _service(api) as service:
+            return await service.query_messages_with_body("from:someone")
+
+    bodies = asyncio.run(run())
+
+    assert bodies == [f"<p>m{i}</p>" for i in range(25)]
+    assert all(r.headers["authorization"] == "Bearer token" for r in api.requests)
+    list_requests = [r for r in api.requests if r.url.path.endswith("/messages")]
+    assert len(list_requests) == 3
+
+
+def test_concurrency_is_limited():
+    api = FakeGmailApi(message_count=40, page_size=100)
+
+    async def run():
+        async with _service(api, max_concurrency=3) as service:
+            return await service.query_messages_with_body("from:someone")
+
+    assert len(asyncio.run(run())) == 40
+    assert 1 < api.max_in_flight <= 3
+
+
+def test_pdf_attachments_are_deduplicated():
+    api = FakeGmailApi(message_count=0, page_size=10)
+
+    async def run():
+        async with _service(api) as service:
+            return await service.download_pdf_attachments_to_ram("with-pdf")
+
+    attachments = asyncio.run(run())
+
+    assert [(a.filename, a.content.read()) for a in attachments] == [
+        ("a.pdf", b"%PDF att1"),
+        ("b.pdf", b"%PDF att2"),
+    ]
+
+
+def _failing(api, path_suffix, error):
+    original = api._route
+
+    def route(request):
+        if request.url.path.endswith(path_suffix):
+            raise error
+        return original(request)
+
+    api._route = route
+
+
+def test_failed_message_is_raised():
+    api = FakeGmailApi(message_count=3, page_size=10)
+    _failing(api, "/messages/m1", httpx.ConnectError("boom"))
+
+    async def run():
+        async with _service(api) as service:
+            result = await service.fetch_messages(["m0", "m1", "m2"])
+            assert sorted(result.messages) == ["m0", "m2"]
+            assert list(result.errors) == ["m1"]
+            return await service.query_messages_with_body("from:someone")
+
+    with pytest.raises(RuntimeError, match="1 of 3 messages"):
+        asyncio.run(run())
+
+
+def test_failed_page_is_raised_instead_of_ending_the_listing():
+    api = FakeGmailApi(message_count=3, page_size=1)
+    original = api._route
+
+    def route(request):
+        if request.url.params.get("pageToken") == "2":
+            raise httpx.ConnectError("boom")
+        return original(request)
+
+    api._route = route
+
+    async def run():
+        async with _service(api) as service:
+            return await service.query_messages_ids("from:someone")
+
+    with pytest.raises(httpx.ConnectError):
+        asyncio.run(run())
@@ -0,0 +1,86 @@
+import base64
+
+import pytest
+
+
+def _pdf_part(attachment_id, filename):
+    return {"filename": filename, "body": {"attachmentId": attachment_id}}
+
+
+def _message(payload):
+    return {"id": "msg", "payload": payload}
+
+
+def test_pdf_attachments_are_found_in_nested_parts_and_deduplicated(
+    fake_gmail_resource, gmail_service
+):
+    payload = {
+        "parts": [
+            {"filename": "", "parts": [_pdf_part("a1", "invoice.pdf")]},
+            _pdf_part("a1", "invoice.pdf"),
+            _pdf_part("a2", "Summary.PDF"),
+            _pdf_part("a3", "logo.png"),
+        ]
+    }
+    resource = fake_gmail_resource([_message(payload)])
+    service = gmail_service(resource)
+
+    attachments = service._get_pdf_attachments("msg")
+
+    assert sorted((a.filename, a.data) for a in attachments) == [
+        ("Summary.PDF", b"pdf a2"),
+        ("invoice.pdf", b"pdf a1"),
+    ]
+    # one message get plus one download per distinct attachment
+    assert len(resource.executed) == 3
+
+
+def test_memory_attachments_are_yielded_as_bytes_io(fake_gmail_resource, gmail_service):
+    resource = fake_gmail_resource(
+        [_message({"parts": [_pdf_part("a1", "invoice.pdf")]})]
+    )
+    service = gmail_service(resource)
+
+    (attachment,) = service.iter_pdf_attachments_to_ram("msg")
+
+    assert attachment.filename == "invoice.pdf"
+    assert attachment.content.read() == b"pdf a1"
+
+
+def test_pdf_attachments_are_yielded_in_part_order(fake_gmail_resource, gmail_service):
+    payload = {"parts": [_pdf_part(f"a{i}", f"{i}.pdf") for i in range(3)]}
+    resource = fake_gmail_resource([_message(payload)])
+    # the first part finishes last
+    resource.delays = {"a0": 0.1, "a1": 0.05}
+    service = gmail_service(resource)
+
+    attachments = service._get_pdf_attachments("msg")
+
+    assert [a.filename for a in attachments] == ["0.pdf", "1.pdf", "2.pdf"]
+    assert [r["data"] for r in resource.executed[1:]] == [
+        base64.urlsafe_b64encode(f"pdf a{i}".encode()).decode() for i in (2, 1, 0)
+    ]
+
+
+def test_failed_download_raises_after_the_other_attachments(
+    fake_gmail_resource, gmail_service
+):
+    payload = {"parts": [_pdf_part("a1", "a.pdf"), _pdf_part("a2", "b.pdf")]}
+    resource = fake_gmail_resource([_message(payload)])
+    resource.errors["a2"] = ConnectionError("connection reset")
+    service = gmail_service(resource)
+
+    attachments = service.iter_pdf_attachments("msg")
+
+    assert next(attachments).filename == "a.pdf"
+    with pytest.raises(RuntimeError, match="b.pdf of message msg"):
+        next(attachments)
+
+
+def test_failed_listing_is_raised(fake_gmail_resource, gmail_service):
+    resource = fake_gmail_resource([_message({"parts": [_pdf_part("a1", "a.pdf")]})])
+    resource.errors["msg"] = ConnectionError("connection reset")
+    service = gmail_service(resource)
+
+    with pytest.raises(ConnectionError):
+        service._get_pdf_attachments("msg")
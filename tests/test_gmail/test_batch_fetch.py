@@ -0,0 +1,41 @@
+def _messages(ids):
+    return [{"id": i} for i in ids]
+
+
+def test_fetch_messages_batch_groups_requests_into_chunks(
+    fake_gmail_resource, gmail_service
+):
+    ids = [f"m{i}" for i in range(120)]
+    resource = fake_gmail_resource(_messages(ids))
+    resource.errors["m7"] = Exception("boom")
+
+    result = gmail_service(resource)._fetch_messages_batch(ids, batch_size=50)
+
+    assert [len(batch) for batch in resource.batches] == [50, 50, 20]
+    assert set(result.errors) == {"m7"}
+    assert len(result.messages) == 119
+
+
+def test_fetch_messages_keeps_order_and_skips_failures(
+    fake_gmail_resource, gmail_service
+):
+    resource = fake_gmail_resource(_messages("abc"))
+    resource.errors["b"] = Exception("boom")
+
+    messages = gmail_service(resource)._fetch_messages(
+        ["c", "b", "a", "c"], batch_size=2
+    )
+
+    assert [message["id"] for message in messages] == ["c", "a", "c"]
+    assert resource.batches == [["c", "b"], ["a"]]
+
+
+def test_fetch_messages_without_batching_uses_single_gets(
+    fake_gmail_resource, gmail_service
+):
+    resource = fake_gmail_resource(_messages("ab"))
+
+    messages = gmail_service(resource)._fetch_messages(["a", "b"], batch_size=None)
+
+    assert [message["id"] for message in messages] == ["a", "b"]
+    assert resource.batches == []
@@ -0,0 +1,193 @@
+import pytest
+
+from shared.GoogleServices import GmailQueryBuilder
+from shared.GoogleServices.gmail import (
+    DeferredCheckpointStore,
+    MailDispatcher,
+    MessageFilter,
+    ProcessedMessageCache,
+)
+
+DHL = MessageFilter(sender="order-update@amazon.de", subject="Ihr Paket")
+RETURN = MessageFilter(sender="rueckgabe@amazon.de", subject="Ihre Rücksendung")
+
+
+def test_combined_query_groups_senders():
+    query = GmailQueryBuilder().from_any(["a@x.de", "b@x.de", "a@x.de"]).build()
+    assert query == "{from:a@x.de from:b@x.de}"
+    assert GmailQueryBuilder().from_any(["a@x.de"]).build() == "from:a@x.de"
+
+
+def test_messages_are_routed_to_matching_handlers_with_one_sync(
+    checkpoints, make_message, fake_gmail_service
+):
+    dispatcher = MailDispatcher()
+    handled = []
+
+    @dispatcher.route("dhl", DHL)
+    def _dhl(mail, outputs):
+        outputs.append(("dhl", mail.text))
+
+    @dispatcher.route("return", RETURN)
+    def _return(mail, outputs):
+        outputs.append(("return", mail.text))
+
+    service = fake_gmail_service(
+        [
+            make_message("a", "order-update@amazon.de", "Ihr Paket kann bei DHL"),
+            make_message("b", "rueckgabe@amazon.de", "Ihre Rücksendung von X"),
+            make_message("c", "order-update@amazon.de", "Ihre Bestellung"),
+        ]
+    )
+
+    result = dispatcher.run(service, handled, checkpoints)  # type: ignore
+
+    assert handled == [("dhl", "a"), ("return", "b")]
+    assert result.messages == 3
+    assert result.handled == {"dhl": 1, "return": 1}
+    assert service.syncs == [([DHL, RETURN], "mail_dispatch")]
+
+
+def test_failing_handler_is_isolated_and_not_cached(
+    local_db_dir, checkpoints, make_message, fake_gmail_service
+):
+    dispatcher = MailDispatcher(processed=ProcessedMessageCache("test"))
+
+    @dispatcher.route("dhl", DHL)
+    def _dhl(mail, outputs):
+        if mail.id == "a":
+            raise ValueError("unexpected layout")
+        return {"parsed": mail.id}
+
+    service = fake_gmail_service(
+        [
+            make_message("a", "order-update@amazon.de", "Ihr Paket"),
+            make_message("b", "order-update@amazon.de", "Ihr Paket"),
+        ]
+    )
+
+    result = dispatcher.run(service, None, checkpoints)  # type: ignore
+
+    assert result.errors == ["dhl failed for message a: unexpected layout"]
+    assert dispatcher.processed.get("b") == {"dhl": {"parsed": "b"}}
+    assert "a" not in dispatcher.processed
+
+    # the processed message is not fetched again
+    assert dispatcher.run(service, None, checkpoints).messages == 1  # type: ignore
+
+
+def test_route_names_are_unique():
+    dispatcher = MailDispatcher()
+    dispatcher.register("dhl", DHL, lambda mail, outputs: None)
+
+    with pytest.raises(ValueError):
+        dispatcher.register("dhl", RETURN, lambda mail, outputs: None)
+
+
+def test_checkpoint_advances_once_every_message_is_handled(
+    checkpoints, make_message, fake_gmail_service
+):
+    dispatcher = MailDispatcher()
+    seen = []
+
+    @dispatcher.route("dhl", DHL)
+    def _dhl(mail, outputs):
+        seen.append(checkpoints.load("mail_dispatch"))
+
+    service = fake_gmail_service(
+        [make_message(i, "order-update@amazon.de", "Ihr Paket") for i in "abc"],
+        checkpoint="42",
+    )
+    result = dispatcher.run(service, None, checkpoints)  # type: ignore
+
+    assert seen == [None, None, None]
+    assert checkpoints.load("mail_dispatch") == "42"
+    assert result.timings.counts == {"fetch": 3, "decode": 3, "handle:dhl": 3}
+
+
+def test_checkpoint_is_kept_if_the_run_fails(
+    local_db_dir, monkeypatch, checkpoints, make_message, fake_gmail_service
+):
+    processed = ProcessedMessageCache("test")
+    monkeypatch.setattr(
+        processed, "put", lambda *args: (_ for _ in ()).throw(OSError("disk full"))
+    )
+    dispatcher = MailDispatcher(processed=processed)
+    dispatcher.register("dhl", DHL, lambda mail, outputs: None)
+
+    service = fake_gmail_service(
+        [make_message("a", "order-update@amazon.de", "Ihr Paket")], checkpoint="42"
+    )
+    with pytest.raises(OSError):
+        dispatcher.run(service, None, checkpoints)  # type: ignore
+
+    assert checkpoints.load("mail_dispatch") is None
+
+
+def test_deferred_run_remembers_nothing_until_the_caller_commits(
+    local_db_dir, checkpoints, make_message, fake_gmail_service
+):
+    dispatcher = MailDispatcher(processed=ProcessedMessageCache("test"))
+
+    @dispatcher.route("dhl", DHL)
+    def _dhl(mail, outputs):
+        if mail.id == "b":
+            raise ValueError("unexpected layout")
+        return {"parsed": mail.id}
+
+    service = fake_gmail_service(
+        [make_message(i, "order-update@amazon.de", "Ihr Paket") for i in "ab"],
+        checkpoint="42",
+    )
+    deferred = DeferredCheckpointStore(checkpoints)
+    result = dispatcher.run(service, None, deferred, remember=False)  # type: ignore
+
+    assert result.processed == {"a": {"dhl": {"parsed": "a"}}}
+    assert "a" not in dispatcher.processed
+    assert checkpoints.load("mail_dispatch") is None
+
+    dispatcher.remember(result.processed)
+    deferred.commit()
+
+    assert dispatcher.processed.get("a") == {"dhl": {"parsed": "a"}}
+    assert checkpoints.load("mail_dispatch") == "42"
+    assert checkpoints.load("mail_dispatch:retry") == "b"
+
+
+def test_failed_message_is_retried_while_the_checkpoint_advances(
+    local_db_dir, checkpoints, make_message, fake_gmail_service
+):
+    dispatcher = MailDispatcher(processed=ProcessedMessageCache("test"))
+    checkpoints.save("mail_dispatch", "7")
+    failing = {"b"}
+    handled = []
+
+    @dispatcher.route("dhl", DHL)
+    def _dhl(mail, outputs):
+        if mail.id in failing:
+            raise ValueError("unexpected layout")
+        handled.append(mail.id)
+
+    service = fake_gmail_service(
+        [make_message(i, "order-update@amazon.de", "Ihr Paket") for i in "abc"],
+        checkpoint="42",
+    )
+    result = dispatcher.run(service, None, checkpoints)  # type: ignore
+
+    assert result.errors == ["dhl failed for message b: unexpected layout"]
+    assert checkpoints.load("mail_dispatch") == "42"
+    assert checkpoints.load("mail_dispatch:retry") == "b"
+
+    # the next runs fetch it directly instead of listing it again
+    result = dispatcher.run(service, None, checkpoints)  # type: ignore
+
+    assert result.messages == 1
+    assert checkpoints.load("mail_dispatch:retry") == "b"
+
+    failing.clear()
+    result = dispatcher.run(service, None, checkpoints)  # type: ignore
+
+    assert (result.messages, result.errors) == (1, [])
+    assert handled == ["a", "c", "b"]
+    assert service.fetched == ["b", "b"]
+    assert checkpoints.load("mail_dispatch:retry") == ""
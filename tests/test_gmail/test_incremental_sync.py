@@ -0,0 +1,153 @@
+import httplib2
+from googleapiclient.errors import HttpError
+
+from shared.GoogleServices.gmail import MessageFilter, SqliteCheckpointStore
+
+FILTER = MessageFilter(sender="order-update@amazon.de", subject="Ihr Paket")
+
+
+def test_incremental_sync_only_fetches_matching_messages_since_checkpoint(
+    checkpoints, make_message, fake_gmail_resource, gmail_service
+):
+    resource = fake_gmail_resource(
+        [
+            make_message(
+                "a", "Amazon <order-update@amazon.de>", "Ihr Paket kann bei DHL"
+            ),
+            make_message("b", "someone@example.com", "Ihr Paket kann bei DHL"),
+        ]
+    )
+    checkpoints.save("dhl", "100")
+
+    messages = list(
+        gmail_service(resource).iter_new_messages(
+            [FILTER], checkpoints, "dhl", batch_size=None
+        )
+    )
+
+    assert [m["id"] for m in messages] == ["a"]
+    assert checkpoints.checkpoints["dhl"] == "600"
+    assert "messages.get a full" in resource.calls
+    assert "messages.get b full" not in resource.calls
+    assert not any(call.startswith("messages.list") for call in resource.calls)
+
+
+def test_incremental_sync_falls_back_to_search_when_history_expired(
+    checkpoints, make_message, fake_gmail_resource, gmail_service
+):
+    resource = fake_gmail_resource(
+        [make_message("a", "order-update@amazon.de", "Ihr Paket")], history_expired=True
+    )
+    checkpoints.save("dhl", "1")
+
+    messages = list(
+        gmail_service(resource).iter_new_messages(
+            [FILTER], checkpoints, "dhl", batch_size=None
+        )
+    )
+
+    assert [m["id"] for m in messages] == ["a"]
+    assert checkpoints.checkpoints["dhl"] == "500"
+    assert any(
+        call.startswith("messages.list from:order-update@amazon.de")
+        for call in resource.calls
+    )
+
+
+def test_incremental_sync_keeps_checkpoint_until_fully_consumed(
+    checkpoints, make_message, fake_gmail_resource, gmail_service
+):
+    resource = fake_gmail_resource(
+        [
+            make_message("a", "order-update@amazon.de", "Ihr Paket"),
+            make_message("b", "order-update@amazon.de", "Ihr Paket"),
+        ]
+    )
+    checkpoints.save("dhl", "100")
+
+    messages = gmail_service(resource).iter_new_messages(
+        [FILTER], checkpoints, "dhl", batch_size=None
+    )
+    next(messages)
+
+    assert checkpoints.checkpoints["dhl"] == "100"
+
+
+def test_incremental_sync_keeps_checkpoint_if_a_fetch_failed(
+    checkpoints, make_message, fake_gmail_resource, gmail_service
+):
+    resource = fake_gmail_resource(
+        [
+            make_message("a", "order-update@amazon.de", "Ihr Paket"),
+            make_message("b", "order-update@amazon.de", "Ihr Paket"),
+        ]
+    )
+    resource.errors["b"] = HttpError(httplib2.Response({"status": 429}), b"")
+    checkpoints.save("dhl", "100")
+
+    messages = list(
+        gmail_service(resource).iter_new_messages(
+            [FILTER], checkpoints, "dhl", batch_size=None
+        )
+    )
+
+    assert [m["id"] for m in messages] == ["a"]
+    assert checkpoints.checkpoints["dhl"] == "100"
+
+
+def test_incremental_sync_advances_past_deleted_messages(
+    checkpoints, make_message, fake_gmail_resource, gmail_service
+):
+    resource = fake_gmail_resource(
+        [
+            make_message("a", "order-update@amazon.de", "Ihr Paket"),
+            make_message("b", "order-update@amazon.de", "Ihr Paket"),
+        ]
+    )
+    resource.errors["b"] = HttpError(httplib2.Response({"status": 404}), b"")
+    checkpoints.save("dhl", "100")
+
+    messages = list(
+        gmail_service(resource).iter_new_messages(
+            [FILTER], checkpoints, "dhl", batch_size=None
+        )
+    )
+
+    assert [m["id"] for m in messages] == ["a"]
+    assert checkpoints.checkpoints["dhl"] == "600"
+
+
+def test_sqlite_checkpoint_store_roundtrip(local_db_dir):
+    store = SqliteCheckpointStore()
+
+    assert store.load("dhl") is None
+    store.save("dhl", "42")
+    store.save("dhl", "43")
+
+    assert SqliteCheckpointStore().load("dhl") == "43"
+
+
+def test_incremental_sync_of_several_filters_uses_one_combined_search(
+    checkpoints, make_message, fake_gmail_resource, gmail_service
+):
+    returns = MessageFilter(sender="rueckgabe@amazon.de", subject="Ihre Rücksendung")
+    resource = fake_gmail_resource(
+        [
+            make_message("a", "order-update@amazon.de", "Ihr Paket"),
+            make_message("b", "rueckgabe@amazon.de", "Ihre Rücksendung von X"),
+            make_message("c", "rueckgabe@amazon.de", "Newsletter"),
+        ]
+    )
+
+    messages = list(
+        gmail_service(resource).iter_new_messages(
+            [FILTER, returns], checkpoints, "mail", batch_size=None
+        )
+    )
+
+    assert [m["id"] for m in messages] == ["a", "b"]
+    searches = [call for call in resource.calls if call.startswith("messages.list")]
+    assert len(searches) == 1
+    assert searches[0].startswith(
+        "messages.list {from:order-update@amazon.de from:rueckgabe@amazon.de}"
+    )
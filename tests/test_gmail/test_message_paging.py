@@ -0,0 +1,73 @@
+import pytest
+
+from shared.GoogleServices.gmail.service import MESSAGE_ID_FIELDS
+
+
+def _messages(count):
+    return [{"id": str(i)} for i in range(count)]
+
+
+def test_iter_message_ids_follows_next_page_token(fake_gmail_resource, gmail_service):
+    resource = fake_gmail_resource(_messages(7))
+
+    ids = [m.id for m in gmail_service(resource).iter_message_ids("q", page_size=3)]
+
+    assert ids == [str(i) for i in range(7)]
+    assert len(resource.list_calls) == 3
+    assert all(call["fields"] == MESSAGE_ID_FIELDS for call in resource.list_calls)
+
+
+def test_iter_message_ids_requests_pages_lazily(fake_gmail_resource, gmail_service):
+    resource = fake_gmail_resource(_messages(7))
+
+    message_ids = gmail_service(resource).iter_message_ids("q", page_size=3)
+    first = next(message_ids)
+
+    assert first.id == "0"
+    assert first.thread_id == "t0"
+    assert len(resource.list_calls) == 1
+
+
+def test_query_messages_ids_is_no_longer_cut_off_after_one_page(
+    fake_gmail_resource, gmail_service
+):
+    resource = fake_gmail_resource(_messages(250))
+
+    assert len(gmail_service(resource)._query_messages_ids("q")) == 250
+
+
+def test_failing_page_is_raised_instead_of_ending_the_listing(
+    fake_gmail_resource, gmail_service
+):
+    resource = fake_gmail_resource(_messages(7))
+    resource.list_errors["3"] = ConnectionError("connection reset")
+
+    with pytest.raises(ConnectionError):
+        list(gmail_service(resource).iter_message_ids("q", page_size=3))
+
+
+def test_query_messages_with_body_fetches_each_page(
+    make_message, fake_gmail_resource, gmail_service
+):
+    resource = fake_gmail_resource(
+        [make_message(str(i), "a@x.de", "s") for i in range(5)]
+    )
+    service = gmail_service(resource)
+
+    bodies = list(service.iter_messages_with_body("q", page_size=2))
+
+    assert bodies == [str(i) for i in range(5)]
+    assert resource.batches == [["0", "1"], ["2", "3"], ["4"]]
+    assert service.query_messages_with_body("q") == bodies
+
+
+def test_query_messages_with_body_raises_failed_fetches(
+    make_message, fake_gmail_resource, gmail_service
+):
+    resource = fake_gmail_resource([make_message(i, "a@x.de", "s") for i in "ab"])
+    error = ConnectionError("connection reset")
+    resource.errors["b"] = error
+
+    with pytest.raises(RuntimeError, match="1 of 2 messages") as raised:
+        gmail_service(resource).query_messages_with_body("q")
+    assert raised.value.__cause__ is error
@@ -0,0 +1,53 @@
+import base64
+
+from shared.GoogleServices.gmail.mime import (
+    HTML_BODY_FIELDS,
+    extract_html_body,
+    payload_fields,
+)
+
+
+def _data(text: str) -> str:
+    return base64.urlsafe_b64encode(text.encode("utf-8")).decode("ascii")
+
+
+def test_finds_html_nested_in_multipart_mixed():
+    payload = {
+        "mimeType": "multipart/mixed",
+        "body": {"size": 0},
+        "parts": [
+            {
+                "mimeType": "multipart/alternative",
+                "body": {"size": 0},
+                "parts": [
+                    {"mimeType": "text/plain", "body": {"data": _data("plain")}},
+                    {
+                        "mimeType": "text/html",
+                        "body": {"data": _data("<p>Südhöhe</p>")},
+                    },
+                ],
+            },
+            {"mimeType": "application/pdf", "body": {"attachmentId": "a1"}},
+        ],
+    }
+
+    assert extract_html_body(payload) == "<p>Südhöhe</p>".encode("utf-8")
+
+
+def test_falls_back_to_single_part_body():
+    payload = {"mimeType": "text/plain", "body": {"data": _data("only text")}}
+
+    assert extract_html_body(payload) == b"only text"
+
+
+def test_returns_empty_bytes_without_body():
+    payload = {"mimeType": "multipart/mixed", "parts": [{"mimeType": "text/plain"}]}
+
+    assert extract_html_body(payload) == b""
+
+
+def test_payload_fields_nests_parts():
+    assert payload_fields("mimeType", depth=2) == (
+        "payload(mimeType,parts(mimeType,parts(mimeType)))"
+    )
+    assert HTML_BODY_FIELDS.startswith("id,payload(mimeType,body/data,parts(")
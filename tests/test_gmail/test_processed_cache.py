@@ -0,0 +1,89 @@
+import pytest
+
+from shared.GoogleServices.gmail import (
+    MessageFilter,
+    ProcessedMessageCache,
+    SqliteCheckpointStore,
+)
+
+pytestmark = pytest.mark.usefixtures("local_db_dir")
+
+
+def test_put_and_get_survive_a_new_instance():
+    cache = ProcessedMessageCache("dhl_pickup")
+    cache.put("m1", {"tracking_number": "JJD1"})
+
+    assert "m1" in cache
+    assert "m2" not in cache
+
+    # a cold worker only has the SQLite file
+    fresh = ProcessedMessageCache("dhl_pickup")
+    assert fresh.get("m1") == {"tracking_number": "JJD1"}
+    assert ProcessedMessageCache("amazon_return").get("m1") is None
+
+
+def test_stats_count_hits_and_misses():
+    cache = ProcessedMessageCache("dhl_pickup")
+    cache.put("m1", {})
+
+    assert "m1" in cache
+    assert "m1" in cache
+    assert "m2" not in cache
+
+    stats = cache.stats()
+    assert (stats.hits, stats.misses, stats.size) == (2, 1, 1)
+    assert stats.hit_rate == pytest.approx(2 / 3)
+
+
+def test_expired_entries_are_ignored_and_pruned():
+    cache = ProcessedMessageCache("dhl_pickup", ttl=0)
+    cache.put("m1", {})
+
+    assert "m1" not in cache
+    assert cache.prune() == 1
+    assert cache.stats().size == 0
+
+
+def test_prune_keeps_the_most_recently_seen_entries():
+    cache = ProcessedMessageCache("dhl_pickup", max_entries=2, max_memory_entries=1)
+    for message_id in ["m1", "m2", "m3"]:
+        cache.put(message_id, {})
+    # seeing m1 again makes m2 the least recently seen
+    assert "m1" in cache
+
+    assert cache.prune() == 1
+    assert "m2" not in ProcessedMessageCache("dhl_pickup")
+    assert "m1" in cache and "m3" in cache
+
+
+def test_skipped_messages_are_not_fetched(monkeypatch):
+    from shared.GoogleServices.gmail.service import GmailService
+    from shared.GoogleServices.gmail.models import MessageBatchResult, MessageId
+
+    service = GmailService(credentials=None)  # type: ignore
+    fetched = []
+    monkeypatch.setattr(
+        service,
+        "_list_added_message_ids",
+        lambda history_id: ([MessageId("m1", ""), MessageId("m2", "")], "2"),
+    )
+    monkeypatch.setattr(
+        service,
+        "fetch_messages",
+        lambda ids, **kwargs: fetched.extend(ids) or MessageBatchResult(),
+    )
+    checkpoints = SqliteCheckpointStore()
+    checkpoints.save("dhl_pickup", "1")
+    cache = ProcessedMessageCache("dhl_pickup")
+    cache.put("m1", {})
+
+    list(
+        service.iter_new_messages(
+            [MessageFilter(sender="someone")],
+            checkpoints,
+            "dhl_pickup",
+            skip=cache.__contains__,
+        )
+    )
+
+    assert fetched == ["m2"]
@@ -0,0 +1,69 @@
+import threading
+
+from shared.GoogleServices.client_factory import GoogleClientFactory
+
+
+class FakeCredentials:
+    def __init__(self):
+        self.valid = False
+        self.refreshes = 0
+
+    def refresh(self, request):
+        self.refreshes += 1
+        self.valid = True
+
+
+def _factory(monkeypatch):
+    loads = []
+    builds = []
+
+    def load_credentials():
+        loads.append(FakeCredentials())
+        return loads[-1]
+
+    def build(api, version, credentials, cache_discovery):
+        builds.append((api, version))
+        return object()
+
+    monkeypatch.setattr("shared.GoogleServices.client_factory.build", build)
+    return GoogleClientFactory(load_credentials=load_credentials), loads, builds
+
+
+def test_credentials_are_loaded_once_and_refreshed_only_when_invalid(monkeypatch):
+    factory, loads, _ = _factory(monkeypatch)
+
+    credentials = factory.credentials()
+    factory.credentials()
+    assert len(loads) == 1
+    assert credentials.refreshes == 1
+
+    credentials.valid = False  # expired
+    factory.credentials()
+    assert credentials.refreshes == 2
+
+
+def test_resources_are_reused_across_invocations(monkeypatch):
+    factory, _, builds = _factory(monkeypatch)
+
+    first = factory.gmail().service
+    second = factory.gmail().service
+    factory.tasks()
+    factory.tasks()
+
+    assert first is second
+    assert builds == [("gmail", "v1"), ("tasks", "v1")]
+
+
+def test_resources_are_built_per_thread_and_rebuilt_after_clear(monkeypatch):
+    factory, loads, builds = _factory(monkeypatch)
+
+    factory.resource("gmail", "v1")
+    thread = threading.Thread(target=factory.resource, args=("gmail", "v1"))
+    thread.start()
+    thread.join()
+    assert len(builds) == 2
+
+    factory.clear()
+    factory.resource("gmail", "v1")
+    assert len(builds) == 3
+    assert len(loads) == 2
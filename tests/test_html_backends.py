@@ -0,0 +1,42 @@
+from pathlib import Path
+
+import pytest
+
+from UseCases.DeliveryTracker.parsing import parse_dhl_pickup_email_html
+from UseCases.ReturnTracker.parsing import parse_return_info
+from shared.html_backend import (
+    FALLBACK_BACKEND,
+    HTML_BACKENDS,
+    available_backends,
+    make_soup,
+)
+
+TESTS_DIR = Path(__file__).parent
+
+FIXTURES = [
+    (TESTS_DIR / "test_delivery_tracker/dhl_test.html", parse_dhl_pickup_email_html),
+    (
+        TESTS_DIR / "test_return_tracker/amazon_rueckgabe_test.html",
+        parse_return_info,
+    ),
+]
+
+
+@pytest.mark.parametrize("backend", HTML_BACKENDS)
+@pytest.mark.parametrize("path, parse", FIXTURES)
+def test_backends_parse_identical_results(backend, path, parse):
+    if backend not in available_backends():
+        pytest.skip(f"{backend} is not installed")
+
+    html = path.read_text()
+
+    assert parse(html, backend=backend) == parse(html, backend=FALLBACK_BACKEND)
+
+
+def test_fallback_is_always_available():
+    assert FALLBACK_BACKEND in available_backends()
+
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError):
+        make_soup("<p></p>", "not-a-parser")
@@ -0,0 +1,90 @@
+from pathlib import Path
+
+import pytest
+
+from UseCases.DeliveryTracker.parsing import (
+    DHL_PICKUP_TEMPLATES,
+    parse_known_dhl_pickup_email_html,
+)
+from UseCases.ReturnTracker.parsing import RETURN_TEMPLATES
+from shared.html_fingerprint import (
+    TemplateRegistry,
+    UnknownTemplateError,
+    UnknownTemplateLog,
+    fingerprint,
+)
+
+TESTS_DIR = Path(__file__).parent
+
+MAIL = """
+<html><body>
+<!--[if mso]><table class="outlook"><tr><td><![endif]-->
+<table class="card"><tr><td class="text text-38">{content}</td></tr>{rows}</table>
+</body></html>
+"""
+
+
+def _mail(content="Hallo", rows=""):
+    return MAIL.format(content=content, rows=rows)
+
+
+def test_fingerprint_ignores_content_and_numbered_classes():
+    assert fingerprint(_mail()) == fingerprint(_mail(content="Servus"))
+    assert fingerprint(_mail()) == fingerprint(_mail().replace("text-38", "text-52"))
+    # more items of the same layout
+    assert fingerprint(_mail()) == fingerprint(
+        _mail(rows='<tr><td class="text">Item</td></tr>')
+    )
+
+
+def test_fingerprint_changes_with_the_layout():
+    assert fingerprint(_mail()) != fingerprint(_mail().replace("card", "panel"))
+    assert fingerprint(_mail()) != fingerprint(
+        _mail(content="<table><tr><td>nested</td></tr></table>")
+    )
+    # tags inside comments do not count
+    assert fingerprint(_mail()) == fingerprint(_mail().replace("outlook", "other"))
+
+
+def test_fixtures_are_known_templates():
+    dhl = (TESTS_DIR / "test_delivery_tracker/dhl_test.html").read_text()
+    amazon_return = (
+        TESTS_DIR / "test_return_tracker/amazon_rueckgabe_test.html"
+    ).read_text()
+
+    DHL_PICKUP_TEMPLATES.lookup(dhl)
+    RETURN_TEMPLATES.lookup(amazon_return)
+    with pytest.raises(UnknownTemplateError):
+        DHL_PICKUP_TEMPLATES.lookup(amazon_return)
+
+
+def test_unknown_template_is_rejected_before_parsing():
+    with pytest.raises(UnknownTemplateError) as error:
+        parse_known_dhl_pickup_email_html(_mail())
+
+    assert error.value.registry == "dhl_pickup"
+    assert error.value.fingerprint == fingerprint(_mail())
+
+
+def test_registered_template_gets_its_extractor():
+    registry = TemplateRegistry("test")
+    registry.register(fingerprint(_mail()), "extractor")
+
+    assert registry.lookup(_mail(content="Servus")) == "extractor"
+
+
+def test_unknown_template_log_keeps_the_first_sample(local_db_dir):
+    log = UnknownTemplateLog()
+    error = UnknownTemplateError("dhl_pickup", "abc")
+
+    assert log.record(error, "m1")
+    assert not log.record(error, "m2")
+    log.record(UnknownTemplateError("amazon_return", "def"), "m3")
+
+    [unknown] = log.unknown("dhl_pickup")
+    assert (unknown.fingerprint, unknown.sample_message_id, unknown.count) == (
+        "abc",
+        "m1",
+        2,
+    )
+    assert len(log.unknown()) == 2
@@ -0,0 +1,115 @@
+import re
+
+import pytest
+from bs4 import BeautifulSoup
+
+from shared.html_rules import Direction, Region, RowRule, RuleSet, match_group
+
+HTML = """
+<table>
+  <tr><td>Title <b>Thing</b></td></tr>
+  <tr><td></td></tr>
+  <tr><td><span>Anzahl: 2</span></td></tr>
+  <tr><td><span>LABEL</span></td></tr>
+  <tr><td>first</td></tr>
+  <tr><td>second</td></tr>
+  <tr><td><p>Order 123-45</p></td></tr>
+</table>
+"""
+
+
+def _soup():
+    return BeautifulSoup(HTML, "html.parser")
+
+
+def test_rules_walk_rows_in_both_directions():
+    rules = RuleSet(
+        [
+            RowRule("first", "LABEL", offset=1),
+            RowRule("second", "LABEL", offset=2),
+            RowRule(
+                "title", re.compile("^Anzahl:"), offset=2, direction=Direction.PREVIOUS
+            ),
+            RowRule(
+                "order",
+                re.compile("^Order"),
+                cleanup=match_group(re.compile(r"Order (\S+)")),
+            ),
+        ]
+    )
+
+    assert rules.evaluate(_soup()) == {
+        "first": "first",
+        "second": "second",
+        "title": "Title Thing",
+        "order": "123-45",
+    }
+
+
+def test_missing_anchor_or_row_gives_none():
+    rules = RuleSet(
+        [
+            RowRule("missing", "NOT THERE"),
+            RowRule("too_far", "LABEL", offset=10),
+            RowRule("wrong_tag", re.compile("^Order"), tag="span"),
+        ]
+    )
+
+    assert rules.evaluate(_soup()) == {
+        "missing": None,
+        "too_far": None,
+        "wrong_tag": None,
+    }
+
+
+def test_shared_anchor_is_looked_up_once():
+    rules = RuleSet(
+        [RowRule("first", "LABEL", offset=1), RowRule("second", "LABEL", offset=2)]
+    )
+
+    assert list(rules.find_anchor_rows(_soup())) == [("LABEL", None)]
+
+
+def test_rule_names_must_be_unique():
+    with pytest.raises(ValueError):
+        RuleSet([RowRule("a", "LABEL"), RowRule("a", "Order")])
+
+
+PAGE = f"""
+<html><head><style>td {{ color: red; }}</style></head><body>
+<!--[if mso]><table><tr><td><![endif]-->
+<table><tr><td>header</td></tr><tr><td>{HTML}</td></tr></table>
+<!--[if mso]></td></tr></table><![endif]-->
+<table><tr><td>footer</td></tr></table>
+</body></html>
+"""
+
+
+def test_region_is_the_smallest_table_around_both_markers():
+    region = Region("Title", "Order").cut(PAGE)
+
+    assert region is not None
+    assert region.strip() == HTML.strip()
+
+
+def test_region_widens_to_the_table_containing_both_markers():
+    region = Region("header", "Order").cut(PAGE)
+
+    assert region is not None
+    assert region.startswith("<table><tr><td>header")
+    assert "footer" not in region
+
+
+def test_region_missing_marker():
+    assert Region("Title", "NOT THERE").cut(PAGE) is None
+    assert Region("NOT THERE", "Order").cut(PAGE) is None
+
+
+def test_parse_falls_back_to_the_whole_document():
+    rules = RuleSet(
+        [RowRule("first", "LABEL", offset=1), RowRule("footer", "footer")],
+        region=Region("Title", "Order"),
+    )
+
+    # the footer is outside of the region
+    assert rules.parse(PAGE) == {"first": "first", "footer": "footer"}
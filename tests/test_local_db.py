@@ -0,0 +1,23 @@
+from shared.AzureHelper import local_db
+from shared.AzureHelper.local_db import LocalDb
+
+
+def test_local_db_is_opened_once_on_first_use(tmp_path, monkeypatch):
+    monkeypatch.setattr(local_db, "get_temp_dir", lambda: tmp_path)
+    opened = []
+    open_local_db = local_db.open_local_db
+    monkeypatch.setattr(
+        local_db,
+        "open_local_db",
+        lambda name: opened.append(name) or open_local_db(name),
+    )
+
+    db = LocalDb("test_local_db", ["CREATE TABLE IF NOT EXISTS items (name TEXT)"])
+    assert opened == []
+
+    with db():
+        db().execute("INSERT INTO items VALUES ('a')")
+
+    assert db().execute("SELECT name FROM items").fetchall() == [("a",)]
+    assert opened == ["test_local_db"]
+    assert (tmp_path / "test_local_db.sqlite3").exists()
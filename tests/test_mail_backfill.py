@@ -0,0 +1,201 @@
+import io
+import json
+from datetime import datetime, timezone
+from pathlib import Path
+
+import pytest
+
+import function_app  # noqa: F401, registers the mail routes
+from UseCases import MailBackfill
+from UseCases.MailBackfill import backfill
+from UseCases.MailPoller import MailOutputs, mail_dispatcher, unknown_templates
+from shared.GoogleServices.gmail import DeferredCheckpointStore, ProcessedMessageCache
+
+TESTS_DIR = Path(__file__).parent
+START = datetime(2025, 5, 1, tzinfo=timezone.utc)
+END = datetime(2025, 6, 1, tzinfo=timezone.utc)
+
+
+# a DHL pickup mail whose layout is not registered
+CHANGED_HTML = b"<html><body><table><tr><td>Neu</td></tr></table></body></html>"
+
+
+def _fixture(path: str) -> bytes:
+    return (TESTS_DIR / path).read_bytes()
+
+
+@pytest.fixture
+def mail_service(fake_gmail_service, make_message):
+    return fake_gmail_service(
+        [
+            make_message(
+                "dhl",
+                "order-update@amazon.de",
+                "Ihr Paket kann bei DHL abgeholt werden",
+                _fixture("test_delivery_tracker/dhl_test.html"),
+                datetime(2025, 5, 20, tzinfo=timezone.utc),
+            ),
+            make_message(
+                "return",
+                "rueckgabe@amazon.de",
+                "Ihre Rücksendung von IceUnicorn",
+                _fixture("test_return_tracker/amazon_rueckgabe_test.html"),
+                datetime(2025, 5, 10, tzinfo=timezone.utc),
+            ),
+        ]
+    )
+
+
+@pytest.fixture(autouse=True)
+def processed(local_db_dir, monkeypatch):
+    cache = ProcessedMessageCache("backfill_test")
+    monkeypatch.setattr(mail_dispatcher, "processed", cache)
+    # a fresh log in local_db_dir for every test
+    monkeypatch.setattr(unknown_templates._db, "_connection", None)
+    return cache
+
+
+def test_backfill_dispatches_the_range_and_reports(mail_service, checkpoints):
+    outputs = MailOutputs(now=datetime(2025, 5, 1))
+    report = io.StringIO()
+
+    stats = backfill(mail_service, START, END, outputs, checkpoints, report=report)
+
+    assert stats.complete
+    assert stats.handled == {"dhl_pickup": 1, "amazon_return": 1}
+    assert len(outputs.tasks) == 2
+    assert [message_id for message_id, _ in outputs.shipments] == ["dhl"]
+    assert [message_id for message_id, _ in outputs.returns] == ["return"]
+    assert "after:1746057600" in mail_service.queries[0]
+    assert "before:1748736000" in mail_service.queries[0]
+    lines = [json.loads(line) for line in report.getvalue().splitlines()]
+    assert [line["message_id"] for line in lines] == ["dhl", "return"]
+    assert lines[0]["results"]["dhl_pickup"]["due_date"] == "30.05.2025"
+
+
+def test_backfill_skips_processed_mails(mail_service, checkpoints, processed):
+    processed.put("dhl", {})
+
+    stats = backfill(mail_service, START, END, MailOutputs(), checkpoints)
+
+    assert stats.skipped == 1
+    assert mail_service.fetched == ["return"]
+
+
+def test_backfill_does_not_remember_before_the_outputs_are_set(
+    mail_service, checkpoints
+):
+    outputs = MailOutputs()
+    deferred = DeferredCheckpointStore(checkpoints)
+
+    backfill(mail_service, START, END, outputs, deferred)
+
+    assert "dhl" not in mail_dispatcher.processed
+    assert sorted(outputs.processed) == ["dhl", "return"]
+    assert checkpoints.checkpoints == {}
+
+    mail_dispatcher.remember(outputs.processed)
+    deferred.commit()
+
+    assert "dhl" in mail_dispatcher.processed
+    assert list(checkpoints.checkpoints.values()) == ["1746057600"]
+
+
+def test_backfill_resumes_after_time_budget(mail_service, checkpoints, monkeypatch):
+    mail_service.fetch_seconds = 10
+    monkeypatch.setattr(MailBackfill.time, "monotonic", lambda: mail_service.clock)
+
+    first = backfill(
+        mail_service,
+        START,
+        END,
+        MailOutputs(),
+        checkpoints,
+        time_budget=5,
+        batch_size=1,
+    )
+
+    assert not first.complete
+    assert mail_service.fetched == ["dhl"]
+
+    mail_dispatcher.remember({"dhl": {}})
+    second = backfill(mail_service, START, END, MailOutputs(), checkpoints)
+
+    assert second.complete
+    assert mail_service.fetched == ["dhl", "return"]
+    # the resumed range overlaps by a second, the handled mail is skipped
+    assert second.skipped == 1
+
+
+def test_backfill_records_unknown_templates(mail_service, checkpoints, make_message):
+    mail_service.messages.append(
+        make_message(
+            "changed",
+            "order-update@amazon.de",
+            "Ihr Paket kann bei DHL abgeholt werden",
+            CHANGED_HTML,
+            datetime(2025, 5, 5, tzinfo=timezone.utc),
+        )
+    )
+
+    stats = backfill(mail_service, START, END, MailOutputs(), checkpoints)
+
+    assert stats.handled == {"dhl_pickup": 1, "amazon_return": 1}
+    assert [error.split(":")[0] for error in stats.errors] == [
+        "dhl_pickup failed for message changed"
+    ]
+    [unknown] = unknown_templates.unknown("dhl_pickup")
+    assert unknown.sample_message_id == "changed"
+
+
+def test_backfill_listing_counts_against_the_time_budget(
+    mail_service, checkpoints, monkeypatch
+):
+    mail_service.list_seconds = 10
+    monkeypatch.setattr(MailBackfill.time, "monotonic", lambda: mail_service.clock)
+
+    stats = backfill(
+        mail_service, START, END, MailOutputs(), checkpoints, time_budget=5
+    )
+
+    assert not stats.complete
+    assert mail_service.fetched == []
+    assert checkpoints.checkpoints == {}
+
+
+@pytest.mark.parametrize("fetch_fails", [True, False])
+def test_backfill_checkpoint_stops_at_the_first_failed_mail(
+    mail_service, checkpoints, make_message, fetch_fails
+):
+    if fetch_fails:
+        mail_service.fetch_errors["return"] = ConnectionError("connection reset")
+    else:
+        mail_service.messages[1] = make_message(
+            "return",
+            "rueckgabe@amazon.de",
+            "Ihre Rücksendung von IceUnicorn",
+            CHANGED_HTML,
+            datetime(2025, 5, 10, tzinfo=timezone.utc),
+        )
+    mail_service.messages.append(
+        make_message(
+            "older",
+            "order-update@amazon.de",
+            "Ihr Paket kann bei DHL abgeholt werden",
+            _fixture("test_delivery_tracker/dhl_test.html"),
+            datetime(2025, 5, 5, tzinfo=timezone.utc),
+        )
+    )
+    outputs = MailOutputs(now=datetime(2025, 5, 1))
+
+    stats = backfill(mail_service, START, END, outputs, checkpoints, batch_size=1)
+
+    assert not stats.complete
+    failed_step = "fetch" if fetch_fails else "amazon_return"
+    assert [error.split(":")[0] for error in stats.errors] == [
+        f"{failed_step} failed for message return"
+    ]
+    # the mails after the failed one are handled, but the range keeps it
+    assert sorted(outputs.processed) == ["dhl", "older"]
+    dhl_received = int(datetime(2025, 5, 20, tzinfo=timezone.utc).timestamp())
+    assert list(checkpoints.checkpoints.values()) == [str(dhl_received + 1)]
@@ -0,0 +1,60 @@
+from datetime import date
+
+import pytest
+
+from UseCases.DeliveryTracker.parsing import EmailData
+from UseCases.ReturnTracker.parsing import ReturnInfo
+from UseCases.parcel_store import ParcelStore
+
+SHIPMENT = EmailData(
+    tracking_number="JJD000390016951668949",
+    pickup_location="Packstation 158, Südhöhe 38",
+    due_date="30.05.2025",
+    preview="WOCVRYY Autositz Organizer...",
+)
+RETURN = ReturnInfo(
+    return_date="5. Juli 2025",
+    order_number="302-9238863-3187535",
+    pickup_location="DHL Abgabe an Packstation",
+    item_title="IceUnicorn Krabbelschuhe Baby...",
+)
+
+
+@pytest.fixture
+def store(local_db_dir):
+    return ParcelStore()
+
+
+def test_stored_shipments_are_found_by_tracking_number_and_due_date(store):
+    later = EmailData("JJD2", "Filiale", "02.06.2025", "Other")
+    undated = EmailData(None, "Address not found", None, "Unknown item")
+
+    assert store.add_shipments([("m1", SHIPMENT), ("m2", later), ("m3", undated)]) == 3
+
+    assert store.is_tracked("JJD000390016951668949")
+    assert not store.is_tracked("JJD3")
+    assert store.shipment("m1") == SHIPMENT
+    assert store.shipment("unknown") is None
+    assert store.shipments_due(date(2025, 5, 26), date(2025, 6, 1)) == [SHIPMENT]
+    assert store.shipments_due(date(2025, 5, 1), date(2025, 6, 30)) == [
+        SHIPMENT,
+        later,
+    ]
+
+
+def test_stored_returns_are_found_by_order_number_and_due_date(store):
+    store.add_returns([("m1", RETURN)])
+
+    assert store.has_return("302-9238863-3187535")
+    assert not store.has_return("000-0000000-0000000")
+    assert store.returns_due(date(2025, 7, 1), date(2025, 7, 7)) == [RETURN]
+    assert store.returns_due(date(2025, 7, 6), date(2025, 7, 7)) == []
+
+
+def test_storing_a_message_again_replaces_it(store):
+    store.add_shipments([("m1", SHIPMENT)])
+    updated = EmailData(SHIPMENT.tracking_number, "Filiale", "31.05.2025", "Item")
+    store.add_shipments([("m1", updated)])
+
+    assert store.shipment("m1") == updated
+    assert store.shipments_due(date(2025, 5, 30), date(2025, 5, 30)) == []
@@ -0,0 +1,71 @@
+import threading
+
+import pytest
+
+from shared.pipeline import StageTimings, run_pipelined, timed
+
+
+def test_items_are_consumed_in_order_on_a_worker_thread():
+    consumed = []
+
+    run_pipelined(
+        range(50),
+        lambda item: consumed.append((item, threading.current_thread().name)),
+        queue_size=4,
+    )
+
+    assert [item for item, _ in consumed] == list(range(50))
+    assert {thread for _, thread in consumed} == {"pipeline-consumer"}
+
+
+def test_queue_size_zero_consumes_on_the_calling_thread():
+    threads = set()
+
+    run_pipelined(
+        range(3), lambda item: threads.add(threading.current_thread()), queue_size=0
+    )
+
+    assert threads == {threading.current_thread()}
+
+
+def test_consumer_failure_stops_the_producer():
+    produced = []
+
+    def _items():
+        for i in range(1000):
+            produced.append(i)
+            yield i
+
+    def _consume(item):
+        if item == 3:
+            raise RuntimeError("broken")
+
+    with pytest.raises(RuntimeError, match="broken"):
+        run_pipelined(_items(), _consume, queue_size=2)
+
+    assert len(produced) < 1000
+
+
+def test_producer_failure_waits_for_the_consumer():
+    consumed = []
+
+    def _items():
+        yield 1
+        yield 2
+        raise ConnectionError("gone")
+
+    with pytest.raises(ConnectionError):
+        run_pipelined(_items(), consumed.append)
+
+    assert consumed == [1, 2]
+
+
+def test_stage_timings():
+    timings = StageTimings()
+
+    assert list(timed(range(3), timings, "fetch")) == [0, 1, 2]
+    with timings.measure("parse"):
+        pass
+
+    assert timings.counts == {"fetch": 3, "parse": 1}
+    assert timings.summary().startswith("fetch ")
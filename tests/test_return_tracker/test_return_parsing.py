@@ -1,4 +1,4 @@
-from UseCases.ReturnTracker.parsing import parse_return_info
+from UseCases.ReturnTracker.parsing import RETURN_RULES, parse_return_info
 from pathlib import Path
 
 
@@ -14,3 +14,10 @@ def test_return_parsing_correct_information_from_raw_html():
         == "DHL Abgabe an Packstation – weder Verpackung noch Drucker erforderlich"
     )
     assert parsed.item_title == "IceUnicorn Krabbelschuhe Baby..."
+
+
+def test_region_parse_matches_full_parse():
+    html = open(Path(__file__).parent / "amazon_rueckgabe_test.html", "r").read()
+
+    assert RETURN_RULES.region.cut(html) is not None
+    assert parse_return_info(html) == parse_return_info(html, trim=False)
@@ -0,0 +1,63 @@
+import pytest
+
+from shared.AzureHelper import secrets
+
+
+@pytest.fixture
+def fetched(monkeypatch):
+    fetched = []
+
+    def fetch_secret(secret_name):
+        fetched.append(secret_name)
+        return f"value of {secret_name}"
+
+    monkeypatch.setattr(secrets, "_fetch_secret", fetch_secret)
+    secrets.clear_secret_cache()
+    yield fetched
+    secrets.clear_secret_cache()
+
+
+def test_get_secret_only_hits_key_vault_once(fetched):
+    before = secrets.secret_cache_stats()
+
+    assert secrets.get_secret("TelegramBotToken") == "value of TelegramBotToken"
+    assert secrets.get_secret("TelegramBotToken") == "value of TelegramBotToken"
+
+    after = secrets.secret_cache_stats()
+    assert fetched == ["TelegramBotToken"]
+    assert after.hits - before.hits == 1
+    assert after.misses - before.misses == 1
+
+
+def test_get_secret_refetches_after_ttl(fetched, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(secrets.time, "monotonic", lambda: now[0])
+
+    secrets.get_secret("MietplanUsername", ttl=10)
+    now[0] += 5
+    secrets.get_secret("MietplanUsername", ttl=10)
+    now[0] += 10
+    secrets.get_secret("MietplanUsername", ttl=10)
+
+    assert fetched == ["MietplanUsername", "MietplanUsername"]
+
+
+def test_least_recently_used_secret_is_evicted(fetched, monkeypatch):
+    monkeypatch.setattr(secrets, "MAX_CACHED_SECRETS", 2)
+
+    secrets.get_secret("a")
+    secrets.get_secret("b")
+    secrets.get_secret("a")
+    secrets.get_secret("c")  # evicts b
+    secrets.get_secret("a")
+    secrets.get_secret("b")
+
+    assert fetched == ["a", "b", "c", "b"]
+
+
+def test_prefetch_fills_the_cache(fetched):
+    secrets.prefetch(["a", "b", "a"])
+    secrets.get_secret("a")
+    secrets.get_secret("b")
+
+    assert sorted(fetched) == ["a", "b"]
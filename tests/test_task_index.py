@@ -0,0 +1,52 @@
+import pytest
+
+from Infrastructure.google_task.task_index import TaskIndex
+
+
+@pytest.fixture
+def index(local_db_dir):
+    return TaskIndex("test_task_index")
+
+
+def _task(title, dedupe_key=None):
+    return {"title": title, "notes": "", "tasklist": "list", "dedupe_key": dedupe_key}
+
+
+def test_created_tasks_are_skipped(index):
+    index.record({"dhl:1": "task-1"})
+
+    tasks = [_task("a", "dhl:1"), _task("b", "dhl:2"), _task("c")]
+
+    assert [task["title"] for task in index.not_created(tasks)] == ["b", "c"]
+
+
+def test_repeated_key_in_one_event_is_created_once(index):
+    tasks = [_task("a", "manga:x:1"), _task("b", "manga:x:1"), _task("c"), _task("d")]
+
+    assert [task["title"] for task in index.not_created(tasks)] == ["a", "c", "d"]
+
+
+def test_index_survives_a_new_connection(index):
+    index.record({"return:1:item": "task-1"})
+
+    assert TaskIndex("test_task_index").lookup(["return:1:item", "other"]) == {
+        "return:1:item": "task-1"
+    }
+
+
+def test_expired_entries_are_ignored_and_pruned(index):
+    index.record({"dhl:1": "task-1"})
+    index.ttl = 0
+
+    assert index.lookup(["dhl:1"]) == {}
+    assert index.prune() == 1
+
+
+def test_held_notices_are_taken_once(index):
+    index.hold_notices({"dhl:1": "Task created: a", "dhl:2": "Task created: b"})
+
+    assert index.take_notices(["dhl:1", "other"]) == {"dhl:1": "Task created: a"}
+    assert index.take_notices(["dhl:1"]) == {}
+    assert TaskIndex("test_task_index").take_notices(["dhl:2"]) == {
+        "dhl:2": "Task created: b"
+    }
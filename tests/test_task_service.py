@@ -0,0 +1,165 @@
+import asyncio
+
+import pytest
+
+import function_app  # noqa: F401, must be imported before the bindings
+from Infrastructure.google_task import GoogleTask
+from Infrastructure.google_task.azure_helper import (
+    TaskListType,
+    batch_task_events,
+    create_task_output_event,
+)
+from Infrastructure.google_task.task_index import TaskIndex
+from shared.GoogleServices import NewTask, TaskService
+
+
+class FakeInsert:
+    def __init__(self, tasklist, body):
+        self.tasklist = tasklist
+        self.body = body
+
+    def execute(self):
+        return {**self.body, "id": f"id-{self.body['title']}"}
+
+
+class FakeBatch:
+    def __init__(self, resource, callback):
+        self.resource = resource
+        self.callback = callback
+        self.requests = []
+
+    def add(self, request, request_id):
+        self.requests.append((request_id, request))
+
+    def execute(self):
+        if self.resource.broken_batches:
+            self.resource.broken_batches -= 1
+            raise ConnectionError("connection reset")
+        self.resource.batches.append([request_id for request_id, _ in self.requests])
+        for request_id, request in self.requests:
+            if request.body["title"] in self.resource.failing_titles:
+                self.callback(request_id, None, Exception("boom"))
+            else:
+                self.callback(request_id, request.execute(), None)
+
+
+class FakeTasksResource:
+    def __init__(self, failing_titles=(), broken_batches=0):
+        self.batches = []
+        self.failing_titles = set(failing_titles)
+        self.broken_batches = broken_batches
+
+    def tasks(self):
+        return self
+
+    def insert(self, tasklist, body):
+        return FakeInsert(tasklist, body)
+
+    def new_batch_http_request(self, callback):
+        return FakeBatch(self, callback)
+
+
+def _tasks(count):
+    return [NewTask("list", f"task {i}", notes="notes") for i in range(count)]
+
+
+def test_create_tasks_groups_inserts_into_batches():
+    resource = FakeTasksResource(failing_titles={"task 3"})
+
+    result = TaskService(None, service=resource).create_tasks(_tasks(5), batch_size=2)
+
+    assert resource.batches == [["0", "1"], ["2", "3"], ["4"]]
+    assert sorted(result.tasks) == [0, 1, 2, 4]
+    assert result.tasks[4]["id"] == "id-task 4"
+    assert result.tasks[4]["due"].endswith("23:59:59+00:00")
+    assert list(result.errors) == [3]
+
+
+def test_failed_batch_fails_only_its_tasks():
+    resource = FakeTasksResource(broken_batches=1)
+
+    result = TaskService(None, service=resource).create_tasks(_tasks(3), batch_size=2)
+
+    assert sorted(result.errors) == [0, 1]
+    assert isinstance(result.errors[0], ConnectionError)
+    assert sorted(result.tasks) == [2]
+
+
+def test_batch_task_events_merges_tasks():
+    events = [
+        create_task_output_event(title=f"task {i}", tasklist=TaskListType.MANGA)
+        for i in range(5)
+    ]
+
+    batched = batch_task_events(events, tasks_per_event=2)
+
+    assert [len(event.get_json()["tasks"]) for event in batched] == [2, 2, 1]
+    assert batched[2].get_json()["tasks"] == [
+        {
+            "title": "task 4",
+            "notes": "",
+            "tasklist": TaskListType.MANGA.value,
+            # tasks without a key are keyed by their place in the event
+            "dedupe_key": f"{batched[2].id}:0",
+        }
+    ]
+    assert batch_task_events([]) == []
+
+
+class FakeEvent:
+    def __init__(self, event):
+        self.id = event.id
+        self._data = event.get_json()
+
+    def get_json(self):
+        return self._data
+
+
+class FakeOut:
+    def __init__(self):
+        self.value = None
+
+    def set(self, value):
+        self.value = value
+
+
+@pytest.fixture
+def create_task(local_db_dir, monkeypatch):
+    monkeypatch.setattr(GoogleTask, "task_index", TaskIndex("test_create_task"))
+    handler = GoogleTask.create_task._function.get_user_function()
+
+    def run(event, resource):
+        monkeypatch.setattr(
+            GoogleTask.google_clients,
+            "tasks",
+            lambda: TaskService(None, service=resource),
+        )
+        output = FakeOut()
+        asyncio.run(handler(azeventgrid=FakeEvent(event), telegramOutput=output))
+        return [message.get_json()["message"] for message in output.value or []]
+
+    return run
+
+
+def test_redelivery_creates_the_failed_tasks_and_sends_all_notifications(
+    create_task,
+):
+    (event,) = batch_task_events(
+        [create_task_output_event(title=f"task {i}") for i in range(3)]
+    )
+
+    with pytest.raises(RuntimeError):
+        create_task(event, FakeTasksResource(failing_titles={"task 1"}))
+
+    resource = FakeTasksResource()
+    (message,) = create_task(event, resource)
+
+    # only the failed task is inserted again
+    assert resource.batches == [["0"]]
+    assert [line.split(" (")[0] for line in message.splitlines()] == [
+        "Task created in DEFAULT: task 0",
+        "Task created in DEFAULT: task 2",
+        "Task created in DEFAULT: task 1",
+    ]
+    assert create_task(event, resource) == []
+    assert resource.batches == [["0"]]
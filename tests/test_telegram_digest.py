@@ -0,0 +1,67 @@
+import pytest
+
+import function_app  # noqa: F401, must be imported before the bindings
+from Infrastructure.telegram.azure_helper import TelegramDigest
+from Infrastructure.telegram.digest import DigestCounter, pack_messages
+
+
+def test_notifications_are_packed_in_order():
+    assert pack_messages(["a", "b", "c"], limit=3) == ["a\nb", "c"]
+    assert pack_messages(["a", "b", "c"]) == ["a\nb\nc"]
+    assert pack_messages([]) == []
+
+
+def test_long_notification_is_split_at_line_boundaries():
+    notification = "\n".join(["x" * 4] * 5)
+
+    assert pack_messages(["start", notification], limit=10) == [
+        "start",
+        "xxxx\nxxxx",
+        "xxxx\nxxxx",
+        "xxxx",
+    ]
+
+
+def test_line_over_the_limit_is_cut():
+    assert pack_messages(["ab\n" + "x" * 7], limit=3) == ["ab", "xxx", "xxx", "x"]
+
+
+def test_packed_messages_respect_the_telegram_limit():
+    notifications = [f"New mietplan file {i}.pdf at /Abrechnung" for i in range(500)]
+
+    messages = pack_messages(notifications)
+
+    assert all(len(message) <= 4096 for message in messages)
+    assert "\n".join(messages).split("\n") == notifications
+    assert len(messages) == 6
+
+
+@pytest.fixture
+def counter(local_db_dir, monkeypatch):
+    counter = DigestCounter()
+    monkeypatch.setattr("Infrastructure.telegram.azure_helper.digest_counter", counter)
+    return counter
+
+
+def test_digest_flush_counts_the_saved_invocations(counter):
+    telegram = TelegramDigest("mietplan")
+    for i in range(3):
+        telegram.add(f"New mietplan file {i}.pdf")
+
+    events = telegram.flush()
+
+    assert [event.get_json()["message"] for event in events] == [
+        "New mietplan file 0.pdf\nNew mietplan file 1.pdf\nNew mietplan file 2.pdf"
+    ]
+    assert not telegram
+    assert telegram.flush() == []
+
+    telegram.add("one more")
+    telegram.flush()
+    [savings] = counter.savings()
+    assert (savings.source, savings.notifications, savings.messages) == (
+        "mietplan",
+        4,
+        2,
+    )
+    assert savings.saved == 2
@@ -0,0 +1,81 @@
+import asyncio
+import time
+
+import pytest
+from telegram.error import BadRequest, RetryAfter
+
+from Infrastructure.telegram.rate_limit import (
+    RateLimiter,
+    TokenBucket,
+    send_rate_limited,
+)
+
+
+class FakeSender:
+    def __init__(self, failures=None):
+        # text -> exceptions raised by its next sends
+        self.failures = failures or {}
+        self.sent = []
+        self.attempts = 0
+
+    async def send(self, text, chat_id):
+        self.attempts += 1
+        if self.failures.get(text):
+            raise self.failures[text].pop(0)
+        self.sent.append((chat_id, text))
+
+
+@pytest.fixture
+def limiter():
+    return RateLimiter(global_rate=1000, per_chat_rate=1000)
+
+
+def test_retry_after_is_waited_out(limiter):
+    sender = FakeSender({"a": [RetryAfter(0.05)]})
+
+    start = time.monotonic()
+    asyncio.run(send_rate_limited(sender, limiter, "a", 1))
+
+    assert sender.sent == [(1, "a")]
+    assert sender.attempts == 2
+    assert time.monotonic() - start >= 0.04
+
+
+def test_long_retry_after_is_raised_and_holds_back_the_chat(limiter):
+    sender = FakeSender({"a": [RetryAfter(30)]})
+
+    with pytest.raises(RetryAfter):
+        asyncio.run(send_rate_limited(sender, limiter, "a", 1, max_retry_after=5))
+
+    assert sender.sent == []
+    assert limiter.chat_bucket(1).wait_time() > 29
+    assert limiter.chat_bucket(2).wait_time() == 0
+
+
+def test_rejected_message_is_raised(limiter):
+    sender = FakeSender({"a": [BadRequest("Chat not found")]})
+
+    with pytest.raises(BadRequest):
+        asyncio.run(send_rate_limited(sender, limiter, "a", 1))
+
+    assert sender.attempts == 1
+
+
+def test_token_bucket_spaces_events():
+    bucket = TokenBucket(rate=20, burst=1)
+    assert bucket.wait_time() == 0
+    bucket.take()
+    assert 0.04 < bucket.wait_time() <= 0.05
+
+
+def test_rate_limiter_keeps_the_per_chat_rate():
+    limiter = RateLimiter(global_rate=1000, per_chat_rate=20)
+
+    async def acquire(count):
+        for _ in range(count):
+            await limiter.acquire(1)
+
+    start = time.monotonic()
+    asyncio.run(acquire(5))
+
+    assert time.monotonic() - start >= 0.19
@@ -0,0 +1,107 @@
+import asyncio
+
+import pytest
+from telegram.error import BadRequest, NetworkError
+
+from Infrastructure.telegram.sender import TelegramSender
+
+
+class FakeBot:
+    instances = []
+
+    def __init__(self, token):
+        self.token = token
+        self.initialized = False
+        self.shut_down = False
+        self.sent = []
+        self.failures = []
+        FakeBot.instances.append(self)
+
+    async def initialize(self):
+        self.initialized = True
+
+    async def shutdown(self):
+        self.shut_down = True
+
+    async def send_message(self, text, chat_id):
+        if self.failures:
+            raise self.failures.pop(0)
+        self.sent.append((chat_id, text))
+        return text
+
+
+@pytest.fixture
+def sender():
+    FakeBot.instances = []
+    tokens = iter(["token-1", "token-2", "token-3"])
+    return TelegramSender(lambda: next(tokens), bot_factory=FakeBot)
+
+
+def test_burst_initializes_the_bot_once(sender):
+    async def burst():
+        await asyncio.gather(*(sender.send(f"msg {i}", chat_id=1) for i in range(10)))
+
+    asyncio.run(burst())
+
+    [bot] = FakeBot.instances
+    assert bot.initialized and not bot.shut_down
+    assert len(bot.sent) == 10
+    stats = sender.stats()
+    assert (stats.sent, stats.failed, stats.initializations) == (10, 0, 1)
+    assert stats.p95_ms >= 0
+
+
+def test_transport_failure_reinitializes_and_retries(sender):
+    async def run():
+        await sender.send("first", chat_id=1)
+        FakeBot.instances[0].failures.append(NetworkError("connection reset"))
+        return await sender.send("second", chat_id=1)
+
+    assert asyncio.run(run()) == "second"
+
+    first, second = FakeBot.instances
+    assert first.shut_down
+    assert second.token == "token-2"
+    assert second.sent == [(1, "second")]
+    assert sender.stats().initializations == 2
+
+
+def test_rejected_message_keeps_the_bot(sender):
+    async def run():
+        await sender.send("first", chat_id=1)
+        FakeBot.instances[0].failures.append(BadRequest("message is too long"))
+        with pytest.raises(BadRequest):
+            await sender.send("x" * 5000, chat_id=1)
+        await sender.send("third", chat_id=1)
+
+    asyncio.run(run())
+
+    [bot] = FakeBot.instances
+    assert bot.sent == [(1, "first"), (1, "third")]
+    assert sender.stats().failed == 1
+
+
+def test_second_failure_is_raised():
+    class DownBot(FakeBot):
+        async def send_message(self, text, chat_id):
+            raise NetworkError("down")
+
+    FakeBot.instances = []
+    sender = TelegramSender(lambda: "token", bot_factory=DownBot)
+
+    with pytest.raises(NetworkError):
+        asyncio.run(sender.send("first", chat_id=1))
+
+    assert len(FakeBot.instances) == 2
+    assert all(bot.shut_down for bot in FakeBot.instances)
+    assert sender.stats().failed == 1
+
+
+def test_new_event_loop_gets_a_new_bot(sender):
+    asyncio.run(sender.send("first", chat_id=1))
+    asyncio.run(sender.send("second", chat_id=1))
+
+    assert [bot.sent for bot in FakeBot.instances] == [
+        [(1, "first")],
+        [(1, "second")],
+    ]
@@ -0,0 +1,67 @@
+import io
+
+import pytest
+
+import function_app  # noqa: F401, must be imported before the bindings
+from UseCases import WinSimInvoice
+from UseCases.MailPoller import MailOutputs
+from shared.GoogleServices.gmail import MailMessage, MemoryAttachment
+
+
+class FakeGmailService:
+    download_fails = False
+
+    def iter_pdf_attachments_to_ram(self, message_id):
+        yield MemoryAttachment("jan.pdf", io.BytesIO(b"pdf"))
+        if self.download_fails:
+            raise RuntimeError("Could not download feb.pdf of message m")
+        yield MemoryAttachment("feb.pdf", io.BytesIO(b"pdf"))
+
+
+class FakeDriveService:
+    def __init__(self, failing=()):
+        self.failing = set(failing)
+        self.uploaded = []
+
+    def upload_file_directly(self, content, filename, folder_id, mime_type):
+        if filename in self.failing:
+            raise ConnectionError("connection reset")
+        self.uploaded.append(filename)
+        return f"id-{filename}"
+
+
+@pytest.fixture
+def drive(monkeypatch):
+    drive = FakeDriveService()
+    monkeypatch.setattr(WinSimInvoice.google_clients, "gmail", FakeGmailService)
+    monkeypatch.setattr(WinSimInvoice.google_clients, "drive", lambda: drive)
+    return drive
+
+
+def test_invoices_are_uploaded(drive):
+    result = WinSimInvoice.check_winsim_invoices(
+        MailMessage("m", {}, b""), MailOutputs()
+    )
+
+    assert [upload["drive_file_id"] for upload in result["uploads"]] == [
+        "id-jan.pdf",
+        "id-feb.pdf",
+    ]
+
+
+def test_failed_upload_raises_after_the_other_uploads(drive):
+    drive.failing.add("jan.pdf")
+
+    with pytest.raises(RuntimeError, match="jan.pdf: connection reset"):
+        WinSimInvoice.check_winsim_invoices(MailMessage("m", {}, b""), MailOutputs())
+
+    assert drive.uploaded == ["feb.pdf"]
+
+
+def test_failed_download_fails_the_mail(drive, monkeypatch):
+    monkeypatch.setattr(FakeGmailService, "download_fails", True)
+
+    with pytest.raises(RuntimeError, match="feb.pdf"):
+        WinSimInvoice.check_winsim_invoices(MailMessage("m", {}, b""), MailOutputs())
+
+    assert drive.uploaded == ["jan.pdf"]